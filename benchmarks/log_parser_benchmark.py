@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+"""Compares the dispatching log parser with trying every regex on every line,
+the DataFrame construction from records with the columnar backend, and
+fill_ogs_context with the fills per groupby it replaced.
+
+Usage: python benchmarks/log_parser_benchmark.py [repetitions] [rows]
+"""
+
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ogs6py.log_parser.log_parser import parse_file, parse_columns, mpi_processes, try_match_parallel_line, \
+    try_match_serial_line
+from ogs6py.log_parser.common_ogs_analyses import columns_to_dataframe, fill_ogs_context
+from ogs6py.ogs_regexes.ogs_regexes import ogs_regexes
+
+parser_dir = os.path.join(os.path.dirname(__file__), '..', 'tests', 'parser')
+
+
+def parse_file_linear_scan(file_name, force_parallel=False):
+    # The parser before the dispatcher was introduced: every pattern is tried on every line
+    parallel_log = force_parallel or mpi_processes(file_name) > 1
+    if parallel_log:
+        process_regex = '\\[(\\d+)\\]\\ '
+        try_match = try_match_parallel_line
+    else:
+        process_regex = ''
+        try_match = try_match_serial_line
+    patterns = [(re.compile(process_regex + k), v) for k, v in ogs_regexes()]
+    records = []
+    with open(file_name) as file:
+        for line_nr, line in enumerate(file, start=1):
+            for key, value in patterns:
+                if r := try_match(line, line_nr, key, value):
+                    records.append(value(*r))
+                    break
+    return records
+
+
+def fill_ogs_context_groupby(df):
+    # fill_ogs_context before the fills were vectorized: one groupby and fill per context column
+    for column in ['line', 'mpi_process', 'time_step', 'iteration_number', 'coupling_iteration',
+                   'coupling_iteration_process', 'component', 'process']:
+        if column in df:
+            df[column] = df[column].astype('Int64')
+    df['time_step'] = df.groupby('mpi_process')[['time_step']].ffill().fillna(value=0)
+    df['iteration_number'] = df.groupby('mpi_process')[['iteration_number']].bfill()
+    if 'component' in df:
+        df['component'] = df.groupby('mpi_process')[['component']].fillna(value=-1)
+    if 'process' in df:
+        df['process'] = df.groupby('mpi_process')[['process']].bfill()
+    if 'coupling_iteration_process' in df:
+        df['coupling_iteration_process'] = df.groupby('mpi_process')[['coupling_iteration_process']].ffill(limit=1)
+    return df
+
+
+def write_log(fixture, repetitions, directory):
+    with open(os.path.join(parser_dir, fixture)) as file:
+        lines = file.readlines()
+    header = [line for line in lines if not line.startswith('[')][:6] if fixture.startswith('parallel') else lines[:2]
+    body = lines[len(header):]
+    file_name = os.path.join(directory, fixture)
+    with open(file_name, 'w') as file:
+        file.writelines(header)
+        for _ in range(repetitions):
+            file.writelines(body)
+    return file_name
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def peak_memory(function, *args):
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def records_dataframe(file_name):
+    return pd.DataFrame(parse_file(file_name))
+
+
+def columnar_dataframe(file_name):
+    return columns_to_dataframe(parse_columns(file_name))
+
+
+def benchmark_fill_ogs_context(rows, mpi_processes=16):
+    df = pd.DataFrame(parse_file(os.path.join(parser_dir, 'serial_convergence_long.txt')))
+    df = df.iloc[np.arange(rows) % len(df)].reset_index(drop=True)
+    df['mpi_process'] = np.arange(rows) % mpi_processes
+    time_groupby, df_groupby = timed(fill_ogs_context_groupby, df.copy())
+    time_vectorized, df_vectorized = timed(fill_ogs_context, df.copy())
+    pd.testing.assert_frame_equal(df_groupby, df_vectorized)
+    print(f'fill_ogs_context ({rows} rows, {mpi_processes} mpi processes)')
+    print(f'  groupby fills: {time_groupby:8.3f} s')
+    print(f'  vectorized:    {time_vectorized:8.3f} s')
+    print(f'  speedup:       {time_groupby / time_vectorized:8.2f}x')
+
+
+def main(repetitions=200, rows=2000000):
+    with tempfile.TemporaryDirectory() as directory:
+        for fixture in ['serial_convergence_long.txt', 'parallel_3_debug.txt']:
+            file_name = write_log(fixture, repetitions, directory)
+            size = os.path.getsize(file_name) / 1e6
+            time_linear, records_linear = timed(parse_file_linear_scan, file_name)
+            time_dispatch, records_dispatch = timed(parse_file, file_name)
+            assert list(map(repr, records_linear)) == list(map(repr, records_dispatch))
+            print(f'{fixture} ({size:.1f} MB, {len(records_dispatch)} records)')
+            print(f'  linear scan: {time_linear:8.3f} s  {size / time_linear:8.1f} MB/s')
+            print(f'  dispatcher:  {time_dispatch:8.3f} s  {size / time_dispatch:8.1f} MB/s')
+            print(f'  speedup:     {time_linear / time_dispatch:8.2f}x')
+            time_records, _ = timed(records_dataframe, file_name)
+            time_columnar, _ = timed(columnar_dataframe, file_name)
+            print(f'  DataFrame from records: {time_records:8.3f} s  {peak_memory(records_dataframe, file_name):8.1f} MB peak')
+            print(f'  DataFrame from columns: {time_columnar:8.3f} s  {peak_memory(columnar_dataframe, file_name):8.1f} MB peak')
+    benchmark_fill_ogs_context(rows)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+"""Benchmark suite of the log parser on synthetic logs of increasing size
+
+For each kind of log (serial, MPI, staggered scheme with components and warnings) and size, it measures
+the parse throughput (MB/s, lines/s), the peak memory of parsing into a DataFrame, and the cost of
+fill_ogs_context and of the analyses. The results can be stored as JSON and compared with a stored
+baseline, a regression beyond the tolerance gives exit code 1.
+
+Usage: python benchmarks/log_parser_suite.py [--sizes 1 10 50] [--repeat 3] [--json results.json]
+                                             [--baseline baseline.json] [--tolerance 0.25]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ogs6py.log_parser.log_parser import parse_columns
+from ogs6py.log_parser.common_ogs_analyses import columns_to_dataframe, fill_ogs_context, analyze
+from ogs6py.log_parser.synthetic_log import write_synthetic_log
+
+log_kinds = {
+    "serial": dict(),
+    "mpi_4": dict(mpi_processes=4),
+    "staggered_components": dict(staggered=True, components=2, warnings=0.1),
+}
+
+analyses = {
+    "serial": ['by_time_step', 'time_step_vs_iterations', 'analysis_simulation'],
+    "mpi_4": ['by_time_step', 'time_step_vs_iterations', 'analysis_simulation'],
+    "staggered_components": ['by_time_step', 'time_step_vs_iterations', 'analysis_simulation',
+                             'convergence_newton_iteration', 'convergence_coupling_iteration'],
+}
+
+# measurements where larger is better, all others are times (smaller is better)
+throughputs = ['parse_mb_s', 'parse_lines_s']
+
+
+def timed(function, *args, repeat=1):
+    # shortest of repeat runs, the arguments must not be modified by function
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def parse(file_name):
+    return columns_to_dataframe(parse_columns(file_name))
+
+
+def peak_memory(function, *args):
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def run(sizes, directory, repeat=3):
+    results = []
+    for kind, options in log_kinds.items():
+        for size in sizes:
+            file_name = os.path.join(directory, '{}_{}.log'.format(kind, size))
+            stats = write_synthetic_log(file_name, size=int(size * 1e6), **options)
+            megabytes = stats['bytes'] / 1e6
+            time_parse, df = timed(parse, file_name, repeat=repeat)
+            time_fill = min(timed(fill_ogs_context, df.copy())[0] for _ in range(repeat))
+            df = fill_ogs_context(df)
+            time_analyses, _ = timed(analyze, df, analyses[kind], repeat=repeat)
+            results.append({"kind": kind, "size_mb": size, "lines": stats['lines'], "records": len(df),
+                            "parse_s": time_parse, "parse_mb_s": megabytes / time_parse,
+                            "parse_lines_s": stats['lines'] / time_parse,
+                            "parse_peak_mb": peak_memory(parse, file_name),
+                            "fill_ogs_context_s": time_fill, "analyses_s": time_analyses})
+            os.remove(file_name)
+    return results
+
+
+def print_results(results):
+    print('{:<22}{:>8}{:>10}{:>10}{:>12}{:>12}{:>10}{:>12}'.format(
+        'log', 'MB', 'parse s', 'MB/s', 'lines/s', 'peak MB', 'fill s', 'analyses s'))
+    for result in results:
+        print('{kind:<22}{size_mb:>8}{parse_s:>10.3f}{parse_mb_s:>10.1f}{parse_lines_s:>12.0f}'
+              '{parse_peak_mb:>12.1f}{fill_ogs_context_s:>10.3f}{analyses_s:>12.3f}'.format(**result))
+
+
+def regressions(results, baseline, tolerance):
+    """Returns the measurements that are worse than the baseline by more than tolerance (relative)"""
+    found = []
+    previous = {(result['kind'], result['size_mb']): result for result in baseline}
+    for result in results:
+        reference = previous.get((result['kind'], result['size_mb']))
+        if reference is None:
+            continue
+        for measurement in ['parse_mb_s', 'parse_lines_s', 'parse_peak_mb', 'fill_ogs_context_s', 'analyses_s']:
+            if measurement in throughputs:
+                worse = result[measurement] < reference[measurement] * (1 - tolerance)
+            else:
+                worse = result[measurement] > reference[measurement] * (1 + tolerance)
+            if worse:
+                found.append('{} {} MB {}: {:.4g} (baseline {:.4g})'.format(
+                    result['kind'], result['size_mb'], measurement, result[measurement], reference[measurement]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1, 10, 50], help='log sizes in MB')
+    parser.add_argument('--repeat', type=int, default=3, help='the shortest time of repeat runs is taken')
+    parser.add_argument('--json', help='stores the results')
+    parser.add_argument('--baseline', help='results of a previous run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative deterioration')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(args.sizes, directory, args.repeat)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=1)
+    if args.baseline:
+        with open(args.baseline) as file:
+            found = regressions(results, json.load(file), args.tolerance)
+        for regression in found:
+            print('regression:', regression)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
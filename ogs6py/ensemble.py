@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import copy
+import os
+import time
+
+from ogs6py.ogs import OGS
+
+'''
+Runs an ensemble of simulations (e.g. the variants of a parameter study) concurrently on the local machine. A run
+needs OMP_NUM_THREADS x MPI ranks cores, runs are started as long as the sum of the cores of the running simulations
+stays within the budget. Each run writes its log and output into its own directory.
+'''
+
+
+def available_cores():
+    """Number of cores this process may use"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _summaries(logfiles, workers):
+    # parsed summary of each log, see log_parser.batch.parse_many
+    from ogs6py.log_parser.batch import parse_many
+    df, report = parse_many(logfiles, workers=workers)
+    summaries = report.rename(columns={"status": "log_status", "error": "log_error"})[["log_status", "log_error"]]
+    if df.empty:
+        return summaries
+    grouped = df.groupby(level="run")
+    if "execution_time" in df:
+        summaries["execution_time"] = grouped["execution_time"].max()
+    if "time_step" in df:
+        summaries["time_steps"] = grouped["time_step"].max()
+    if "iteration_time" in df:
+        summaries["iterations"] = df["iteration_time"].notna().groupby(level="run").sum()
+    if "type" in df:
+        summaries["warnings"] = (df["type"] == "Warning").groupby(level="run").sum()
+    return summaries
+
+
+def run_ensemble(models, cores=None, threads=1, ranks=1, work_dir="ensemble", path=None, args=None,
+                 container_path=None, wrapper=None, write_input=True, timeout=None, summary=True,
+                 parse_workers=None, poll_interval=0.1):
+    """Runs simulations concurrently within a core budget
+
+    Parameters
+    ----------
+    models : `list` or `dict`
+        OGS objects or project files, a dict maps run ids to them. For a list the run ids are the positions.
+    cores : `int`, optional
+        core budget, all available cores if None
+    threads : `int`, optional
+        OMP_NUM_THREADS of the runs whose OGS object has none (project files)
+    ranks : `int`, optional
+        MPI ranks per run, the runs are wrapped by "mpirun -np ranks" if ranks > 1 and wrapper is None
+    work_dir : `str`, optional
+        each run writes its log (out.log) and its output (ogs -o) into the directory work_dir/run_id
+    path : `str`, optional
+        directory of the ogs executable, see OGS.run_model. For tests, a directory with an executable
+        stand-in named ogs (e.g. a shell script printing a log).
+    args : `str`, optional
+        additional arguments for ogs
+    container_path : `str`, optional
+    wrapper : `str`, optional
+    write_input : `bool`, optional
+        writes the project files of OGS objects before running them
+    timeout : `float`, optional
+        runs taking longer (in seconds) are terminated
+    summary : `bool`, optional
+        parses the logs (see log_parser.batch.parse_many) and adds a summary of each run
+    parse_workers : `int`, optional
+        number of processes parsing the logs
+    poll_interval : `float`, optional
+        seconds between the checks of the running simulations
+
+    Returns
+    -------
+    results : `pandas.DataFrame`
+        per run (index run): status ("ok", "failed" or "timeout"), returncode, cores, start_time (seconds
+        after the start of the ensemble), exec_time, run_dir and logfile. With summary: the status of the
+        log (log_status, log_error, see parse_many), execution_time, time_steps, iterations and warnings.
+    """
+    import pandas as pd
+    if not isinstance(models, dict):
+        models = dict(enumerate(models))
+    if cores is None:
+        cores = available_cores()
+    if wrapper is None and ranks > 1:
+        wrapper = f"mpirun -np {ranks}"
+
+    pending = []
+    for run_id, model in models.items():
+        if not isinstance(model, OGS):
+            model = OGS(PROJECT_FILE=model)
+        elif write_input is True:
+            model.write_input()
+        run_threads = threads if model.threads is None else model.threads
+        run_cores = run_threads * ranks
+        if run_cores > cores:
+            raise RuntimeError(f'Run {run_id} needs {run_cores} cores, the budget is {cores} cores.')
+        pending.append((run_id, model, run_threads, run_cores))
+
+    results = {}
+    running = {}
+    used_cores = 0
+    start = time.time()
+    try:
+        while pending or running:
+            # first fit: later runs with fewer cores may start before a run that does not fit yet
+            for run_id, model, run_threads, run_cores in list(pending):
+                if used_cores + run_cores > cores:
+                    continue
+                run_dir = os.path.abspath(os.path.join(work_dir, str(run_id)))
+                os.makedirs(run_dir, exist_ok=True)
+                run_args = f"-o {run_dir}" if args is None else f"{args} -o {run_dir}"
+                # a shallow copy runs, the OGS objects of the caller keep their project file, threads, logfile
+                # and exec_time
+                run_model = copy.copy(model)
+                run_model.prjfile, run_model.threads = os.path.abspath(model.prjfile), run_threads
+                run = run_model.start_model(logfile=os.path.join(run_dir, "out.log"), path=path, args=run_args,
+                                            container_path=container_path, wrapper=wrapper)
+                running[run_id] = (run, run_cores, time.time() - start, run_dir)
+                used_cores += run_cores
+                pending.remove((run_id, model, run_threads, run_cores))
+            for run_id, (run, run_cores, start_time, run_dir) in list(running.items()):
+                returncode = run.poll()
+                if returncode is None:
+                    if timeout is not None and run.exec_time > timeout and run_id not in results:
+                        run.terminate()
+                        results[run_id] = {"status": "timeout"}
+                    continue
+                result = results.setdefault(run_id, {"status": "ok" if returncode == 0 else "failed"})
+                result.update(returncode=returncode, cores=run_cores, start_time=start_time,
+                              exec_time=run.exec_time, run_dir=run_dir, logfile=run.logfile)
+                used_cores -= run_cores
+                del running[run_id]
+            if running:
+                time.sleep(poll_interval)
+    finally:
+        for run, _, _, _ in running.values():
+            run.terminate()
+
+    results = pd.DataFrame.from_dict({run_id: results[run_id] for run_id in models}, orient="index")
+    results = results[["status", "returncode", "cores", "start_time", "exec_time", "run_dir", "logfile"]]
+    results.index.name = "run"
+    if summary is True:
+        logfiles = {run_id: logfile for run_id, logfile in results["logfile"].items() if os.path.isfile(logfile)}
+        if logfiles:
+            results = results.join(_summaries(logfiles, parse_workers))
+    return results
@@ -0,0 +1,9 @@
+from .log_parser import iter_records, parse_file
+
+
+def __getattr__(name):
+    # parse_many needs pandas, it is imported on first use
+    if name == "parse_many":
+        from .batch import parse_many
+        return parse_many
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
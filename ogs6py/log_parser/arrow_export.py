@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ogs6py.log_parser.log_parser import parse_columns, match_columns, mpi_processes, compression, \
+    line_aligned_offsets, text_lines
+from ogs6py.log_parser.numpy_backend import int_columns
+from ogs6py.ogs_regexes import ogs_regexes as regexes
+
+'''
+Export of parsed logs to Apache Arrow (needs the optional package pyarrow): tables, Parquet files and Arrow IPC
+streams. All record types share one schema derived from the record dataclasses of ogs_regexes (see record_fields),
+fields a record type does not have are null. Worker processes hand their parsed chunks to the parent as Arrow IPC
+buffers instead of pickled records (see parse_arrow).
+'''
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as err:
+        raise RuntimeError('The Arrow export requires the package pyarrow.') from err
+    return pyarrow
+
+
+def record_fields(pattern_classes=None):
+    """Fields of the records (name to type) in the order of ogs_regexes
+
+    The fields record (name of the record type), type, line and mpi_process come first. A field declared
+    with different types by several record types is float.
+    """
+    if pattern_classes is None:
+        pattern_classes = []
+        for _, pattern_class in regexes.ogs_regexes():
+            if pattern_class not in pattern_classes:
+                pattern_classes.append(pattern_class)
+    fields = {'record': str, 'type': str, 'line': int, 'mpi_process': int}
+    for pattern_class in pattern_classes:
+        for field, ctor in pattern_class.__annotations__.items():
+            if fields.setdefault(field, ctor) is not ctor:
+                fields[field] = float
+    return fields
+
+
+def _arrow_type(pa, ctor):
+    return {int: pa.int64(), float: pa.float64(), str: pa.string()}[ctor]
+
+
+def arrow_schema(pattern_classes=None):
+    """Arrow schema of the records, see record_fields"""
+    pa = _import_pyarrow()
+    return pa.schema([pa.field(field, _arrow_type(pa, ctor)) for field, ctor in record_fields(pattern_classes).items()])
+
+
+def columns_to_arrow(columns, pattern_classes=None):
+    """Builds an Arrow table of all records from the columns of log_parser.parse_columns
+
+    The rows are ordered by line. The int and float columns are taken from the buffers of the parsed
+    columns without converting each value.
+
+    Parameters
+    ----------
+    columns : `dict`
+        see log_parser.match_columns
+    pattern_classes : `list`, optional
+        record types of the schema (see record_fields), all record types if None
+    """
+    pa = _import_pyarrow()
+    fields = record_fields(pattern_classes)
+    schema = arrow_schema(pattern_classes)
+    tables = []
+    for pattern_class, pattern_columns in columns.items():
+        number_of_records = len(pattern_columns['line'])
+        arrays = []
+        for field, ctor in fields.items():
+            if field == 'record':
+                arrays.append(pa.array([pattern_class.__name__] * number_of_records, pa.string()))
+            elif field == 'type':
+                arrays.append(pa.array([pattern_class.type_str()] * number_of_records, pa.string()))
+            elif field not in pattern_columns:
+                arrays.append(pa.nulls(number_of_records, _arrow_type(pa, ctor)))
+            elif ctor is str:
+                arrays.append(pa.array(pattern_columns[field], pa.string()))
+            else:
+                values = pattern_columns[field]
+                values = np.frombuffer(values, dtype=np.int64 if values.typecode == 'q' else np.float64)
+                arrays.append(pa.array(values.astype(np.int64 if ctor is int else np.float64, copy=False)))
+        tables.append(pa.Table.from_arrays(arrays, schema=schema))
+    if not tables:
+        return schema.empty_table()
+    table = pa.concat_tables(tables)
+    return table.take(np.argsort(table.column('line').to_numpy(), kind='stable'))
+
+
+def table_to_arrow(table):
+    """Converts a table of the numpy backend (or a structured array of its analyses) to an Arrow table,
+    missing values become null, integer columns int64"""
+    pa = _import_pyarrow()
+    if isinstance(table, np.ndarray):
+        table = {field: table[field] for field in table.dtype.names}
+    arrays = {}
+    for column, values in table.items():
+        if values.dtype == object:
+            arrays[column] = pa.array(values.tolist(), pa.string())
+        else:
+            array = pa.array(values, from_pandas=True)
+            arrays[column] = array.cast(pa.int64()) if column in int_columns else array
+    return pa.table(arrays)
+
+
+def parse_arrow(file_name, force_parallel=False, pattern_classes=None, workers=None):
+    """Parses the log file into an Arrow table (see columns_to_arrow)
+
+    Parameters
+    ----------
+    file_name : `str`
+    force_parallel : `bool`, optional
+    pattern_classes : `list`, optional
+        parses only the records of these types, the schema has all record types
+    workers : `int`, optional
+        number of processes that parse newline aligned chunks of the file, each chunk is sent to the parent
+        as Arrow IPC buffer. Compressed logs are parsed serially.
+    """
+    if workers is None or workers < 2 or os.path.getsize(file_name) == 0 or compression(file_name) is not None:
+        return columns_to_arrow(parse_columns(file_name, force_parallel=force_parallel,
+                                              pattern_classes=pattern_classes))
+    pa = _import_pyarrow()
+    parallel_log = force_parallel or mpi_processes(file_name) > 1
+    byte_ranges = line_aligned_offsets(file_name, workers)
+    tables = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = executor.map(_parse_byte_range_ipc, *zip(*[(file_name, start, stop, parallel_log, pattern_classes)
+                                                             for start, stop in byte_ranges]))
+        line_offset = 0
+        for buffer, number_of_lines in chunks:
+            table = read_ipc(buffer)
+            line = table.schema.get_field_index('line')
+            tables.append(table.set_column(line, 'line', pa.array(table.column(line).to_numpy() + line_offset)))
+            line_offset += number_of_lines
+    return pa.concat_tables(tables)
+
+
+def _parse_byte_range_ipc(file_name, start, stop, parallel_log, pattern_classes):
+    # Runs in a worker process, see log_parser.parse_byte_range
+    with open(file_name, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        data = mapped_file[start:stop]
+    table = columns_to_arrow(match_columns(text_lines(data), parallel_log, pattern_classes=pattern_classes))
+    return to_ipc_buffer(table), data.count(b'\n')
+
+
+def to_ipc_buffer(table):
+    """Serializes an Arrow table as Arrow IPC stream into a buffer"""
+    pa = _import_pyarrow()
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def read_ipc(source):
+    """Reads an Arrow table from an Arrow IPC stream (buffer, bytes or file name)"""
+    pa = _import_pyarrow()
+    if isinstance(source, (str, os.PathLike)):
+        with pa.memory_map(os.fspath(source)) as file:
+            return pa.ipc.open_stream(file).read_all()
+    return pa.ipc.open_stream(source).read_all()
+
+
+def _to_table(log, force_parallel, workers):
+    pa = _import_pyarrow()
+    if isinstance(log, pa.Table):
+        return log
+    return parse_arrow(log, force_parallel=force_parallel, workers=workers)
+
+
+def write_ipc(log, file_name, force_parallel=False, workers=None):
+    """Writes a log file (parsed, see parse_arrow) or an Arrow table as Arrow IPC stream"""
+    pa = _import_pyarrow()
+    table = _to_table(log, force_parallel, workers)
+    with pa.OSFile(os.fspath(file_name), 'wb') as sink, pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def write_parquet(log, file_name, force_parallel=False, workers=None, **kwargs):
+    """Writes a log file (parsed, see parse_arrow) or an Arrow table as Parquet file
+
+    The keyword arguments are passed to pyarrow.parquet.write_table, e.g. compression="zstd".
+    """
+    _import_pyarrow()
+    import pyarrow.parquet as pq
+    pq.write_table(_to_table(log, force_parallel, workers), os.fspath(file_name), **kwargs)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from lxml import etree as ET
+
+from ogs6py.log_parser.log_parser import parse_columns
+from ogs6py.log_parser.common_ogs_analyses import columns_to_dataframe, fill_ogs_context
+
+
+def project_parameters(project_file, names=None):
+    """Reads values from a project file as metadata of a run
+
+    Parameters
+    ----------
+    project_file : `str`
+    names : `list` or `dict`, optional
+        names of parameters (./parameters/parameter) whose value is read, or a dict of column name to xpath
+        of an element whose text is read (e.g. {"csp": "./processes/process/coupling_scheme_parameter"}).
+        If None, the values of all parameters with a single value are read.
+
+    Returns
+    -------
+    metadata : `dict`
+        numbers are converted to float, values that are not found are None
+    """
+    root = ET.parse(project_file).getroot()
+    if isinstance(names, dict):
+        texts = {}
+        for column, xpath in names.items():
+            element = root.find(xpath)
+            texts[column] = element.text if element is not None else None
+    else:
+        texts = {}
+        for parameter in root.findall('./parameters/parameter'):
+            values = parameter.findall('value')
+            if parameter.find('name') is not None and len(values) == 1:
+                texts[parameter.find('name').text] = values[0].text
+        if names is not None:
+            texts = {name: texts.get(name) for name in names}
+    metadata = {}
+    for column, text in texts.items():
+        try:
+            metadata[column] = float(text)
+        except (TypeError, ValueError):
+            metadata[column] = text.strip() if text is not None else None
+    return metadata
+
+
+def _parse_run(file_name, fill_context, force_parallel):
+    # Runs in a worker process. The DataFrame (with filled context) is built in the worker and pickled back to the
+    # parent, its columns are pickled as arrays instead of one object per record.
+    try:
+        df = columns_to_dataframe(parse_columns(file_name, force_parallel=force_parallel))
+        if fill_context and not df.empty:
+            df = fill_ogs_context(df)
+    except Exception as err:
+        return None, {"status": "failed", "error": '{}: {}'.format(type(err).__name__, err)}
+    status = "ok"
+    error = None
+    if 'execution_time' not in df or df['execution_time'].isna().all():
+        # OGS prints the execution time at the end of a run
+        status = "truncated"
+        error = "Simulation did not finish (execution time not found)"
+    if 'type' in df and df['type'].isin(['Error', 'Critical']).any():
+        status = "error"
+        error = df.loc[df['type'].isin(['Error', 'Critical']), 'message'].iloc[0]
+    return df, {"status": status, "error": error}
+
+
+def parse_many(paths, workers=None, project_files=None, parameters=None, fill_context=True,
+               force_parallel=False):
+    """Parses many logs (e.g. of an ensemble study) in worker processes into one DataFrame
+
+    Parameters
+    ----------
+    paths : `list` or `dict`
+        log files, a dict maps run ids to log files. For a list the run ids are the paths.
+    workers : `int`, optional
+        number of worker processes, the logs are parsed serially if None
+    project_files : `list` or `dict`, optional
+        project file of each run (same order or same run ids as paths), the parameters
+        are added as metadata columns (see project_parameters)
+    parameters : `list` or `dict`, optional
+        parameter names or xpaths of the metadata, see project_parameters
+    fill_context : `bool`, optional
+        applies fill_ogs_context to the records of each run
+    force_parallel : `bool`, optional
+
+    Returns
+    -------
+    df : `pandas.DataFrame`
+        records of all parsed runs, the first index level "run" is the run id
+    report : `pandas.DataFrame`
+        status per run: "ok", "truncated" (no end of simulation found), "error" (error or
+        critical messages in the log) or "failed" (the log could not be parsed, its records are missing in df),
+        the first message and the number of records. Failures are reported, not raised.
+    """
+    if not isinstance(paths, dict):
+        paths = {str(path): path for path in paths}
+    run_ids = list(paths)
+    if project_files is not None and not isinstance(project_files, dict):
+        project_files = dict(zip(run_ids, project_files))
+
+    arguments = [(os.fspath(paths[run_id]), fill_context, force_parallel) for run_id in run_ids]
+    if workers is None or workers < 2:
+        results = [_parse_run(*argument) for argument in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_parse_run, *zip(*arguments)))
+
+    dfs = {}
+    report = []
+    for run_id, (df, status) in zip(run_ids, results):
+        status = dict(run=run_id, **status, records=0 if df is None else len(df))
+        if df is not None:
+            if project_files is not None and run_id in project_files:
+                try:
+                    for column, value in project_parameters(project_files[run_id], parameters).items():
+                        df[column] = value
+                except Exception as err:
+                    status['error'] = 'Metadata not available: {}: {}'.format(type(err).__name__, err)
+            dfs[run_id] = df
+        report.append(status)
+    report = pd.DataFrame(report, columns=['run', 'status', 'error', 'records']).set_index('run')
+    if not dfs:
+        return pd.DataFrame(), report
+    df = pd.concat(dfs.values(), keys=list(dfs), names=['run', None])
+    return df, report
@@ -9,6 +9,8 @@
 import pandas as pd
 import numpy as np
 
+from ogs6py.log_parser.numpy_backend import fill_indexer, mpi_process_segments
+
 
 # Helper functions
 def check_input(df, interest, context):
@@ -147,40 +149,287 @@ def analysis_simulation_termination(df):
         return pd.DataFrame()
 
 
-def fill_ogs_context(df):
+def _pivot(grouped, interest, aggfunc):
+    # Same result as pivot_table(interest, context, aggfunc=aggfunc) for the grouped context
+    pt = grouped[interest].agg(aggfunc).dropna(how='all').sort_index(axis=1)
+    return pt.dropna(how='all', axis=1)
+
+
+def analyze(df, analyses):
+    """Computes several analyses at once and returns them as a dict of name to DataFrame
+
+    The records are grouped by (mpi_process, time_step) once, the time step analysis and time_step_vs_iterations
+    are aggregated from this grouping instead of pivoting the DataFrame for each analysis. The convergence
+    analyses share one DataFrame that holds only the context and convergence columns.
+    The results equal the ones of the single analysis functions.
+
+    Parameters
+    ----------
+    df : `pandas.DataFrame`
+        DataFrame with filled context, see fill_ogs_context
+    analyses : `list` of `str`
+        names as in analysis_functions, e.g. ['by_time_step', 'time_step_vs_iterations']
+    """
+    unknown = set(analyses) - set(analysis_functions)
+    if unknown:
+        raise Exception('Analysis/analyses ({}) is/are not available'.format(','.join(unknown)))
+
+    grouped = None
+    if {'by_time_step', 'time_step_vs_iterations'} & set(analyses):
+        grouped = df.groupby(['mpi_process', 'time_step'])
+    df_convergence = None
+    if {'convergence_newton_iteration', 'convergence_coupling_iteration'} & set(analyses):
+        # The convergence analyses copy and modify their input, they get only the columns they need
+        df_convergence = df[[column for column in ['mpi_process', 'time_step', 'coupling_iteration',
+                                                   'coupling_iteration_process', 'process', 'iteration_number',
+                                                   'component', 'dx', 'x', 'dx_x'] if column in df]]
+
+    results = {}
+    for name in analyses:
+        if name == 'by_time_step':
+            interest1 = ['output_time', 'time_step_solution_time']
+            interest2 = ['assembly_time', 'linear_solver_time', 'dirichlet_time']
+            interest = [*interest1, *interest2]
+            context = ['mpi_process', 'time_step']
+            check_input(df, interest, context)
+            pt = _pivot(grouped, interest1, 'mean').merge(_pivot(grouped, interest2, 'sum'), left_index=True,
+                                                           right_index=True)
+            check_output(pt, interest, context)
+        elif name == 'time_step_vs_iterations':
+            interest = ['iteration_number']
+            context = ['time_step']
+            check_input(df, interest, context)
+            # the maximum over all processes of the maxima per process
+            pt = _pivot(grouped, interest, 'max').groupby(level='time_step').max()
+            check_output(pt, interest, context)
+        elif name in ('convergence_newton_iteration', 'convergence_coupling_iteration'):
+            pt = analysis_functions[name](df_convergence)
+        else:
+            pt = analysis_functions[name](df)
+        results[name] = pt
+    return results
+
+
+def columns_to_dataframe(columns):
+    """Builds the DataFrame of all records from the columns of log_parser.parse_columns
+
+    The rows are ordered by line and the columns by first appearance, as for a DataFrame of records.
+    Integer columns get the nullable dtype Int64 directly.
+    """
+    if not columns:
+        return pd.DataFrame()
+    pattern_classes = sorted(columns, key=lambda pattern_class: columns[pattern_class]['line'][0])
+    field_types = {'type': str}
+    for pattern_class in pattern_classes:
+        field_types.update({'line': int, 'mpi_process': int})
+        for field, ctor in pattern_class.__annotations__.items():
+            if field_types.setdefault(field, ctor) is not ctor:
+                field_types[field] = float
+    sizes = [len(columns[pattern_class]['line']) for pattern_class in pattern_classes]
+    bounds = np.cumsum([0] + sizes)
+    line = np.concatenate([np.frombuffer(columns[pattern_class]['line'], dtype=np.int64)
+                           for pattern_class in pattern_classes])
+    order = np.argsort(line, kind='stable')
+
+    data = {}
+    for field, ctor in field_types.items():
+        if ctor is str:
+            values = np.full(bounds[-1], np.nan, dtype=object)
+        elif ctor is int:
+            values = np.zeros(bounds[-1], dtype=np.int64)
+            mask = np.ones(bounds[-1], dtype=bool)
+        else:
+            values = np.full(bounds[-1], np.nan)
+        for pattern_class, begin, end in zip(pattern_classes, bounds[:-1], bounds[1:]):
+            if field == 'type':
+                values[begin:end] = pattern_class.type_str()
+                continue
+            if field not in columns[pattern_class]:
+                continue
+            values[begin:end] = columns[pattern_class][field]
+            if ctor is int:
+                mask[begin:end] = False
+        if ctor is int:
+            data[field] = pd.arrays.IntegerArray(values[order], mask[order])
+        else:
+            data[field] = values[order]
+    return pd.DataFrame(data)
+
+
+def _to_int64(series):
+    # Fast path of astype('Int64') for numpy int and float columns holding integer values
+    values = series.to_numpy()
+    if values.dtype.kind in 'iu':
+        return pd.Series(pd.arrays.IntegerArray(values.astype(np.int64), np.zeros(len(values), dtype=bool)),
+                         index=series.index, name=series.name)
+    if values.dtype.kind == 'f':
+        mask = np.isnan(values)
+        integers = np.where(mask, 0, values)
+        if np.isfinite(integers).all() and (np.trunc(integers) == integers).all():
+            return pd.Series(pd.arrays.IntegerArray(integers.astype(np.int64), mask), index=series.index,
+                             name=series.name)
+    return series.astype('Int64')
+
+
+def fill_ogs_context(df, single_process=False):
+    # single_process: all records belong to one mpi_process (e.g. parsed by rank), no sorting by process needed
     # Some columns that contain actual integer values are converted to float
     # See https://pandas.pydata.org/pandas-docs/stable/user_guide/integer_na.html
     # ToDo list of columns with integer values are known from regular expression
 
     int_columns = ['line', 'mpi_process', 'time_step', 'iteration_number', 'coupling_iteration',
                    'coupling_iteration_process', 'component', 'process']
+    # Parts of a log (e.g. chunks or selected time steps) may not contain the records for the context columns
+    for column in ['time_step', 'iteration_number']:
+        if column not in df:
+            df[column] = np.nan
     for column in df.columns:
-        if column in int_columns:
+        if column in int_columns and df[column].dtype != 'Int64':
             try:
-                df[column] = df[column].astype('Int64')
+                df[column] = _to_int64(df[column])
             except:
                 print('Could not convert column \'{0}\' to integer'.format(column))
 
     # Some logs do not contain information about time_step and iteration
     # The information must be collected by context (by surrounding log lines from same mpi_process)
-    # Logs are grouped by mpi_process to get only surrounding log lines from same mpi_process
+    # Only surrounding log lines from same mpi_process are taken into account: rows are (stably) sorted by
+    # mpi_process once, all fills are done on segments of the same mpi_process in that order
+    n = len(df)
+    if single_process:
+        order = np.arange(n)
+        segment_start = np.zeros(n, dtype=np.int64)
+        segment_end = np.full(n, n - 1, dtype=np.int64)
+    else:
+        order, segment_start, segment_end = mpi_process_segments(
+            df['mpi_process'].to_numpy(dtype=np.float64, na_value=np.nan))
+
+    def fill(column, method, limit=None):
+        indexer = fill_indexer(df[column].notna().to_numpy(), order, segment_start, segment_end, method, limit)
+        return pd.Series(pd.api.extensions.take(df[column].array, indexer, allow_fill=True), index=df.index,
+                         name=column)
 
     # There are log lines that give the current time step (when time step starts).
     # It can be assumed that in all following lines belong to this time steps, until next collected value of time step
-    df['time_step'] = df.groupby('mpi_process')[['time_step']].fillna(method='ffill').fillna(value=0)
+    df['time_step'] = fill('time_step', 'ffill').fillna(value=0)
 
     # Back fill, because iteration number can be found in logs at the END of the iteration
-    df['iteration_number'] = df.groupby('mpi_process')[['iteration_number']].fillna(method='bfill')
+    df['iteration_number'] = fill('iteration_number', 'bfill')
 
     # ToDo Comment
     if 'component' in df:
-        df['component'] = df.groupby('mpi_process')[['component']].fillna(value=-1)
+        df['component'] = df['component'].fillna(value=-1)
     # Forward fill because process will be printed in the beginning - applied to all subsequent
     if 'process' in df:
-        df['process'] = df.groupby('mpi_process')[['process']].fillna(method='bfill')
+        df['process'] = fill('process', 'bfill')
     # Attention - coupling iteration applies to successor line and to all other predecessors - it needs further processing for specific analysis
     if 'coupling_iteration_process' in df:
-        df['coupling_iteration_process'] = df.groupby('mpi_process')[['coupling_iteration_process']].fillna(
-            method='ffill',
-            limit=1)
+        df['coupling_iteration_process'] = fill('coupling_iteration_process', 'ffill', limit=1)
+    return df
+
+
+def compact_dataframe(df, float32=False, sparse=False, sparse_density=0.1):
+    """Reduces the memory of a parsed log DataFrame
+
+    type and message become categorical, integer columns get the smallest nullable integer dtype
+    that holds their values.
+
+    Parameters
+    ----------
+    df : `pandas.DataFrame`
+    float32 : `bool`, optional
+        stores the measured times (columns ending with _time, except step_start_time) as float32
+    sparse : `bool`, optional
+        stores float columns with a share of non-missing values below sparse_density as sparse columns
+    sparse_density : `float`, optional
+    """
+    df = df.copy()
+    for column in ['type', 'message']:
+        if column in df:
+            df[column] = df[column].astype('category')
+    for column in df.columns:
+        if str(df[column].dtype) != 'Int64' or df[column].isna().all():
+            continue
+        minimum, maximum = df[column].min(), df[column].max()
+        for dtype in ['Int8', 'Int16', 'Int32']:
+            info = np.iinfo(dtype.lower())
+            if info.min <= minimum and maximum <= info.max:
+                df[column] = df[column].astype(dtype)
+                break
+    if float32:
+        for column in df.columns:
+            if column.endswith('_time') and column != 'step_start_time' and df[column].dtype == np.float64:
+                df[column] = df[column].astype(np.float32)
+    if sparse:
+        for column in df.columns:
+            if df[column].dtype.kind == 'f' and len(df) > 0 and df[column].notna().mean() < sparse_density:
+                df[column] = df[column].astype(pd.SparseDtype(df[column].dtype, np.nan))
     return df
+
+
+def fill_ogs_context_chunks(records, chunksize, lookahead=100000):
+    """Consumes records lazily and yields DataFrames of at most chunksize records with filled context
+
+    The concatenation of all chunks equals fill_ogs_context applied to the DataFrame of all records, as long as
+    the values for back filling are found within lookahead records. To get there, time step and coupling iteration
+    process of the previous chunk are carried over, and records are only yielded when the values for back filling
+    (iteration number and process) are read. Records that wait for more than lookahead records are yielded with the
+    values read so far (e.g. a log without process), this bounds the buffered records. Every chunk has the column
+    component (-1 for records without component). Other columns that belong to record types not present in a chunk
+    are missing in that chunk.
+    """
+    buffer = []
+    start = 0
+    # Iteration number and process are back filled - records behind the last record that carries them (for the same
+    # mpi_process) get their values only from records that are not read yet
+    first_unresolved = {}
+    carry = pd.DataFrame(columns=['mpi_process', 'time_step', 'coupling_iteration_process'], dtype='float64')
+
+    def fill_chunks(size):
+        # All buffered records take part in filling, the first size records are returned in chunks
+        df = pd.DataFrame(buffer)
+        df.index = pd.RangeIndex(start, start + len(df))
+        raw_columns = list(df.columns)
+        raw_coupling_iteration_process = df['coupling_iteration_process'].copy() \
+            if 'coupling_iteration_process' in df else pd.Series(np.nan, index=df.index)
+        carried = carry.set_axis(pd.RangeIndex(-len(carry), 0))
+        df = fill_ogs_context(pd.concat([carried, df])[raw_columns + [c for c in carried if c not in raw_columns]])
+        # fill_ogs_context adds missing context columns
+        columns = raw_columns + [column for column in ['time_step', 'iteration_number'] if column not in raw_columns]
+        df = df.loc[start:start + size - 1, columns]
+        if 'component' not in df:
+            df['component'] = pd.array(np.full(len(df), -1), dtype='Int64')
+
+        last = df.assign(coupling_iteration_process=raw_coupling_iteration_process).groupby('mpi_process').tail(1)
+        carry_next = pd.DataFrame({column: last[column].astype('float64') for column in carry.columns})
+        carry_previous = carry[~carry['mpi_process'].isin(carry_next['mpi_process'])]
+        chunks = [df.iloc[begin:begin + chunksize] for begin in range(0, size, chunksize)]
+        return chunks, pd.concat([carry_previous, carry_next], ignore_index=True)
+
+    for number, record in enumerate(records):
+        buffer.append(record)
+        for column in ['iteration_number', 'process']:
+            if hasattr(record, column):
+                first_unresolved.pop((record.mpi_process, column), None)
+            else:
+                first_unresolved.setdefault((record.mpi_process, column), number)
+        if len(buffer) < chunksize:
+            continue
+        resolved = max(min(first_unresolved.values(), default=number + 1), number + 1 - lookahead) - start
+        resolved -= resolved % chunksize
+        # A flush builds the DataFrame of all buffered records, it releases at least half of them
+        if resolved > 0 and 2 * resolved >= len(buffer):
+            chunks, carry = fill_chunks(resolved)
+            del buffer[:resolved]
+            start += resolved
+            yield from chunks
+    if buffer:
+        chunks, carry = fill_chunks(len(buffer))
+        yield from chunks
+
+
+analysis_functions = {"by_time_step": analysis_time_step,
+                      "convergence_newton_iteration": analysis_convergence_newton_iteration,
+                      "convergence_coupling_iteration": analysis_convergence_coupling_iteration,
+                      "time_step_vs_iterations": time_step_vs_iterations,
+                      "analysis_simulation": analysis_simulation,
+                      "simulation_termination": analysis_simulation_termination}
@@ -0,0 +1,217 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from ogs6py.log_parser.log_parser import compression, mpi_processes, match_columns, parse_columns, text_lines
+from ogs6py.log_parser.common_ogs_analyses import columns_to_dataframe
+
+# Number of bytes hashed at the beginning of the log and in front of the already parsed part
+fingerprint_size = 65536
+
+
+def _fingerprint(file, start, stop):
+    file.seek(max(start, 0))
+    return hashlib.sha1(file.read(stop - max(start, 0))).hexdigest()
+
+
+# Number of bytes read at once when parsing the new part of a log
+block_size = 1 << 24
+
+
+def _blocks(file, start, stop):
+    # The bytes between start and stop in blocks of complete lines, only the last block may end within a line
+    file.seek(start)
+    rest = b''
+    position = start
+    while position < stop:
+        data = file.read(min(block_size, stop - position))
+        if not data:
+            break
+        position += len(data)
+        data = rest + data
+        end = data.rfind(b'\n') + 1 if position < stop else len(data)
+        rest = data[end:]
+        yield data[:end]
+    if rest:
+        yield rest
+
+
+def _line_end(file, start, stop):
+    # Offset behind the last newline between start and stop, start if there is none
+    position = stop
+    while position > start:
+        size = min(fingerprint_size, position - start)
+        file.seek(position - size)
+        index = file.read(size).rfind(b'\n')
+        if index >= 0:
+            return position - size + index + 1
+        position -= size
+    return start
+
+
+def _parse_bytes(file, start, stop, parallel_log, line_offset):
+    # The lines are parsed block by block, returns the DataFrame and the number of newlines
+    number_of_lines = 0
+
+    def lines():
+        nonlocal number_of_lines
+        for block in _blocks(file, start, stop):
+            number_of_lines += block.count(b'\n')
+            yield from text_lines(block)
+
+    df = columns_to_dataframe(match_columns(lines(), parallel_log, line_offset=line_offset))
+    return df, number_of_lines
+
+
+def _append(df, df_tail):
+    if df_tail.empty:
+        return df
+    if df.empty:
+        return df_tail
+    df = pd.concat([df, df_tail], ignore_index=True)
+    for column in df.columns:
+        # Columns that are missing in one of both parts are not Int64 after concatenation
+        if column in df_tail and str(df_tail[column].dtype) == 'Int64':
+            df[column] = df[column].astype('Int64')
+    return df
+
+
+# Keys and types of the meta data of a cache
+meta_types = {"parallel_log": bool, "parsed_offset": int, "number_of_lines": int, "path": str, "size": int,
+              "mtime_ns": int, "force_parallel": bool, "head_size": int, "head": str, "tail": str}
+
+
+def _valid_meta(meta):
+    return isinstance(meta, dict) and all(isinstance(meta.get(key), ctor) for key, ctor in meta_types.items())
+
+
+def _save_data(df, file_name):
+    # The columns are stored as plain arrays (npz without pickle): Int64 columns as values and mask,
+    # str columns as unicode arrays and mask, float columns as they are
+    arrays = {"columns": np.array(df.columns, dtype=str)}
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        if str(values.dtype) == 'Int64':
+            arrays[f"int_{i}"] = values.to_numpy(dtype=np.int64, na_value=0)
+            arrays[f"mask_{i}"] = values.isna().to_numpy()
+        elif values.dtype == object:
+            mask = values.isna().to_numpy()
+            arrays[f"str_{i}"] = np.array(values.where(~mask, '').tolist(), dtype=str)
+            arrays[f"mask_{i}"] = mask
+        else:
+            arrays[f"float_{i}"] = values.to_numpy(dtype=np.float64)
+    with open(file_name, 'wb') as file:
+        np.savez(file, **arrays)
+
+
+def _load_data(file_name):
+    data = {}
+    with np.load(file_name, allow_pickle=False) as arrays:
+        for i, column in enumerate(arrays["columns"].tolist()):
+            if f"int_{i}" in arrays:
+                data[column] = pd.arrays.IntegerArray(arrays[f"int_{i}"], arrays[f"mask_{i}"])
+            elif f"str_{i}" in arrays:
+                values = arrays[f"str_{i}"].astype(object)
+                values[arrays[f"mask_{i}"]] = np.nan
+                data[column] = values
+            else:
+                data[column] = arrays[f"float_{i}"]
+    return pd.DataFrame(data)
+
+
+def cache_files(file_name, cache_dir=None):
+    """Returns the names of the data and the meta data file of the cache for a log file
+
+    By default, the cache is placed in the directory .ogs6py_cache next to the log file. The data is stored
+    as npz file of the columns, loading it does not unpickle objects.
+    """
+    file_name = os.path.abspath(file_name)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(file_name), ".ogs6py_cache")
+    key = hashlib.sha1(file_name.encode()).hexdigest()
+    return os.path.join(cache_dir, f"{key}.npz"), os.path.join(cache_dir, f"{key}.json")
+
+
+def parse_columns_cached(file_name, cache_dir=None, force_parallel=False):
+    """Parses the log file into a DataFrame (see columns_to_dataframe) and caches the result on disk
+
+    The cache is keyed by path, size, modification time and fingerprints of the content.
+    If the log file only grew since it has been cached (e.g. the simulation is still running),
+    only the new lines are parsed and the cache is extended.
+    Only complete lines are cached, an incomplete last line is parsed on each call.
+    Compressed logs are parsed entirely whenever they changed.
+
+    Parameters
+    ----------
+    file_name : `str`
+    cache_dir : `str`, optional
+        directory of the cache files
+    force_parallel : `bool`, optional
+    """
+    data_file, meta_file = cache_files(file_name, cache_dir)
+    stat = os.stat(file_name)
+    try:
+        with open(meta_file) as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        meta = None
+    if not _valid_meta(meta):
+        meta = None
+
+    compressed = compression(file_name) is not None
+    with open(file_name, 'rb') as file:
+        df = None
+        if (meta is not None and meta["force_parallel"] == force_parallel and stat.st_size >= meta["parsed_offset"]
+                and meta["head"] == _fingerprint(file, 0, meta["head_size"])):
+            parsed_offset = meta["parsed_offset"]
+            unchanged = meta["size"] == stat.st_size and meta["mtime_ns"] == stat.st_mtime_ns
+            if unchanged or not compressed and meta["tail"] == _fingerprint(file, parsed_offset - fingerprint_size, parsed_offset):
+                try:
+                    df = _load_data(data_file)
+                except Exception:
+                    # missing or corrupt, the log is parsed again
+                    df = None
+        if df is None:
+            unchanged = False
+            meta = {"parallel_log": force_parallel or mpi_processes(file_name) > 1, "parsed_offset": 0,
+                    "number_of_lines": 0}
+            df = pd.DataFrame()
+
+        # Only complete lines go into the cache
+        complete = stat.st_size - meta["parsed_offset"] if compressed else \
+            _line_end(file, meta["parsed_offset"], stat.st_size) - meta["parsed_offset"]
+        if not unchanged and complete > 0:
+            if compressed:
+                df = columns_to_dataframe(parse_columns(file_name, force_parallel=force_parallel))
+                number_of_lines = 0
+            else:
+                df_new, number_of_lines = _parse_bytes(file, meta["parsed_offset"], meta["parsed_offset"] + complete,
+                                                       meta["parallel_log"], meta["number_of_lines"])
+                df = _append(df, df_new)
+            parsed_offset = meta["parsed_offset"] + complete
+            meta.update({"path": os.path.abspath(file_name), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                         "force_parallel": force_parallel, "head_size": min(fingerprint_size, parsed_offset),
+                         "head": _fingerprint(file, 0, min(fingerprint_size, parsed_offset)),
+                         "tail": _fingerprint(file, parsed_offset - fingerprint_size, parsed_offset),
+                         "parsed_offset": parsed_offset,
+                         "number_of_lines": meta["number_of_lines"] + number_of_lines})
+            os.makedirs(os.path.dirname(data_file), exist_ok=True)
+            _save_data(df, data_file + ".tmp")
+            os.replace(data_file + ".tmp", data_file)
+            with open(meta_file + ".tmp", 'w') as meta_out:
+                json.dump(meta, meta_out)
+            os.replace(meta_file + ".tmp", meta_file)
+        if not compressed and meta["parsed_offset"] < stat.st_size:
+            df = _append(df, _parse_bytes(file, meta["parsed_offset"], stat.st_size, meta["parallel_log"],
+                                          meta["number_of_lines"])[0])
+    return df
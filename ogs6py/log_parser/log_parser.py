@@ -5,9 +5,20 @@
 #              See accompanying file LICENSE.txt or
 #              http://www.opengeosys.org/project/license
 
+import array
+import gzip
+import io
+import itertools
+import locale
+import lzma
+import mmap
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from ogs6py.ogs_regexes.ogs_regexes import ogs_regexes
 
+array_typecodes = {int: 'q', float: 'd'}
+
 
 def try_match_parallel_line(line: str, line_nr: int, regex: re.Pattern, pattern_class):
     if match := regex.match(line):
@@ -29,48 +40,395 @@ def try_match_serial_line(line: str, line_nr: int, regex: re.Pattern, pattern_cl
     return None
 
 
+# Magic numbers at the beginning of compressed files
+compression_magic_numbers = {'gzip': b'\x1f\x8b', 'xz': b'\xfd7zXZ\x00', 'zstd': b'\x28\xb5\x2f\xfd'}
+
+
+def compression(file_name):
+    """Returns 'gzip', 'xz' or 'zstd' for a compressed log file, None for plain text"""
+    with open(file_name, 'rb') as file:
+        head = file.read(6)
+    for name, magic_number in compression_magic_numbers.items():
+        if head.startswith(magic_number):
+            return name
+    return None
+
+
+def open_log(file_name):
+    """Opens a log file in text mode, gzip, xz and zstd compressed logs are decompressed while reading
+
+    zstd needs the optional package zstandard.
+    """
+    file_compression = compression(file_name)
+    if file_compression == 'gzip':
+        return gzip.open(file_name, 'rt')
+    if file_compression == 'xz':
+        return lzma.open(file_name, 'rt')
+    if file_compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError as err:
+            raise RuntimeError('Reading zstd compressed logs requires the package zstandard.') from err
+        stream = zstandard.ZstdDecompressor().stream_reader(open(file_name, 'rb'), read_across_frames=True,
+                                                             closefd=True)
+        return io.TextIOWrapper(stream)
+    return open(file_name)
+
+
+def open_log_writer(file_name, compress=None):
+    """Opens a log file for writing text, compress can be "gzip", "xz" or "zstd" (needs the package zstandard)"""
+    if compress is None:
+        return open(file_name, 'w')
+    if compress == 'gzip':
+        return gzip.open(file_name, 'wt')
+    if compress == 'xz':
+        return lzma.open(file_name, 'wt')
+    if compress == 'zstd':
+        try:
+            import zstandard
+        except ImportError as err:
+            raise RuntimeError('Writing zstd compressed logs requires the package zstandard.') from err
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(open(file_name, 'wb'), closefd=True))
+    raise RuntimeError(f'Unknown compression {compress}, available: gzip, xz, zstd.')
+
+
+def read_header(lines, force_parallel=False):
+    """Decides from the header lines of a stream of log lines whether the log is from an MPI run
+
+    For logs that can not be opened twice (pipes, growing files), see mpi_processes.
+
+    Returns
+    -------
+    parallel_log : `bool`
+    lines : iterator
+        all lines, including the header lines already read
+    """
+    lines = iter(lines)
+    header = []
+    for line in lines:
+        header.append(line)
+        if not re.search("info: This is OpenGeoSys-6 version|info: OGS started on", line):
+            break
+    # the first line after the header is not counted
+    occurrences = len(header) - 1 if header and not re.search(
+        "info: This is OpenGeoSys-6 version|info: OGS started on", header[-1]) else len(header)
+    parallel_log = force_parallel or int(occurrences / 2) > 1
+    return parallel_log, itertools.chain(header, lines)
+
+
 def mpi_processes(file_name):
     occurrences = 0
-    with open(file_name) as file:
+    with open_log(file_name) as file:
         lines = iter(file)
         # There is no synchronisation barrier between both info, we count both and divide
-        while re.search("info: This is OpenGeoSys-6 version|info: OGS started on", next(lines)):
+        while re.search("info: This is OpenGeoSys-6 version|info: OGS started on", next(lines, '')):
             occurrences = occurrences + 1
         processes = int(occurrences / 2)
         return processes
 
 
-def parse_file(file_name, maximum_lines=None, force_parallel=False):
-    ogs_res = ogs_regexes()
-    parallel_log = force_parallel or mpi_processes(file_name) > 1
+def literal_prefix(regex: str) -> str:
+    """Returns the literal text every match of ``regex`` starts with.
 
+    An empty string is returned if the pattern has no such prefix, e.g. because
+    it starts with a character class or contains a top level alternation.
+    """
+    depth = 0
+    escaped = False
+    in_class = False
+    for c in regex:
+        if escaped:
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        elif in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == '|' and depth == 0:
+            return ''
+
+    prefix = []
+    i = 0
+    while i < len(regex):
+        if regex[i] == '\\':
+            if i + 1 == len(regex) or regex[i + 1].isalnum():
+                break
+            char, step = regex[i + 1], 2
+        elif regex[i] in '.^$*+?{}[]()|':
+            break
+        else:
+            char, step = regex[i], 1
+        # A quantified character is optional (or repeated), so it can not be part of the prefix
+        if regex[i + step:i + step + 1] in ('*', '?', '{'):
+            break
+        prefix.append(char)
+        i += step
+    return ''.join(prefix)
+
+
+def compile_patterns(parallel_log, regexes=None, pattern_classes=None):
+    """Compiles the OGS log patterns and a dispatcher that routes a line to its candidates.
+
+    The dispatcher is a single alternation of the literal prefixes of all patterns
+    (longest first). A line that matches none of the prefixes can not match any
+    pattern and is skipped with one regex call. For a line that matches, only the
+    patterns whose prefix is compatible are tried, in the order of ``ogs_regexes()``.
+
+    Returns
+    -------
+    dispatcher : `re.Pattern` or `None`
+    candidates : `list`
+        candidate (regex, pattern_class) lists indexed by the group of the dispatcher
+        that matched. Index 0 holds the patterns without literal prefix, that are
+        tried for every line.
+    try_match : `function`
+
+    If pattern_classes is given, only the patterns of these record types are compiled,
+    lines of all other record types are skipped by the dispatcher.
+    """
+    if regexes is None:
+        regexes = ogs_regexes()
+    if pattern_classes is not None:
+        regexes = [(k, v) for k, v in regexes if v in pattern_classes]
     if parallel_log:
         process_regex = '\\[(\\d+)\\]\\ '
+        dispatch_process_regex = '\\[\\d+\\]\\ '
         try_match = try_match_parallel_line
     else:
         process_regex = ''
+        dispatch_process_regex = ''
         try_match = try_match_serial_line
 
-    def compile_re_fn(mpi_process_regex):
-        return lambda regex: re.compile(mpi_process_regex + regex)
+    patterns = [(re.compile(process_regex + k), v) for k, v in regexes]
+    prefixes = [literal_prefix(k) for k, _ in regexes]
+    distinct_prefixes = sorted({prefix for prefix in prefixes if prefix}, key=len, reverse=True)
+
+    candidates = [[pattern for pattern, prefix in zip(patterns, prefixes) if not prefix]]
+    for distinct_prefix in distinct_prefixes:
+        candidates.append([pattern for pattern, prefix in zip(patterns, prefixes)
+                           if distinct_prefix.startswith(prefix)])
 
-    compile_re = compile_re_fn(process_regex)
-    patterns = [(compile_re(k), v) for k, v in ogs_res]
+    dispatcher = None
+    if distinct_prefixes:
+        alternation = '|'.join('({})'.format(re.escape(prefix)) for prefix in distinct_prefixes)
+        dispatcher = re.compile('{}(?:{})'.format(dispatch_process_regex, alternation))
+    return dispatcher, candidates, try_match
+
+
+def match_lines(lines, parallel_log, maximum_lines=None, pattern_classes=None):
+    """Yields the records of an iterable of log lines, line numbers are counted from 1"""
+    dispatcher, candidates, try_match = compile_patterns(parallel_log, pattern_classes=pattern_classes)
+    no_candidates = candidates[0]
 
     number_of_lines_read = 0
-    with open(file_name) as file:
-        lines = iter(file)
-        records = list()
-        for line in lines:
-            number_of_lines_read += 1
+    for line in lines:
+        number_of_lines_read += 1
+
+        if (maximum_lines is not None) and (number_of_lines_read > maximum_lines):
+            break
+
+        match = dispatcher.match(line) if dispatcher is not None else None
+        for key, value in (candidates[match.lastindex] if match else no_candidates):
+            if r := try_match(line, number_of_lines_read, key, value):
+                yield value(*r)
+                break
+
+
+def iter_records(file_name, maximum_lines=None, force_parallel=False, pattern_classes=None):
+    """Lazily parses the log file and yields one record after another"""
+    parallel_log = force_parallel or mpi_processes(file_name) > 1
+    with open_log(file_name) as file:
+        yield from match_lines(file, parallel_log, maximum_lines=maximum_lines, pattern_classes=pattern_classes)
+
+
+def match_columns(lines, parallel_log, maximum_lines=None, line_offset=0, pattern_classes=None):
+    """Parses an iterable of log lines into columns instead of records
+
+    Values are appended directly to one typed array per field and record type,
+    no record object is created per line.
+
+    Returns
+    -------
+    columns : `dict`
+        maps each record type (pattern class) to a `dict` of field name to
+        `array.array` (int and float fields) or `list` (str fields).
+        The type string is not stored, it is given by the record type.
+    """
+    dispatcher, candidates, _ = compile_patterns(parallel_log, pattern_classes=pattern_classes)
+    no_candidates = candidates[0]
+
+    columns = {}
+    appenders = {}
+    for candidate in candidates:
+        for regex, pattern_class in candidate:
+            if regex in appenders:
+                continue
+            fields = [('line', int), ('mpi_process', int)] + list(pattern_class.__annotations__.items())
+            pattern_columns = columns.setdefault(pattern_class, {
+                field: array.array(array_typecodes[ctor]) if ctor in array_typecodes else []
+                for field, ctor in fields})
+            group_appenders = [(pattern_columns[field].append, ctor) for field, ctor in fields[1 if parallel_log else 2:]]
+            appenders[regex] = (pattern_columns['line'].append, pattern_columns['mpi_process'].append,
+                                group_appenders)
+
+    number_of_lines_read = 0
+    for line in lines:
+        number_of_lines_read += 1
+
+        if (maximum_lines is not None) and (number_of_lines_read > maximum_lines):
+            break
+
+        match = dispatcher.match(line) if dispatcher is not None else None
+        for regex, _ in (candidates[match.lastindex] if match else no_candidates):
+            if line_match := regex.match(line):
+                append_line, append_mpi_process, group_appenders = appenders[regex]
+                append_line(line_offset + number_of_lines_read)
+                if not parallel_log:
+                    append_mpi_process(0)
+                for (append, ctor), s in zip(group_appenders, line_match.groups()):
+                    append(ctor(s))
+                break
+
+    return {pattern_class: pattern_columns for pattern_class, pattern_columns in columns.items()
+            if len(pattern_columns['line']) > 0}
+
+
+def parse_columns(file_name, maximum_lines=None, force_parallel=False, pattern_classes=None):
+    """Parses the log file into columns, see match_columns"""
+    parallel_log = force_parallel or mpi_processes(file_name) > 1
+    with open_log(file_name) as file:
+        return match_columns(file, parallel_log, maximum_lines=maximum_lines, pattern_classes=pattern_classes)
+
 
-            if (maximum_lines is not None) and (maximum_lines > number_of_lines_read):
+def text_lines(data):
+    """Iterates over the lines of raw bytes from a log file, as if the file was opened in text mode"""
+    return io.StringIO(data.decode(locale.getpreferredencoding(False)), newline=None)
+
+
+def parse_byte_range(file_name, start, stop, parallel_log, pattern_classes=None):
+    """Parses the lines between two byte offsets, which have to be at the beginning of a line
+
+    Returns
+    -------
+    records : `list`
+        line numbers are counted from 1 at start
+    number_of_lines : `int`
+        number of newlines in the byte range
+    """
+    with open(file_name, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        data = mapped_file[start:stop]
+    return list(match_lines(text_lines(data), parallel_log, pattern_classes=pattern_classes)), data.count(b'\n')
+
+
+def line_aligned_offsets(file_name, number_of_chunks):
+    """Splits a file into byte ranges, each starting at the beginning of a line"""
+    size = os.path.getsize(file_name)
+    offsets = [0]
+    with open(file_name, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        for i in range(1, number_of_chunks):
+            newline = mapped_file.find(b'\n', max(offsets[-1], i * size // number_of_chunks))
+            if newline == -1:
                 break
+            offsets.append(newline + 1)
+    offsets.append(size)
+    return [(start, stop) for start, stop in zip(offsets[:-1], offsets[1:]) if start < stop]
+
 
-            for key, value in patterns:
-                if r := try_match(line, number_of_lines_read, key, value):
-                    records.append(value(*r))
-                    break
+def parse_file(file_name, maximum_lines=None, force_parallel=False, workers=None, pattern_classes=None):
+    """Parses the log file
 
+    Parameters
+    ----------
+    file_name : `str`
+    maximum_lines : `int`, optional
+    force_parallel : `bool`, optional
+        Only for MPI execution with 1 process the parser needs to be told that the log is from a parallel run
+    workers : `int`, optional
+        Number of processes that parse newline aligned chunks of the memory mapped file.
+        The records are identical to the serial parse.
+        Compressed logs are always parsed serially.
+    pattern_classes : `list`, optional
+        parses only the records of these types (see compile_patterns)
+    """
+    if (workers is None or workers < 2 or maximum_lines is not None or os.path.getsize(file_name) == 0
+            or compression(file_name) is not None):
+        return list(iter_records(file_name, maximum_lines=maximum_lines, force_parallel=force_parallel,
+                                 pattern_classes=pattern_classes))
+
+    parallel_log = force_parallel or mpi_processes(file_name) > 1
+    byte_ranges = line_aligned_offsets(file_name, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = executor.map(parse_byte_range, *zip(*[(file_name, start, stop, parallel_log, pattern_classes)
+                                                         for start, stop in byte_ranges]))
+        records = []
+        line_offset = 0
+        for chunk_records, number_of_lines in chunks:
+            for record in chunk_records:
+                record.line += line_offset
+            records.extend(chunk_records)
+            line_offset += number_of_lines
     return records
 
+
+def split_by_rank(file_name):
+    """Splits an MPI log into per rank streams in one pass
+
+    Returns
+    -------
+    ranks : `dict`
+        maps each rank to the byte offsets and line numbers (both `array.array`)
+        of the lines starting with its "[rank] " prefix
+    """
+    regex = re.compile(rb'^\[(\d+)\] ', re.MULTILINE)
+    ranks = {}
+    with open(file_name, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        line = 1
+        position = 0
+        for match in regex.finditer(mapped_file):
+            line += mapped_file[position:match.start()].count(b'\n')
+            position = match.start()
+            offsets, line_numbers = ranks.setdefault(int(match.group(1)), (array.array('q'), array.array('q')))
+            offsets.append(position)
+            line_numbers.append(line)
+    return ranks
+
+
+def parse_rank(file_name, offsets, line_numbers):
+    """Parses the lines of one rank of an MPI log into columns (see match_columns)"""
+    with open(file_name, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        data = b''.join(mapped_file[offset:mapped_file.find(b'\n', offset) + 1 or len(mapped_file)]
+                        for offset in offsets)
+    columns = match_columns(text_lines(data), True)
+    for pattern_columns in columns.values():
+        # match_columns counts the lines of the rank stream, these are mapped to the lines of the log
+        pattern_columns['line'] = array.array('q', (line_numbers[i - 1] for i in pattern_columns['line']))
+    return columns
+
+
+def parse_columns_by_rank(file_name, workers=None, force_parallel=False):
+    """Parses an MPI log rank by rank, each rank in its own worker process
+
+    The interleaved log is split by the "[rank] " prefix in one pass (split_by_rank),
+    afterwards the ranks are parsed independently (parse_rank).
+    A serial log is parsed as rank 0.
+
+    Returns
+    -------
+    columns : `dict`
+        maps each rank to its columns (see match_columns)
+    """
+    if not (force_parallel or mpi_processes(file_name) > 1):
+        return {0: parse_columns(file_name)}
+    if compression(file_name) is not None:
+        raise RuntimeError('Parsing rank by rank is not available for compressed logs.')
+    ranks = split_by_rank(file_name)
+    if workers is None or workers < 2:
+        return {rank: parse_rank(file_name, *ranks[rank]) for rank in sorted(ranks)}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {rank: executor.submit(parse_rank, file_name, *ranks[rank]) for rank in sorted(ranks)}
+        return {rank: future.result() for rank, future in futures.items()}
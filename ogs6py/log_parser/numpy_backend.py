@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import numpy as np
+
+'''
+Backend of the log parser without pandas. The parsed log is given as NumPy structured arrays (one per record type)
+or as a table, a dict of column name to NumPy array of all records ordered by line. In the table integer columns are
+float64 with NaN for missing values (as in a DataFrame without nullable integer dtypes), str columns have dtype
+object. The analyses of common_ogs_analyses are implemented on the table, the groups are aggregated with NumPy or,
+with the optional package polars, as a polars DataFrame.
+'''
+
+dtypes = {int: np.int64, float: np.float64, str: object}
+
+int_columns = ['line', 'mpi_process', 'time_step', 'iteration_number', 'coupling_iteration',
+               'coupling_iteration_process', 'component', 'process']
+
+
+def columns_to_arrays(columns):
+    """Converts the columns of log_parser.parse_columns to one structured array per record type
+
+    Returns
+    -------
+    arrays : `dict`
+        maps the name of the record type (e.g. "TimeStepStartTime") to a structured array with the fields
+        line, mpi_process and the fields of the record type
+    """
+    arrays = {}
+    for pattern_class, pattern_columns in columns.items():
+        fields = [('line', int), ('mpi_process', int)] + list(pattern_class.__annotations__.items())
+        array = np.empty(len(pattern_columns['line']), dtype=[(field, dtypes[ctor]) for field, ctor in fields])
+        for field, ctor in fields:
+            array[field] = pattern_columns[field] if ctor is str else np.asarray(pattern_columns[field])
+        arrays[pattern_class.__name__] = array
+    return arrays
+
+
+def parse_arrays(file_name, force_parallel=False, pattern_classes=None):
+    """Parses the log file into one structured array per record type, see columns_to_arrays"""
+    from ogs6py.log_parser.log_parser import parse_columns
+    return columns_to_arrays(parse_columns(file_name, force_parallel=force_parallel, pattern_classes=pattern_classes))
+
+
+def arrays_to_table(arrays):
+    """Merges the structured arrays of all record types into one table ordered by line"""
+    arrays = [array for array in arrays.values() if len(array) > 0]
+    if not arrays:
+        return {}
+    fields = {}
+    for array in arrays:
+        for field in array.dtype.names:
+            fields.setdefault(field, array.dtype[field])
+    line = np.concatenate([array['line'] for array in arrays])
+    order = np.argsort(line, kind='stable')
+    table = {}
+    for field, dtype in fields.items():
+        parts = []
+        for array in arrays:
+            if field in array.dtype.names:
+                parts.append(array[field].astype(object if dtype == object else np.float64))
+            else:
+                parts.append(np.full(len(array), None if dtype == object else np.nan,
+                                     dtype=object if dtype == object else np.float64))
+        table[field] = np.concatenate(parts)[order]
+    return table
+
+
+def fill_indexer(valid, order, segment_start, segment_end, method, limit=None):
+    """Position (in the original order) from which each row takes its value in a forward or backward fill,
+    -1 if it stays empty
+
+    Positions are propagated with maximum/minimum.accumulate over the rows sorted by mpi_process,
+    values must not be taken across the boundaries of the mpi_process segments.
+    """
+    n = len(valid)
+    position = np.arange(n)
+    valid_sorted = valid[order]
+    if method == 'ffill':
+        source = np.maximum.accumulate(np.where(valid_sorted, position, -1))
+        empty = source < segment_start
+    else:
+        source = np.minimum.accumulate(np.where(valid_sorted, position, n)[::-1])[::-1]
+        empty = source > segment_end
+    if limit is not None:
+        empty |= np.abs(position - source) > limit
+    indexer = np.empty(n, dtype=np.int64)
+    indexer[order] = np.where(empty, -1, order[np.clip(source, 0, n - 1)])
+    return indexer
+
+
+def mpi_process_segments(mpi_process):
+    """Order of the rows (stably sorted by mpi_process) and first and last position of the segment of each row"""
+    n = len(mpi_process)
+    order = np.argsort(mpi_process, kind='stable')
+    boundary = np.flatnonzero(np.diff(mpi_process[order]) != 0) + 1
+    starts = np.concatenate([[0], boundary])
+    ends = np.concatenate([boundary, [n]]) - 1
+    lengths = ends - starts + 1
+    return order, np.repeat(starts, lengths), np.repeat(ends, lengths)
+
+
+def _fill(values, segments, method, limit=None):
+    indexer = fill_indexer(~np.isnan(values), *segments, method, limit)
+    return np.where(indexer >= 0, values[np.clip(indexer, 0, None)], np.nan)
+
+
+def fill_context(table):
+    """fill_ogs_context on a table (in place)"""
+    if not table:
+        return table
+    n = len(table['line'])
+    for column in ['time_step', 'iteration_number']:
+        if column not in table:
+            table[column] = np.full(n, np.nan)
+    segments = mpi_process_segments(table['mpi_process'])
+    table['time_step'] = np.nan_to_num(_fill(table['time_step'], segments, 'ffill'), nan=0.0)
+    table['iteration_number'] = _fill(table['iteration_number'], segments, 'bfill')
+    if 'component' in table:
+        table['component'] = np.nan_to_num(table['component'], nan=-1.0)
+    if 'process' in table:
+        table['process'] = _fill(table['process'], segments, 'bfill')
+    if 'coupling_iteration_process' in table:
+        table['coupling_iteration_process'] = _fill(table['coupling_iteration_process'], segments, 'ffill', limit=1)
+    return table
+
+
+def parse_table(file_name, force_parallel=False, pattern_classes=None):
+    """Parses the log file into a table with filled context"""
+    return fill_context(arrays_to_table(parse_arrays(file_name, force_parallel=force_parallel,
+                                                     pattern_classes=pattern_classes)))
+
+
+def _check_input(table, interest, context):
+    diff = set(interest) - set(table)
+    if diff:
+        raise Exception('Column(s) of interest ({}) is/are not present in table'.format(','.join(diff)))
+    diff = set(context) - set(table)
+    if diff:
+        raise Exception('Column(s) of context ({}) is/are not present in table'.format(','.join(diff)))
+
+
+def analysis_spec(table, name):
+    """Rows, group keys and aggregations of an analysis of common_ogs_analyses
+
+    Returns
+    -------
+    data : `dict`
+        columns of the rows taking part in the analysis (keys and values)
+    keys : `list`
+    aggregations : `list`
+        (column, "mean"/"sum"/"max") in the order of the result
+    required : `list`
+        groups without values in all of these columns are dropped
+    """
+    rows = None
+    columns = dict(table)
+    if name == 'by_time_step':
+        interest1 = ['output_time', 'time_step_solution_time']
+        interest2 = ['assembly_time', 'dirichlet_time', 'linear_solver_time']
+        keys = ['mpi_process', 'time_step']
+        _check_input(table, interest1 + interest2, keys)
+        aggregations = [(column, 'mean') for column in interest1] + [(column, 'sum') for column in interest2]
+        required = interest1
+    elif name == 'time_step_vs_iterations':
+        keys = ['time_step']
+        _check_input(table, ['iteration_number'], keys)
+        aggregations = [('iteration_number', 'max')]
+        required = ['iteration_number']
+    elif name == 'analysis_simulation':
+        keys = ['mpi_process']
+        _check_input(table, ['execution_time'], keys)
+        aggregations = [('execution_time', 'mean')]
+        required = ['execution_time']
+    elif name in ('convergence_newton_iteration', 'convergence_coupling_iteration'):
+        interest = ['dx', 'dx_x', 'x']
+        aggregations = [(column, 'mean') for column in interest]
+        required = interest
+        segments = mpi_process_segments(table['mpi_process']) if table else None
+        if name == 'convergence_newton_iteration' and 'coupling_iteration' in table:
+            keys = ['time_step', 'coupling_iteration', 'process', 'iteration_number']
+            if 'component' in table:
+                keys.append('component')
+            _check_input(table, interest, keys + ['coupling_iteration_process'])
+            columns['coupling_iteration'] = _fill(table['coupling_iteration'], segments, 'bfill')
+            rows = np.isnan(table['coupling_iteration_process']) & ~np.isnan(table['x'])
+        elif name == 'convergence_newton_iteration':
+            keys = ['time_step', 'process', 'iteration_number', 'component']
+            _check_input(table, interest, keys)
+        else:
+            keys = ['time_step', 'coupling_iteration', 'coupling_iteration_process']
+            if 'component' in table:
+                keys.append('component')
+            _check_input(table, interest, keys)
+            columns['coupling_iteration'] = _fill(table['coupling_iteration'], segments, 'ffill')
+            rows = ~np.isnan(table['coupling_iteration_process']) & ~np.isnan(table['x'])
+    else:
+        raise Exception('Analysis ({}) is not available'.format(name))
+    needed = keys + [column for column, _ in aggregations]
+    data = {column: columns[column] if rows is None else columns[column][rows] for column in needed}
+    return data, keys, aggregations, required
+
+
+def _aggregate_numpy(data, keys, aggregations, required):
+    valid = np.ones(len(data[keys[0]]), dtype=bool)
+    for key in keys:
+        valid &= ~np.isnan(data[key])
+    stacked = np.column_stack([data[key][valid] for key in keys])
+    unique, inverse = np.unique(stacked, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    n = len(unique)
+    result = {key: unique[:, i].astype(np.int64) for i, key in enumerate(keys)}
+    keep = np.zeros(n, dtype=bool)
+    for column, aggfunc in aggregations:
+        values = data[column][valid].astype(np.float64)
+        present = ~np.isnan(values)
+        counts = np.bincount(inverse[present], minlength=n)
+        if aggfunc == 'max':
+            maxima = np.full(n, -np.inf)
+            np.maximum.at(maxima, inverse[present], values[present])
+            aggregated = np.where(counts > 0, maxima, np.nan)
+        else:
+            sums = np.bincount(inverse[present], weights=values[present], minlength=n)
+            if aggfunc == 'sum':
+                aggregated = sums
+            else:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    aggregated = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        if column in required:
+            keep |= counts > 0
+        result[column] = aggregated
+    return {column: values[keep] for column, values in result.items()}
+
+
+def analysis(table, name):
+    """Runs an analysis of common_ogs_analyses (by name) on a table with filled context
+
+    Returns
+    -------
+    result : `numpy.ndarray`
+        structured array of the group keys and the aggregated values, ordered by the keys.
+        Like the pandas analyses, groups without any value of interest are dropped.
+    """
+    data, keys, aggregations, required = analysis_spec(table, name)
+    if len(data[keys[0]]) == 0:
+        aggregated = {column: np.empty(0) for column in keys + [column for column, _ in aggregations]}
+    else:
+        aggregated = _aggregate_numpy(data, keys, aggregations, required)
+    if name == 'time_step_vs_iterations':
+        aggregated['iteration_number'] = aggregated['iteration_number'].astype(np.int64)
+    result = np.empty(len(aggregated[keys[0]]), dtype=[(column, np.int64 if column in keys else
+                                                         aggregated[column].dtype) for column in aggregated])
+    for column, values in aggregated.items():
+        result[column] = values
+    if len(result) == 0:
+        raise Exception('The values of {} are not associated to all of {}. Call or see fill_ogs_context'.format(
+            ','.join(required), ','.join(keys)))
+    return result
+
+
+def _import_polars():
+    try:
+        import polars
+    except ImportError as err:
+        raise RuntimeError('The polars backend requires the package polars.') from err
+    return polars
+
+
+def table_to_polars(table):
+    """Converts a table to a polars DataFrame, missing values become null, integer columns Int64"""
+    pl = _import_polars()
+    series = []
+    for column, values in table.items():
+        if values.dtype == object:
+            series.append(pl.Series(column, values.tolist(), dtype=pl.Utf8))
+        else:
+            s = pl.Series(column, values, nan_to_null=True)
+            series.append(s.cast(pl.Int64) if column in int_columns else s)
+    return pl.DataFrame(series)
+
+
+def analysis_polars(table, name):
+    """Runs an analysis as analysis(), the groups are aggregated by polars, a polars DataFrame is returned"""
+    pl = _import_polars()
+    data, keys, aggregations, required = analysis_spec(table, name)
+    df = table_to_polars(data).drop_nulls(subset=keys)
+    expressions = {'mean': lambda column: pl.col(column).mean(), 'sum': lambda column: pl.col(column).sum(),
+                   'max': lambda column: pl.col(column).max()}
+    result = df.group_by(keys).agg(
+        [expressions[aggfunc](column) for column, aggfunc in aggregations] +
+        [pl.col(column).is_not_null().sum().alias('_count_' + column) for column in required])
+    result = result.filter(pl.any_horizontal([pl.col('_count_' + column) > 0 for column in required]))
+    return result.drop(['_count_' + column for column in required]).sort(keys)
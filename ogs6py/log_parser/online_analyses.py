@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import abc
+import locale
+import time
+from collections import deque
+
+import pandas as pd
+
+from ogs6py.log_parser.log_parser import compression, match_lines, read_header
+
+'''
+Incremental versions of the analyses by_time_step, convergence_newton_iteration and time_step_vs_iterations
+(see common_ogs_analyses) for logs of running simulations. Records are consumed one after another, e.g. from
+tail_records, each record is processed with constant work. The context is filled on the fly as in fill_ogs_context:
+time step is forward filled, iteration number and process are back filled per mpi_process (records waiting for
+back filling are kept until the values are read).
+With a window of K time steps only the aggregates of the last K time steps are kept, older time steps are dropped.
+For complete logs and without window the results equal the ones of the analysis functions.
+'''
+
+
+def follow_lines(file_name, poll_interval=1.0, idle_timeout=None):
+    """Yields the lines of a growing log file, waits for new lines at the end of the file
+
+    A line is yielded when it is complete (ends with a newline).
+
+    Parameters
+    ----------
+    file_name : `str`
+    poll_interval : `float`, optional
+        seconds to wait before reading again at the end of the file
+    idle_timeout : `float`, optional
+        stops after the file did not grow for idle_timeout seconds, an incomplete last line is yielded then.
+        If None, the file is followed until the generator is closed.
+    """
+    if compression(file_name) is not None:
+        raise RuntimeError('Following compressed logs is not available.')
+    encoding = locale.getpreferredencoding(False)
+    partial = b''
+    idle_since = time.monotonic()
+    with open(file_name, 'rb') as file:
+        while True:
+            data = file.readline()
+            if data:
+                idle_since = time.monotonic()
+                partial += data
+                if partial.endswith(b'\n'):
+                    # same line endings as for a file in text mode
+                    yield partial.decode(encoding).replace('\r\n', '\n')
+                    partial = b''
+                continue
+            if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                if partial:
+                    yield partial.decode(encoding)
+                return
+            time.sleep(poll_interval)
+
+
+def tail_records(file_name, poll_interval=1.0, idle_timeout=None, force_parallel=False):
+    """Yields the records of a growing log file (see follow_lines)
+
+    Whether the log is from an MPI run is decided from the header lines, as in mpi_processes.
+    """
+    parallel_log, lines = read_header(follow_lines(file_name, poll_interval=poll_interval,
+                                                   idle_timeout=idle_timeout), force_parallel)
+    yield from match_lines(lines, parallel_log)
+
+
+class OnlineAnalysis(abc.ABC):
+    """Base of the incremental analyses, keeps the time step context per mpi_process and the window
+
+    Parameters
+    ----------
+    window : `int`, optional
+        number of the most recent time steps that are kept, all time steps are kept if None
+    """
+    def __init__(self, window=None):
+        self.window = window
+        self.time_step = {}
+        # aggregates by time step, in the order of first appearance
+        self.time_steps = {}
+        self._order = deque()
+        self._dropped = None
+
+    def _current_time_step(self, record):
+        if hasattr(record, 'time_step'):
+            self.time_step[record.mpi_process] = record.time_step
+        return self.time_step.get(record.mpi_process, 0)
+
+    def _aggregates(self, time_step, factory):
+        # Aggregates of a time step, None if the time step has left the window
+        aggregates = self.time_steps.get(time_step)
+        if aggregates is not None:
+            return aggregates
+        if self._dropped is not None and time_step <= self._dropped:
+            return None
+        aggregates = self.time_steps[time_step] = factory()
+        self._order.append(time_step)
+        if self.window is not None and len(self._order) > self.window:
+            dropped = self._order.popleft()
+            del self.time_steps[dropped]
+            self._dropped = dropped if self._dropped is None else max(self._dropped, dropped)
+        return aggregates
+
+    @abc.abstractmethod
+    def update(self, record):
+        """Adds a record to the aggregates"""
+
+    def update_many(self, records):
+        for record in records:
+            self.update(record)
+        return self
+
+    @abc.abstractmethod
+    def result(self):
+        """DataFrame of the analysis of the records so far"""
+
+
+def _means(sums, counts, columns):
+    return [sums[column] / counts[column] if counts[column] else float('nan') for column in columns]
+
+
+class OnlineTimeStepAnalysis(OnlineAnalysis):
+    """Incremental analysis_time_step: mean of output and solution time, sum of assembly, linear solver
+    and Dirichlet time per mpi_process and time step"""
+    interest1 = ['output_time', 'time_step_solution_time']
+    interest2 = ['assembly_time', 'linear_solver_time', 'dirichlet_time']
+
+    def __init__(self, window=None):
+        super().__init__(window)
+        self.columns = set()
+
+    def update(self, record):
+        time_step = self._current_time_step(record)
+        aggregates = self._aggregates(time_step, dict)
+        if aggregates is None:
+            return
+        sums, counts = aggregates.setdefault(record.mpi_process, (dict.fromkeys(self.interest1 + self.interest2, 0.0),
+                                                                  dict.fromkeys(self.interest1, 0)))
+        for column in self.interest1:
+            if hasattr(record, column):
+                self.columns.add(column)
+                value = getattr(record, column)
+                if value == value:
+                    sums[column] += value
+                    counts[column] += 1
+        for column in self.interest2:
+            if hasattr(record, column):
+                self.columns.add(column)
+                value = getattr(record, column)
+                if value == value:
+                    sums[column] += value
+
+    def result(self):
+        columns1 = sorted(column for column in self.interest1 if column in self.columns)
+        columns2 = sorted(column for column in self.interest2 if column in self.columns)
+        index = sorted((mpi_process, time_step) for time_step, aggregates in self.time_steps.items()
+                       for mpi_process, (_, counts) in aggregates.items()
+                       if any(counts[column] for column in columns1))
+        rows = []
+        for mpi_process, time_step in index:
+            sums, counts = self.time_steps[time_step][mpi_process]
+            rows.append(_means(sums, counts, columns1) + [sums[column] for column in columns2])
+        pt = pd.DataFrame(rows, columns=columns1 + columns2, dtype='float64',
+                          index=_index(index, ['mpi_process', 'time_step']))
+        return pt.dropna(how='all', axis=1)
+
+
+class OnlineNewtonConvergenceAnalysis(OnlineAnalysis):
+    """Incremental analysis_convergence_newton_iteration: mean of dx, x and dx_x per time step, (coupling iteration),
+    process, iteration number and component
+
+    The convergence criteria are printed before iteration number and process, they are kept per mpi_process
+    until both are read. The coupling iteration is taken from the record that gives the process.
+    """
+    interest = ['dx', 'x', 'dx_x']
+
+    def __init__(self, window=None):
+        super().__init__(window)
+        self.coupled = False
+        self.components = False
+        # criteria waiting for both, only for the iteration number and only for the process
+        self.waiting = {}
+        self.waiting_iteration_number = {}
+        self.waiting_process = {}
+        self.previous_coupling_header = {}
+
+    def _add(self, time_step, coupling_iteration, process, iteration_number, component, values, excluded):
+        aggregates = self._aggregates(time_step, dict)
+        if aggregates is None:
+            return
+        sums, counts = aggregates.setdefault((coupling_iteration, process, iteration_number, component, excluded),
+                                             (dict.fromkeys(self.interest, 0.0), dict.fromkeys(self.interest, 0)))
+        for column, value in zip(self.interest, values):
+            if value == value:
+                sums[column] += value
+                counts[column] += 1
+
+    def update(self, record):
+        mpi_process = record.mpi_process
+        time_step = self._current_time_step(record)
+        # coupling_iteration_process is forward filled with limit 1, the convergence criterion directly after the
+        # header of a coupled solution belongs to the coupling iteration
+        previous_coupling_header = self.previous_coupling_header.get(mpi_process, False)
+        self.previous_coupling_header[mpi_process] = hasattr(record, 'coupling_iteration_process')
+        if hasattr(record, 'coupling_iteration'):
+            self.coupled = True
+
+        if hasattr(record, 'dx'):
+            component = getattr(record, 'component', -1)
+            if hasattr(record, 'component'):
+                self.components = True
+            criterion = [time_step, component, (record.dx, record.x, record.dx_x),
+                         previous_coupling_header]
+            self.waiting.setdefault(mpi_process, []).append(criterion)
+        if hasattr(record, 'iteration_number'):
+            for criterion in self.waiting_iteration_number.pop(mpi_process, []):
+                self._add(criterion[0], *criterion[4], record.iteration_number, criterion[1], criterion[2],
+                          criterion[3])
+            waiting = self.waiting.pop(mpi_process, [])
+            for criterion in waiting:
+                criterion.append(record.iteration_number)
+            self.waiting_process.setdefault(mpi_process, []).extend(waiting)
+        if hasattr(record, 'process'):
+            coupling = (getattr(record, 'coupling_iteration', None), record.process)
+            for time_step, component, values, excluded, iteration_number in self.waiting_process.pop(mpi_process, []):
+                self._add(time_step, *coupling, iteration_number, component, values, excluded)
+            waiting = self.waiting.pop(mpi_process, [])
+            for criterion in waiting:
+                criterion.append(coupling)
+            self.waiting_iteration_number.setdefault(mpi_process, []).extend(waiting)
+
+    def result(self):
+        context = ['time_step', 'process', 'iteration_number']
+        if self.coupled:
+            context.insert(1, 'coupling_iteration')
+        if self.components or not self.coupled:
+            context.append('component')
+        merged = {}
+        for time_step, aggregates in self.time_steps.items():
+            for (coupling_iteration, process, iteration_number, component, excluded), (sums, counts) in \
+                    aggregates.items():
+                if self.coupled and (excluded or coupling_iteration is None):
+                    continue
+                key = {'time_step': time_step, 'coupling_iteration': coupling_iteration, 'process': process,
+                       'iteration_number': iteration_number, 'component': component}
+                merged_sums, merged_counts = merged.setdefault(tuple(key[level] for level in context),
+                                                               (dict.fromkeys(self.interest, 0.0),
+                                                                dict.fromkeys(self.interest, 0)))
+                for column in self.interest:
+                    merged_sums[column] += sums[column]
+                    merged_counts[column] += counts[column]
+        columns = sorted(self.interest)
+        index = sorted(merged)
+        pt = pd.DataFrame([_means(*merged[key], columns) for key in index], columns=columns, dtype='float64',
+                          index=_index(index, context))
+        return pt.dropna(how='all').dropna(how='all', axis=1)
+
+
+class OnlineTimeStepIterationsAnalysis(OnlineAnalysis):
+    """Incremental time_step_vs_iterations: maximal iteration number per time step
+
+    The iteration number is back filled, it also counts for the records of the time steps in front of it
+    (per mpi_process) that are not followed by an iteration number in their own time step.
+    """
+    def __init__(self, window=None):
+        super().__init__(window)
+        self.waiting = {}
+
+    def update(self, record):
+        time_step = self._current_time_step(record)
+        if not hasattr(record, 'iteration_number'):
+            self.waiting.setdefault(record.mpi_process, set()).add(time_step)
+            return
+        for waiting_time_step in self.waiting.pop(record.mpi_process, set()) | {time_step}:
+            if waiting_time_step in self.time_steps:
+                self.time_steps[waiting_time_step] = max(self.time_steps[waiting_time_step], record.iteration_number)
+            elif self._aggregates(waiting_time_step, int) is not None:
+                self.time_steps[waiting_time_step] = record.iteration_number
+
+    def result(self):
+        index = sorted(self.time_steps)
+        return pd.DataFrame({'iteration_number': pd.array([self.time_steps[time_step] for time_step in index],
+                                                          dtype='Int64')},
+                            index=pd.Index(pd.array(index, dtype='Int64'), name='time_step'))
+
+
+def _index(keys, names):
+    if not keys:
+        return pd.MultiIndex.from_arrays([pd.array([], dtype='Int64')] * len(names), names=names)
+    return pd.MultiIndex.from_arrays([pd.array(level, dtype='Int64') for level in zip(*keys)], names=names)
+
+
+online_analysis_classes = {"by_time_step": OnlineTimeStepAnalysis,
+                           "convergence_newton_iteration": OnlineNewtonConvergenceAnalysis,
+                           "time_step_vs_iterations": OnlineTimeStepIterationsAnalysis}
+
+
+class OnlineAnalyses:
+    """Runs several incremental analyses on the same records
+
+    Parameters
+    ----------
+    analyses : `list` of `str`, optional
+        names as in online_analysis_classes, all if None
+    window : `int`, optional
+        number of the most recent time steps that are kept
+
+    Example
+    -------
+    >>> analyses = OnlineAnalyses(window=100)
+    >>> for record in tail_records("out.log", idle_timeout=600):
+    ...     analyses.update(record)
+    >>> analyses.results()["time_step_vs_iterations"]
+    """
+    def __init__(self, analyses=None, window=None):
+        if analyses is None:
+            analyses = list(online_analysis_classes)
+        unknown = set(analyses) - set(online_analysis_classes)
+        if unknown:
+            raise Exception('Online analysis/analyses ({}) is/are not available'.format(','.join(unknown)))
+        self.analyses = {name: online_analysis_classes[name](window) for name in analyses}
+
+    def update(self, record):
+        for analysis in self.analyses.values():
+            analysis.update(record)
+
+    def update_many(self, records):
+        for record in records:
+            self.update(record)
+        return self
+
+    def results(self):
+        return {name: analysis.result() for name, analysis in self.analyses.items()}
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import numpy as np
+import pandas as pd
+
+from ogs6py.log_parser.log_parser import parse_columns
+from ogs6py.log_parser.common_ogs_analyses import columns_to_dataframe, fill_ogs_context
+from ogs6py.ogs_regexes.ogs_regexes import record_types
+from ogs6py.log_parser.performance_profile import phases, profile_time_steps
+
+'''
+Analyses of MPI runs: the load imbalance of the ranks per time step and the scaling of a model over runs with
+different numbers of ranks. The time of a phase in a time step is the one of the slowest rank, the other ranks
+wait for it.
+'''
+
+# measurements of the imbalance and scaling analyses, times per rank and time step
+parallel_measurements = [*phases.values(), 'time_step_solution_time', 'time_step_time', 'output_time']
+
+
+def _read(log, force_parallel=False):
+    if isinstance(log, pd.DataFrame):
+        return log
+    return fill_ogs_context(columns_to_dataframe(parse_columns(
+        log, force_parallel=force_parallel,
+        pattern_classes=record_types(['by_time_step', 'analysis_simulation']))))
+
+
+def rank_times(df):
+    """Times of the measurements (see parallel_measurements) per (mpi_process, time_step)"""
+    profile = profile_time_steps(df)
+    if 'time_step_solution_time' in df:
+        # coupling iterations and processes are accumulated
+        profile['time_step_solution_time'] = df.groupby(['mpi_process', 'time_step'])[
+            'time_step_solution_time'].sum(min_count=1)
+    else:
+        profile['time_step_solution_time'] = np.nan
+    return profile[parallel_measurements]
+
+
+def load_imbalance(log, force_parallel=False):
+    """Load imbalance of the ranks per time step and measurement
+
+    Parameters
+    ----------
+    log : `str` or `pandas.DataFrame`
+        log file of an MPI run or DataFrame with filled context
+    force_parallel : `bool`, optional
+
+    Returns
+    -------
+    imbalance : `pandas.DataFrame`
+        per time step (index) and measurement (first column level) the maximum and mean over the ranks,
+        their ratio (imbalance, 1 for a balanced load) and the slowest rank
+    summary : `pandas.DataFrame`
+        per measurement the sums of the maxima and means over all time steps, their ratio and the time
+        the ranks wait in total (sum of maximum - mean)
+    """
+    times = rank_times(_read(log, force_parallel)).reset_index()
+    # time step 0 has only the output
+    times = times[times['time_step'] > 0]
+    grouped = times.groupby('time_step')
+    imbalance = {}
+    summary = []
+    for measurement in parallel_measurements:
+        maximum = grouped[measurement].max()
+        mean = grouped[measurement].mean()
+        slowest = times.loc[grouped[measurement].idxmax().dropna(), ['time_step', 'mpi_process']]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            imbalance[measurement] = pd.DataFrame({
+                'max': maximum, 'mean': mean, 'imbalance': maximum / mean,
+                'slowest_rank': slowest.set_index('time_step')['mpi_process'].reindex(maximum.index)})
+        summary.append({'measurement': measurement, 'max': maximum.sum(), 'mean': mean.sum(),
+                        'imbalance': maximum.sum() / mean.sum() if mean.sum() > 0 else np.nan,
+                        'waiting_time': (maximum - mean).sum()})
+    imbalance = pd.concat(imbalance, axis=1)
+    return imbalance, pd.DataFrame(summary).set_index('measurement')
+
+
+def _amdahl_fit(ranks, times):
+    # times = serial + parallel / ranks (least squares), serial fraction at one rank
+    if len(ranks) < 2 or not np.all(np.isfinite(times)):
+        return np.nan, np.nan, np.nan
+    parallel, serial = np.polyfit(1 / ranks, times, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return serial / (serial + parallel), serial, parallel
+
+
+def _gustafson_fit(ranks, speedups):
+    # scaled speedup = n - f (n - 1) with n relative to the smallest number of ranks (least squares)
+    n = ranks / ranks[0]
+    if len(ranks) < 2 or not np.all(np.isfinite(speedups)):
+        return np.nan
+    return np.sum((n - speedups) * (n - 1)) / np.sum((n - 1) ** 2)
+
+
+def scaling_analysis(logs, weak=False, force_parallel=False):
+    """Strong or weak scaling of a model over runs with different numbers of MPI ranks
+
+    Parameters
+    ----------
+    logs : `list` or `dict`
+        log files or DataFrames with filled context, a dict maps the number of ranks to the log. For a list
+        the number of ranks is the number of MPI processes found in the log, an Exception is raised if
+        several logs have the same number of ranks (repeated runs are not averaged).
+    weak : `bool`, optional
+        weak scaling (the problem size grows with the ranks), otherwise strong scaling (fixed problem size)
+    force_parallel : `bool`, optional
+
+    Returns
+    -------
+    scaling : `pandas.DataFrame`
+        per measurement and number of ranks (index) the time (sum over the time steps of the slowest rank),
+        the speedup and the parallel efficiency relative to the run with the least ranks. For weak scaling
+        the speedup is the scaled speedup (ranks / least ranks * time of least ranks / time).
+        The measurement execution_time is the execution time of the runs (slowest rank).
+    fit : `pandas.DataFrame`
+        per measurement the serial fraction: from a fit of Amdahl's law (time = serial + parallel / ranks)
+        for strong scaling, with the fitted serial and parallel times (at one rank) and the maximal speedup
+        1 / serial fraction (nan for a negative or undefined serial fraction), or from a fit of Gustafson's law
+        for weak scaling. A superlinear speedup gives a negative serial fraction.
+    """
+    if not isinstance(logs, dict):
+        dfs = [_read(log, force_parallel) for log in logs]
+        logs = {int(df['mpi_process'].nunique()): df for df in dfs}
+        if len(logs) < len(dfs):
+            counts = pd.Series([int(df['mpi_process'].nunique()) for df in dfs]).value_counts()
+            raise Exception('Several logs have the same number of ranks ({})'.format(
+                ','.join(str(ranks) for ranks in sorted(counts[counts > 1].index))))
+    if len(logs) < 2:
+        raise Exception('The scaling analysis needs runs with at least two different numbers of ranks')
+    rows = []
+    for ranks in sorted(logs):
+        df = _read(logs[ranks], force_parallel)
+        times = rank_times(df).groupby(level='time_step').max().sum(min_count=1)
+        times['execution_time'] = df['execution_time'].max() if 'execution_time' in df else np.nan
+        rows.append(times.rename(ranks))
+    times = pd.DataFrame(rows)
+    times.index.name = 'ranks'
+    ranks = times.index.to_numpy(dtype=float)
+    n = ranks / ranks[0]
+
+    scaling = {}
+    fit = []
+    for measurement in times.columns:
+        time = times[measurement].to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if weak:
+                speedup = n * time[0] / time
+                efficiency = time[0] / time
+            else:
+                speedup = time[0] / time
+                efficiency = speedup / n
+        scaling[measurement] = pd.DataFrame({'time': time, 'speedup': speedup, 'efficiency': efficiency},
+                                            index=times.index)
+        if weak:
+            fit.append({'measurement': measurement, 'serial_fraction': _gustafson_fit(ranks, speedup)})
+        else:
+            serial_fraction, serial, parallel = _amdahl_fit(ranks, time)
+            if serial_fraction > 0:
+                max_speedup = 1 / serial_fraction
+            else:
+                # unlimited without serial part, undefined for a superlinear speedup or a degenerate fit
+                max_speedup = np.inf if serial_fraction == 0 else np.nan
+            fit.append({'measurement': measurement, 'serial_fraction': serial_fraction, 'serial_time': serial,
+                        'parallel_time': parallel, 'max_speedup': max_speedup})
+    scaling = pd.concat(scaling, names=['measurement'])
+    return scaling, pd.DataFrame(fit).set_index('measurement')
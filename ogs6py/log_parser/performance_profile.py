@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import html
+
+import numpy as np
+import pandas as pd
+
+from ogs6py.log_parser.log_parser import parse_columns
+from ogs6py.log_parser.common_ogs_analyses import check_input, columns_to_dataframe, fill_ogs_context
+from ogs6py.ogs_regexes.ogs_regexes import record_types
+
+'''
+Performance profile of a simulation from the timings in the log: the time of each time step is split into the
+phases assembly, linear solver and Dirichlet BCs (accumulated over all iterations), the rest of the time step
+is unattributed. The output is not part of the time step in OGS, it is listed separately.
+'''
+
+# phase name to column of the accumulated time
+phases = {'assembly': 'assembly_time', 'linear_solver': 'linear_solver_time', 'dirichlet': 'dirichlet_time'}
+
+
+def profile_time_steps(df):
+    """Times per phase, iterations and unattributed time per (mpi_process, time_step)
+
+    Parameters
+    ----------
+    df : `pandas.DataFrame`
+        DataFrame with filled context, see fill_ogs_context
+
+    Returns
+    -------
+    profile : `pandas.DataFrame`
+        columns iterations, assembly_time, linear_solver_time, dirichlet_time, unattributed_time
+        (time step time minus the phases), time_step_time, output_time and total_time (time step and output)
+    """
+    check_input(df, ['time_step_finished_time', 'output_time'], ['mpi_process', 'time_step'])
+    context = ['mpi_process', 'time_step']
+    grouped = df.groupby(context)
+    profile = pd.DataFrame(index=grouped.size().index)
+    # the iteration number is backward filled to other records, it is taken from the iterations only
+    iterations = df.dropna(subset=['iteration_time']).groupby(context)['iteration_number'].max() \
+        if 'iteration_time' in df else pd.Series(dtype=float)
+    profile['iterations'] = iterations.reindex(profile.index).fillna(0).astype(int)
+    for column in phases.values():
+        profile[column] = grouped[column].sum() if column in df else 0.0
+    profile['time_step_time'] = grouped['time_step_finished_time'].sum(min_count=1)
+    profile['unattributed_time'] = profile['time_step_time'] - profile[list(phases.values())].sum(axis=1)
+    profile['output_time'] = grouped['output_time'].sum()
+    profile['total_time'] = profile['time_step_time'].fillna(0) + profile['output_time']
+    return profile[['iterations', *phases.values(), 'unattributed_time', 'time_step_time', 'output_time',
+                    'total_time']]
+
+
+def phase_shares(profile):
+    """Time and share of the total time (time steps and output) per phase, summed over all processes"""
+    times = {name: profile[column].sum() for name, column in phases.items()}
+    times['unattributed'] = profile['unattributed_time'].sum()
+    times['output'] = profile['output_time'].sum()
+    times = pd.Series(times, name='time')
+    total = profile['total_time'].sum()
+    return pd.DataFrame({'time': times, 'share': times / total if total > 0 else np.nan})
+
+
+def slowest_time_steps(profile, top=10):
+    """The top slowest time steps (of the slowest process of each time step)"""
+    slowest = profile.reset_index().sort_values('total_time', ascending=False, kind='stable')
+    return slowest.drop_duplicates('time_step').head(top).set_index('time_step')
+
+
+def time_step_trends(profile, threshold=0.5, min_r2=0.5):
+    """Linear trends of the times and iterations over the time steps
+
+    A least squares line is fitted to the values per time step (mean over the processes, without time step 0).
+    The growth is the change of the fitted line from the first to the last time step relative to its first value.
+    A trend is "growing" or "shrinking" if the growth exceeds threshold (relative) and the line explains
+    at least min_r2 of the variance.
+
+    Returns
+    -------
+    trends : `pandas.DataFrame`
+        columns slope (per time step), r2, growth and trend ("growing", "shrinking" or "none") per measurement
+    """
+    by_time_step = profile.groupby(level='time_step').mean()
+    by_time_step = by_time_step[by_time_step.index > 0]
+    measurements = ['iterations', *phases.values(), 'unattributed_time', 'time_step_time', 'output_time']
+    x = by_time_step.index.to_numpy(dtype=float)
+    trends = []
+    for measurement in measurements:
+        y = by_time_step[measurement].to_numpy(dtype=float)
+        valid = np.isfinite(y)
+        slope = r2 = growth = np.nan
+        trend = 'none'
+        if valid.sum() > 2 and np.ptp(x[valid]) > 0:
+            slope, intercept = np.polyfit(x[valid], y[valid], 1)
+            residuals = y[valid] - (slope * x[valid] + intercept)
+            variance = np.sum((y[valid] - y[valid].mean()) ** 2)
+            r2 = 1 - np.sum(residuals ** 2) / variance if variance > 0 else 0.0
+            first = slope * x[valid][0] + intercept
+            if first > 0:
+                growth = slope * (x[valid][-1] - x[valid][0]) / first
+                if r2 >= min_r2 and abs(growth) > threshold:
+                    trend = 'growing' if growth > 0 else 'shrinking'
+        trends.append({'measurement': measurement, 'slope': slope, 'r2': r2, 'growth': growth, 'trend': trend})
+    return pd.DataFrame(trends).set_index('measurement')
+
+
+class PerformanceReport:
+    """Profile of a simulation, see performance_profile
+
+    Attributes
+    ----------
+    time_steps : `pandas.DataFrame`
+        see profile_time_steps
+    phases : `pandas.DataFrame`
+        see phase_shares
+    slowest : `pandas.DataFrame`
+        see slowest_time_steps
+    trends : `pandas.DataFrame`
+        see time_step_trends
+    output_compute_ratio : `float`
+        output time relative to the time of the time steps
+    """
+    def __init__(self, time_steps, phases, slowest, trends, output_compute_ratio):
+        self.time_steps = time_steps
+        self.phases = phases
+        self.slowest = slowest
+        self.trends = trends
+        self.output_compute_ratio = output_compute_ratio
+
+    def _summary(self):
+        lines = ['Time steps: {}'.format(self.time_steps.index.get_level_values('time_step').nunique()),
+                 'Total time (time steps and output): {:.4g} s'.format(self.time_steps['total_time'].sum()),
+                 'Output time relative to time step time: {:.1%}'.format(self.output_compute_ratio)]
+        for measurement, trend in self.trends[self.trends['trend'] != 'none'].iterrows():
+            lines.append('Trend: {} is {} ({:+.0%} over the run, r2={:.2f})'.format(
+                measurement, trend['trend'], trend['growth'], trend['r2']))
+        return lines
+
+    def to_text(self):
+        phases = self.phases.copy()
+        phases['share'] = phases['share'].map('{:.1%}'.format)
+        return '\n'.join([*self._summary(), '', 'Phases:', phases.to_string(), '',
+                          'Slowest time steps:', self.slowest.to_string(), '',
+                          'Trends:', self.trends.to_string()])
+
+    def to_html(self, file_name=None):
+        """Returns the report as a static HTML page, written to file_name if given"""
+        phases = self.phases.copy()
+        phases['share'] = phases['share'].map('{:.1%}'.format)
+        summary = ''.join('<li>{}</li>'.format(html.escape(line)) for line in self._summary())
+        page = ('<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>OGS performance profile</title></head>\n'
+                '<body>\n<h1>OGS performance profile</h1>\n<ul>{}</ul>\n<h2>Phases</h2>\n{}\n'
+                '<h2>Slowest time steps</h2>\n{}\n<h2>Trends</h2>\n{}\n</body>\n</html>\n').format(
+            summary, phases.to_html(), self.slowest.to_html(), self.trends.to_html())
+        if file_name is not None:
+            with open(file_name, 'w') as file:
+                file.write(page)
+        return page
+
+    def __str__(self):
+        return self.to_text()
+
+
+def performance_profile(log, top=10, trend_threshold=0.5, min_r2=0.5, force_parallel=False):
+    """Profile and hotspots of a simulation
+
+    Parameters
+    ----------
+    log : `str` or `pandas.DataFrame`
+        log file (only the timings and the context are parsed) or DataFrame with filled context
+    top : `int`, optional
+        number of the slowest time steps
+    trend_threshold : `float`, optional
+        see time_step_trends
+    min_r2 : `float`, optional
+        see time_step_trends
+    force_parallel : `bool`, optional
+
+    Returns
+    -------
+    report : `PerformanceReport`
+
+    Example
+    -------
+    >>> report = performance_profile("out.log")
+    >>> print(report)
+    >>> report.to_html("profile.html")
+    """
+    if isinstance(log, pd.DataFrame):
+        df = log
+    else:
+        df = fill_ogs_context(columns_to_dataframe(parse_columns(
+            log, force_parallel=force_parallel, pattern_classes=record_types(['by_time_step']))))
+    profile = profile_time_steps(df)
+    time_step_time = profile['time_step_time'].sum()
+    output_compute_ratio = profile['output_time'].sum() / time_step_time if time_step_time > 0 else np.nan
+    return PerformanceReport(profile, phase_shares(profile), slowest_time_steps(profile, top),
+                             time_step_trends(profile, trend_threshold, min_r2), output_compute_ratio)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import numpy as np
+import pandas as pd
+
+from ogs6py.log_parser.performance_profile import performance_profile, profile_time_steps
+
+'''
+Comparison of the timings of two runs of the same model (e.g. before and after an OGS update). The time steps of
+both runs are aligned by their number, the speedup of a measurement is the ratio of its sums over the aligned
+time steps (run a / run b, > 1 if b is faster). The confidence intervals are bootstrapped by resampling the
+aligned time steps.
+'''
+
+measurements = ['assembly_time', 'linear_solver_time', 'dirichlet_time', 'unattributed_time', 'time_step_time',
+                'output_time', 'total_time']
+
+
+def _time_steps(log, force_parallel):
+    if isinstance(log, pd.DataFrame):
+        profile = profile_time_steps(log)
+    else:
+        profile = performance_profile(log, force_parallel=force_parallel).time_steps
+    # the slowest process determines the time of a time step
+    return profile.groupby(level='time_step').max()
+
+
+def bootstrap_speedup(a, b, confidence=0.95, resamples=2000, seed=0):
+    """Ratio of the sums of a and b and its bootstrap confidence interval (percentiles)
+
+    a and b are paired, the pairs are resampled.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    valid = np.isfinite(a) & np.isfinite(b)
+    a, b = a[valid], b[valid]
+    if len(a) == 0 or b.sum() <= 0:
+        return np.nan, np.nan, np.nan
+    rng = np.random.default_rng(seed)
+    ratios = []
+    # resampled in batches, the indices of all resamples of a long run would need too much memory
+    batch = max(1, 1000000 // len(a))
+    for start in range(0, resamples, batch):
+        indices = rng.integers(0, len(a), size=(min(batch, resamples - start), len(a)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios.append(a[indices].sum(axis=1) / b[indices].sum(axis=1))
+    ratios = np.concatenate(ratios)
+    alpha = (1 - confidence) / 2
+    low, high = np.nanquantile(ratios, [alpha, 1 - alpha])
+    return a.sum() / b.sum(), low, high
+
+
+class RunComparison:
+    """Result of compare_runs
+
+    Attributes
+    ----------
+    time_steps : `pandas.DataFrame`
+        measurements of both runs (suffixes _a and _b), their delta (b - a) and iterations per aligned time step
+    speedups : `pandas.DataFrame`
+        speedup (a / b) with confidence interval (low, high) and verdict ("pass", "fail" or "missing" if the
+        measurement is not available in both runs) per measurement
+    iteration_differences : `pandas.DataFrame`
+        aligned time steps whose iteration counts differ
+    unmatched_time_steps : `dict`
+        time steps only found in run a or run b
+    passed : `bool`
+        False if a gated measurement regressed significantly by more than the threshold or is missing
+    """
+    def __init__(self, time_steps, speedups, unmatched_time_steps, threshold, gate):
+        self.time_steps = time_steps
+        self.speedups = speedups
+        self.iteration_differences = time_steps.loc[time_steps['iterations_differ'],
+                                                    ['iterations_a', 'iterations_b']]
+        self.unmatched_time_steps = unmatched_time_steps
+        self.threshold = threshold
+        self.gate = gate
+        self.passed = (speedups.loc[gate, 'verdict'] == 'pass').all()
+
+    def to_text(self):
+        lines = ['Verdict: {} (regression threshold {:.0%}, gated on {})'.format(
+                     'pass' if self.passed else 'fail', self.threshold, ', '.join(self.gate)),
+                 'Aligned time steps: {}'.format(len(self.time_steps))]
+        for run, time_steps in self.unmatched_time_steps.items():
+            if time_steps:
+                lines.append('Time steps only in run {}: {}'.format(run, ', '.join(map(str, time_steps))))
+        lines += ['', 'Speedup (run a / run b):', self.speedups.to_string()]
+        if not self.iteration_differences.empty:
+            lines += ['', 'Time steps with different iteration counts:', self.iteration_differences.to_string()]
+        return '\n'.join(lines)
+
+    def __str__(self):
+        return self.to_text()
+
+
+def compare_runs(log_a, log_b, threshold=0.05, confidence=0.95, resamples=2000, gate=('total_time',), seed=0,
+                 force_parallel=False):
+    """Compares the timings of two runs per time step and phase
+
+    Parameters
+    ----------
+    log_a : `str` or `pandas.DataFrame`
+        log file or DataFrame with filled context of the reference run
+    log_b : `str` or `pandas.DataFrame`
+        log file or DataFrame with filled context of the compared run
+    threshold : `float`, optional
+        allowed relative slowdown: a measurement fails if the upper bound of the confidence interval
+        of its speedup is below 1 - threshold
+    confidence : `float`, optional
+        level of the bootstrap confidence intervals
+    resamples : `int`, optional
+        number of bootstrap resamples
+    gate : `list`, optional
+        measurements that decide the verdict, see measurements. A gated measurement that is missing in
+        one of the runs fails the comparison.
+    seed : `int`, optional
+        seed of the bootstrap resampling
+    force_parallel : `bool`, optional
+
+    Returns
+    -------
+    comparison : `RunComparison`
+
+    Example
+    -------
+    >>> comparison = compare_runs("old/out.log", "new/out.log", threshold=0.1)
+    >>> print(comparison)
+    >>> assert comparison.passed
+    """
+    unknown = set(gate) - set(measurements)
+    if unknown:
+        raise Exception('Measurement(s) ({}) is/are not available'.format(','.join(unknown)))
+    time_steps_a = _time_steps(log_a, force_parallel)
+    time_steps_b = _time_steps(log_b, force_parallel)
+    aligned = time_steps_a.index.intersection(time_steps_b.index)
+    unmatched = {'a': time_steps_a.index.difference(aligned).tolist(),
+                 'b': time_steps_b.index.difference(aligned).tolist()}
+    time_steps_a = time_steps_a.loc[aligned]
+    time_steps_b = time_steps_b.loc[aligned]
+
+    time_steps = pd.DataFrame(index=aligned)
+    speedups = []
+    for measurement in measurements:
+        time_steps[measurement + '_a'] = time_steps_a[measurement]
+        time_steps[measurement + '_b'] = time_steps_b[measurement]
+        time_steps[measurement + '_delta'] = time_steps_b[measurement] - time_steps_a[measurement]
+        speedup, low, high = bootstrap_speedup(time_steps_a[measurement], time_steps_b[measurement], confidence,
+                                               resamples, seed)
+        if np.isnan(high):
+            verdict = 'missing'
+        else:
+            verdict = 'fail' if high < 1 - threshold else 'pass'
+        speedups.append({'measurement': measurement, 'time_a': time_steps_a[measurement].sum(),
+                         'time_b': time_steps_b[measurement].sum(), 'speedup': speedup, 'low': low, 'high': high,
+                         'verdict': verdict})
+    time_steps['iterations_a'] = time_steps_a['iterations']
+    time_steps['iterations_b'] = time_steps_b['iterations']
+    time_steps['iterations_differ'] = time_steps_a['iterations'] != time_steps_b['iterations']
+    speedups = pd.DataFrame(speedups).set_index('measurement')
+    return RunComparison(time_steps, speedups, unmatched, threshold, list(gate))
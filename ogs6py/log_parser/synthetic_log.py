@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import random
+
+from ogs6py.ogs_regexes import ogs_regexes as regexes
+
+'''
+Generator of synthetic OGS logs for tests and benchmarks of the log parser. The line shapes are the ones
+matched by ogs_regexes(), each template is given for its record type (line_templates), lines without records
+(e.g. linear solver output) are mixed in as in real logs.
+'''
+
+line_templates = {
+    regexes.TimeStepOutputTime: 'info: [time] Output of timestep {time_step} took {output_time:g} s.',
+    regexes.TimeStepFinishedTime: 'info: [time] Time step #{time_step} took {time_step_finished_time:g} s.',
+    regexes.MeshReadTime: 'info: [time] Reading the mesh took {mesh_read_time:g} s.',
+    regexes.SimulationExecutionTime: 'info: [time] Execution took {execution_time:g} s.',
+    regexes.TimeStepSolutionTimeCoupledScheme: 'info: [time] Solving process #{process} took '
+                                               '{time_step_solution_time:g} s in time step #{time_step}  '
+                                               'coupling iteration #{coupling_iteration}',
+    regexes.TimeStepSolutionTime: 'info: [time] Solving process #{process} took {time_step_solution_time:g} s '
+                                  'in time step #{time_step}',
+    regexes.TimeStepStartTime: 'info: === Time stepping at step #{time_step} and time {step_start_time:g} '
+                               'with step size {step_size:g}',
+    regexes.AssemblyTime: 'info: [time] Assembly took {assembly_time:g} s.',
+    regexes.DirichletTime: 'info: [time] Applying Dirichlet BCs took {dirichlet_time:g} s.',
+    regexes.LinearSolverTime: 'info: [time] Linear solver took {linear_solver_time:g} s.',
+    regexes.IterationTime: 'info: [time] Iteration #{iteration_number} took {iteration_time:g} s.',
+    regexes.TimeStepConvergenceCriterion: 'info: Convergence criterion: |dx|={dx:.4e}, |x|={x:.4e}, '
+                                          '|dx|/|x|={dx_x:.4e}',
+    regexes.PhaseFieldEnergyVar: 'info: Elastic energy: {elastic_energy:g} Surface energy: {surface_energy:g} '
+                                 'Pressure work: {pressure_work:g} Total energy: {total_energy:g}',
+    regexes.CouplingIterationConvergence: 'info: ------- Checking convergence criterion for coupled solution of '
+                                          'process #{coupling_iteration_process}',
+    regexes.ComponentConvergenceCriterion: 'info: Convergence criterion, component {component}: |dx|={dx:.4e}, '
+                                           '|x|={x:.4e}, |dx|/|x|={dx_x:.4e}',
+    regexes.CriticalMessage: 'critical: {message}',
+    regexes.ErrorMessage: 'error: {message}',
+    regexes.WarningMessage: 'warning: {message}',
+}
+
+linear_solver_output = ['info: ------------------------------------------------------------------',
+                        'info: *** Eigen solver computation',
+                        'info: -> solve with SparseLU',
+                        'info: ------------------------------------------------------------------']
+
+
+def line(pattern_class, **values):
+    """Returns the log line (without newline and MPI rank prefix) of a record type"""
+    return line_templates[pattern_class].format(**values)
+
+
+class SyntheticLog:
+    """Produces the lines of a synthetic OGS log
+
+    Parameters
+    ----------
+    mpi_processes : `int`, optional
+        number of MPI ranks, the lines of all ranks are interleaved as in the logs of MPI runs
+        (prefixed by "[rank] "). 1 gives a serial log.
+    staggered : `bool`, optional
+        staggered scheme with coupling iterations over processes (two processes)
+    components : `int`, optional
+        number of components of the convergence criterion, 0 gives the convergence criterion for the whole
+        solution vector
+    warnings : `float`, optional
+        probability of a warning per time step
+    iterations : `tuple`, optional
+        minimal and maximal number of nonlinear iterations per time step
+    coupling_iterations : `tuple`, optional
+        minimal and maximal number of coupling iterations (staggered scheme)
+    seed : `int`, optional
+    """
+    def __init__(self, mpi_processes=1, staggered=False, components=0, warnings=0.0, iterations=(2, 6),
+                 coupling_iterations=(2, 4), seed=0):
+        self.mpi_processes = mpi_processes
+        self.staggered = staggered
+        self.components = components
+        self.warnings = warnings
+        self.iterations = iterations
+        self.coupling_iterations = coupling_iterations
+        # structure (numbers of iterations, warnings, ...) is the same for all ranks, measured values differ
+        self.random = random.Random(seed)
+        self.values = random.Random(seed + 1)
+        self.time = 0.0
+
+    def duration(self, scale):
+        return scale * self.values.uniform(0.5, 1.5)
+
+    def convergence(self, iteration):
+        x = self.values.uniform(1e3, 1e7)
+        dx = x * 10.0 ** (-2 - 3 * iteration + self.values.uniform(-1, 1))
+        if self.components == 0:
+            return [line(regexes.TimeStepConvergenceCriterion, dx=dx, x=x, dx_x=dx / x)]
+        return [line(regexes.ComponentConvergenceCriterion, component=component, dx=dx, x=x, dx_x=dx / x)
+                for component in range(self.components)]
+
+    def nonlinear_solve(self, time_step, process, coupling_iteration):
+        lines = []
+        for iteration in range(1, self.random.randint(*self.iterations) + 1):
+            lines.append(line(regexes.AssemblyTime, assembly_time=self.duration(1e-3)))
+            lines.append(line(regexes.DirichletTime, dirichlet_time=self.duration(1e-5)))
+            lines.extend(linear_solver_output)
+            lines.append(line(regexes.LinearSolverTime, linear_solver_time=self.duration(2e-3)))
+            lines.extend(self.convergence(iteration))
+            lines.append(line(regexes.IterationTime, iteration_number=iteration, iteration_time=self.duration(4e-3)))
+        if coupling_iteration is None:
+            lines.append(line(regexes.TimeStepSolutionTime, process=process,
+                              time_step_solution_time=self.duration(2e-2), time_step=time_step))
+        else:
+            lines.append(line(regexes.TimeStepSolutionTimeCoupledScheme, process=process,
+                              time_step_solution_time=self.duration(2e-2), time_step=time_step,
+                              coupling_iteration=coupling_iteration))
+        return lines
+
+    def time_step(self, time_step, step_size):
+        # lines of one rank
+        lines = [line(regexes.TimeStepStartTime, time_step=time_step, step_start_time=self.time + step_size,
+                      step_size=step_size),
+                 'info: Calculate non-equilibrium initial residuum.']
+        if self.staggered:
+            for coupling_iteration in range(self.random.randint(*self.coupling_iterations)):
+                for process in range(2):
+                    if coupling_iteration > 0:
+                        lines.append(line(regexes.CouplingIterationConvergence, coupling_iteration_process=process))
+                        lines.extend(self.convergence(coupling_iteration))
+                    lines.extend(self.nonlinear_solve(time_step, process, coupling_iteration))
+        else:
+            lines.extend(self.nonlinear_solve(time_step, 0, None))
+        if self.random.random() < self.warnings:
+            lines.append(line(regexes.WarningMessage, message='The time step size is reduced.'))
+        lines.append(line(regexes.TimeStepFinishedTime, time_step=time_step,
+                          time_step_finished_time=self.duration(5e-2)))
+        lines.append(line(regexes.TimeStepOutputTime, time_step=time_step, output_time=self.duration(1e-3)))
+        return lines
+
+    def interleave(self, lines_of_rank):
+        # lines of all ranks, the order of the lines of one rank is kept
+        if self.mpi_processes == 1:
+            return [text + '\n' for text in lines_of_rank()]
+        state = self.random.getstate()
+        lines = []
+        for _ in range(self.mpi_processes):
+            self.random.setstate(state)
+            lines.append(lines_of_rank())
+        positions = [0] * self.mpi_processes
+        ranks = list(range(self.mpi_processes))
+        interleaved = []
+        while ranks:
+            rank = self.values.choice(ranks)
+            interleaved.append('[{}] {}\n'.format(rank, lines[rank][positions[rank]]))
+            positions[rank] += 1
+            if positions[rank] == len(lines[rank]):
+                ranks.remove(rank)
+        return interleaved
+
+    def header(self):
+        lines = ['info: This is OpenGeoSys-6 version 6.4.1.\n'] * self.mpi_processes
+        lines += ['info: OGS started on 2022-01-01 00:00:00+0100.\n'] * self.mpi_processes
+        return lines + self.interleave(lambda: [line(regexes.MeshReadTime, mesh_read_time=self.duration(1e-2)),
+                                                'info: Initialize processes.',
+                                                'info: Solve processes.',
+                                                line(regexes.TimeStepOutputTime, time_step=0,
+                                                     output_time=self.duration(1e-3))])
+
+    def footer(self):
+        return self.interleave(lambda: [line(regexes.SimulationExecutionTime,
+                                             execution_time=self.time * self.duration(1e-3)),
+                                        'info: OGS terminated on 2022-01-01 00:00:01+0100.'])
+
+    def lines(self, time_steps=None, size=None):
+        """Yields chunks of lines, until time_steps are written or the log has (at least) size bytes"""
+        if time_steps is None and size is None:
+            raise ValueError('time_steps or size is needed')
+        written = 0
+        chunk = self.header()
+        time_step = 0
+        while True:
+            written += sum(len(text) for text in chunk)
+            yield chunk
+            time_step += 1
+            if (time_steps is not None and time_step > time_steps) or (size is not None and written >= size):
+                break
+            step_size = self.random.choice([0.5, 1.0, 2.0])
+            chunk = self.interleave(lambda: self.time_step(time_step, step_size))
+            self.time += step_size
+        yield self.footer()
+
+
+def write_synthetic_log(file_name, time_steps=None, size=None, **kwargs):
+    """Writes a synthetic OGS log, see SyntheticLog for the options
+
+    Parameters
+    ----------
+    file_name : `str`
+    time_steps : `int`, optional
+        number of time steps
+    size : `int`, optional
+        approximate size of the log in bytes (time steps are written until it is reached)
+
+    Returns
+    -------
+    stats : `dict`
+        number of lines and bytes written
+    """
+    number_of_lines = 0
+    number_of_bytes = 0
+    with open(file_name, 'w') as file:
+        for chunk in SyntheticLog(**kwargs).lines(time_steps=time_steps, size=size):
+            file.writelines(chunk)
+            number_of_lines += len(chunk)
+            number_of_bytes += sum(len(text) for text in chunk)
+    return {"lines": number_of_lines, "bytes": number_of_bytes}
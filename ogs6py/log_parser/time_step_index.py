@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import json
+import mmap
+import os
+import re
+
+import numpy as np
+
+from ogs6py.log_parser.log_parser import compression, mpi_processes, match_columns, text_lines
+from ogs6py.log_parser.common_ogs_analyses import columns_to_dataframe
+
+
+def build_time_step_index(file_name, force_parallel=False):
+    """Records byte offset and line number of every "=== Time stepping at step #N" line per MPI process
+
+    Returns
+    -------
+    index : `dict`
+        "time_steps" maps each mpi_process to a list of [time_step, byte offset, line number]
+        in the order of the log file. The part in front of the first time step belongs to
+        time step 0 and is indexed at offset 0, line 1.
+    """
+    if compression(file_name) is not None:
+        raise RuntimeError('Random access by time step is not available for compressed logs.')
+    parallel_log = force_parallel or mpi_processes(file_name) > 1
+    stat = os.stat(file_name)
+    if parallel_log:
+        regex = re.compile(rb'^\[(\d+)\] info: === Time stepping at step #(\d+) ', re.MULTILINE)
+    else:
+        regex = re.compile(rb'^()info: === Time stepping at step #(\d+) ', re.MULTILINE)
+    time_steps = {}
+    if stat.st_size > 0:
+        with open(file_name, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+            line = 1
+            position = 0
+            for match in regex.finditer(mapped_file):
+                line += mapped_file[position:match.start()].count(b'\n')
+                position = match.start()
+                mpi_process = int(match.group(1) or 0)
+                time_steps.setdefault(mpi_process, [[0, 0, 1]]).append([int(match.group(2)), position, line])
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "parallel_log": parallel_log,
+            "time_steps": time_steps}
+
+
+def save_time_step_index(index, file_name):
+    with open(file_name, 'w') as file:
+        json.dump(index, file)
+
+
+def load_time_step_index(file_name):
+    with open(file_name) as file:
+        index = json.load(file)
+    index["time_steps"] = {int(mpi_process): entries for mpi_process, entries in index["time_steps"].items()}
+    return index
+
+
+def _time_step_windows(entries, size, time_steps):
+    # Merges the consecutive selected time steps to windows of (start offset, stop offset, start line)
+    windows = []
+    for (time_step, start, line), (_, stop, _) in zip(entries, entries[1:] + [[None, size, None]]):
+        if time_step not in time_steps:
+            continue
+        if windows and windows[-1][1] == start:
+            windows[-1][1] = stop
+        else:
+            windows.append([start, stop, line])
+    return windows
+
+
+def parse_time_steps(file_name, time_steps, index=None, force_parallel=False):
+    """Parses only the given time steps of a log file into a DataFrame (see columns_to_dataframe)
+
+    The log file is not read entirely, the byte ranges of the time steps are looked up in the index.
+    A time step starts with its "=== Time stepping" line and ends with the next one, records in
+    front of the first time step belong to time step 0. Iteration numbers and processes at the end
+    of the last selected time step are not known from following records for fill_ogs_context.
+
+    Parameters
+    ----------
+    file_name : `str`
+    time_steps : iterable of `int`
+        e.g. range(a, b), or range(0, n, 100) for a preview
+    index : `dict` or `str`, optional
+        index from build_time_step_index or the file name of a saved index.
+        An index not matching the size or the modification time of the log file is rebuilt.
+    force_parallel : `bool`, optional
+    """
+    if compression(file_name) is not None:
+        raise RuntimeError('Random access by time step is not available for compressed logs.')
+    if isinstance(index, str):
+        index = load_time_step_index(index)
+    stat = os.stat(file_name)
+    # A log rewritten with the same size (e.g. the same model run again) has other byte offsets
+    if index is None or index["size"] != stat.st_size or index.get("mtime_ns") != stat.st_mtime_ns:
+        index = build_time_step_index(file_name, force_parallel=force_parallel)
+    time_steps = set(time_steps)
+
+    windows = {mpi_process: _time_step_windows(entries, index["size"], time_steps)
+               for mpi_process, entries in index["time_steps"].items()}
+    # MPI processes write interleaved, the union of all windows is parsed and filtered per process
+    ranges = sorted(window for process_windows in windows.values() for window in process_windows)
+    merged = []
+    for start, stop, line in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop, line])
+
+    columns = {}
+    with open(file_name, 'rb') as file:
+        for start, stop, line in merged:
+            file.seek(start)
+            window_columns = match_columns(text_lines(file.read(stop - start)), index["parallel_log"],
+                                           line_offset=line - 1)
+            for pattern_class, pattern_columns in window_columns.items():
+                if pattern_class not in columns:
+                    columns[pattern_class] = pattern_columns
+                    continue
+                for field, values in pattern_columns.items():
+                    columns[pattern_class][field].extend(values)
+    df = columns_to_dataframe(columns)
+    if df.empty:
+        return df
+
+    # Line numbers bounding the windows of each process
+    keep = np.zeros(len(df), dtype=bool)
+    line = df['line'].to_numpy(dtype=np.int64)
+    mpi_process = df['mpi_process'].to_numpy(dtype=np.int64)
+    for process, process_windows in windows.items():
+        entries = index["time_steps"][process]
+        line_of_offset = {offset: entry_line for _, offset, entry_line in entries}
+        for start, stop, start_line in process_windows:
+            stop_line = line_of_offset.get(stop, np.iinfo(np.int64).max)
+            keep |= (mpi_process == process) & (line >= start_line) & (line < stop_line)
+    return df[keep].reset_index(drop=True)
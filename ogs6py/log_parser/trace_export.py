@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import json
+import os
+
+from ogs6py.log_parser.log_parser import iter_records
+from ogs6py.ogs_regexes import ogs_regexes as regexes
+
+'''
+Export of the timings of a log as Chrome trace events (JSON), to be opened in Perfetto (ui.perfetto.dev) or
+chrome://tracing. The log has durations only, the timeline is reconstructed: the spans of a rank are laid out
+one after the other and nested as time step -> coupling iteration -> solution of a process -> iteration ->
+assembly / Dirichlet BCs / linear solver, the output follows its time step. A parent span is extended if its
+children take longer than its own measured time. All ranks start a time step together, when the slowest rank
+has finished the previous one; the time the other ranks wait is shown as "wait" span.
+'''
+
+trace_record_types = [regexes.MeshReadTime, regexes.TimeStepStartTime, regexes.AssemblyTime, regexes.DirichletTime,
+                      regexes.LinearSolverTime, regexes.IterationTime, regexes.TimeStepSolutionTime,
+                      regexes.TimeStepSolutionTimeCoupledScheme, regexes.TimeStepFinishedTime,
+                      regexes.TimeStepOutputTime, regexes.SimulationExecutionTime]
+
+# record type to name and duration field of the spans of a phase
+phase_spans = {regexes.AssemblyTime: ('assembly', 'assembly_time'),
+               regexes.DirichletTime: ('dirichlet', 'dirichlet_time'),
+               regexes.LinearSolverTime: ('linear solver', 'linear_solver_time')}
+
+
+class _RankTimeline:
+    # Spans of one rank, the times are relative to the start of their segment. A segment is a time step
+    # (a repeated time step gives a new segment), segment 0 is everything before the first time step.
+    def __init__(self):
+        self.spans = []
+        self.lengths = [0.0]
+        self.execution_time = None
+        self._start_segment()
+
+    def _start_segment(self):
+        self.cursor = 0.0
+        self.iteration_start = 0.0
+        self.solve_start = 0.0
+        self.coupling = None
+        self.time_step = None
+
+    def _span(self, name, category, start, duration, **args):
+        self.spans.append({'segment': len(self.lengths) - 1, 'name': name, 'cat': category, 'start': start,
+                           'duration': duration, 'args': args})
+
+    def _close_coupling(self):
+        # a coupling iteration ends with the solution of its last process
+        if self.coupling is not None:
+            iteration, start = self.coupling
+            self._span('coupling iteration {}'.format(iteration), 'coupling_iteration', start,
+                       self.solve_start - start, coupling_iteration=iteration, time_step=self.time_step)
+            self.coupling = None
+
+    def add(self, record):
+        record_type = type(record)
+        if record_type in phase_spans:
+            name, field = phase_spans[record_type]
+            duration = getattr(record, field)
+            self._span(name, 'phase', self.cursor, duration, line=record.line)
+            self.cursor += duration
+        elif record_type is regexes.IterationTime:
+            duration = max(record.iteration_time, self.cursor - self.iteration_start)
+            self._span('iteration {}'.format(record.iteration_number), 'iteration', self.iteration_start, duration,
+                       iteration_number=record.iteration_number, measured=record.iteration_time, line=record.line)
+            self.cursor = self.iteration_start = self.iteration_start + duration
+        elif record_type in (regexes.TimeStepSolutionTime, regexes.TimeStepSolutionTimeCoupledScheme):
+            args = {}
+            if record_type is regexes.TimeStepSolutionTimeCoupledScheme:
+                if self.coupling is None or self.coupling[0] != record.coupling_iteration:
+                    self._close_coupling()
+                    self.coupling = (record.coupling_iteration, self.solve_start)
+                args['coupling_iteration'] = record.coupling_iteration
+            duration = max(record.time_step_solution_time, self.cursor - self.solve_start)
+            self._span('solve process {}'.format(record.process), 'solve', self.solve_start, duration,
+                       process=record.process, measured=record.time_step_solution_time, line=record.line, **args)
+            self.cursor = self.solve_start = self.iteration_start = self.solve_start + duration
+        elif record_type is regexes.TimeStepStartTime:
+            self.lengths[-1] = self.cursor
+            self.lengths.append(0.0)
+            self._start_segment()
+            self.time_step = record.time_step
+            self._step_start = record
+        elif record_type is regexes.TimeStepFinishedTime:
+            self._close_coupling()
+            duration = max(record.time_step_finished_time, self.cursor)
+            args = {}
+            if self.time_step is not None:
+                args = dict(step_start_time=self._step_start.step_start_time, step_size=self._step_start.step_size)
+            self._span('time step {}'.format(record.time_step), 'time_step', 0.0, duration,
+                       time_step=record.time_step, measured=record.time_step_finished_time, line=record.line, **args)
+            self.cursor = duration
+        elif record_type is regexes.TimeStepOutputTime:
+            self._span('output', 'output', self.cursor, record.output_time, time_step=record.time_step,
+                       line=record.line)
+            self.cursor += record.output_time
+        elif record_type is regexes.MeshReadTime:
+            self._span('mesh read', 'input', self.cursor, record.mesh_read_time, line=record.line)
+            self.cursor += record.mesh_read_time
+        elif record_type is regexes.SimulationExecutionTime:
+            self.execution_time = record.execution_time
+
+    def finish(self):
+        self._close_coupling()
+        self.lengths[-1] = self.cursor
+
+
+def chrome_trace(log, force_parallel=False):
+    """Chrome trace events of the timings of a log
+
+    Parameters
+    ----------
+    log : `str` or iterable
+        log file or records (e.g. of parse_file) in the order of the log
+    force_parallel : `bool`, optional
+
+    Returns
+    -------
+    trace : `dict`
+        trace in the JSON object format, one thread (track) per MPI rank, times in microseconds
+    """
+    if isinstance(log, (str, os.PathLike)):
+        log = iter_records(log, force_parallel=force_parallel, pattern_classes=trace_record_types)
+    timelines = {}
+    for record in log:
+        if type(record) in trace_record_types:
+            timelines.setdefault(record.mpi_process, _RankTimeline()).add(record)
+    for timeline in timelines.values():
+        timeline.finish()
+
+    # all ranks start a segment when the slowest rank finished the previous one
+    number_of_segments = max((len(timeline.lengths) for timeline in timelines.values()), default=0)
+    segment_starts = [0.0]
+    for segment in range(number_of_segments):
+        segment_starts.append(segment_starts[-1] + max(
+            timeline.lengths[segment] for timeline in timelines.values() if segment < len(timeline.lengths)))
+
+    events = [{'name': 'process_name', 'ph': 'M', 'pid': 0, 'tid': 0, 'args': {'name': 'OGS'}}]
+    for rank, timeline in sorted(timelines.items()):
+        events.append({'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': rank,
+                       'args': {'name': 'rank {}'.format(rank)}})
+        events.append({'name': 'thread_sort_index', 'ph': 'M', 'pid': 0, 'tid': rank,
+                       'args': {'sort_index': rank}})
+        end = segment_starts[len(timeline.lengths)]
+        if timeline.execution_time is not None:
+            events.append({'name': 'simulation', 'cat': 'simulation', 'ph': 'X', 'pid': 0, 'tid': rank, 'ts': 0.0,
+                           'dur': max(timeline.execution_time, end) * 1e6,
+                           'args': {'execution_time': timeline.execution_time}})
+        for span in timeline.spans:
+            events.append({'name': span['name'], 'cat': span['cat'], 'ph': 'X', 'pid': 0, 'tid': rank,
+                           'ts': (segment_starts[span['segment']] + span['start']) * 1e6,
+                           'dur': span['duration'] * 1e6, 'args': span['args']})
+        if len(timelines) > 1:
+            for segment, length in enumerate(timeline.lengths):
+                wait = segment_starts[segment + 1] - segment_starts[segment] - length
+                if wait > 0:
+                    events.append({'name': 'wait', 'cat': 'wait', 'ph': 'X', 'pid': 0, 'tid': rank,
+                                   'ts': (segment_starts[segment] + length) * 1e6, 'dur': wait * 1e6, 'args': {}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def write_chrome_trace(log, file_name, force_parallel=False):
+    """Writes the Chrome trace events of a log (see chrome_trace) to a JSON file"""
+    with open(file_name, 'w') as file:
+        json.dump(chrome_trace(log, force_parallel=force_parallel), file)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2012-2022, OpenGeoSys Community (http://www.opengeosys.org)
+#            Distributed under a Modified BSD License.
+#              See accompanying file LICENSE.txt or
+#              http://www.opengeosys.org/project/license
+
+import abc
+import math
+import time
+from dataclasses import dataclass
+
+from ogs6py.log_parser.log_parser import compile_patterns
+from ogs6py.ogs_regexes import ogs_regexes as regexes
+
+'''
+Watchdog for running simulations: rules look at the records of the log while OGS runs
+(see OGS.run_model(live=True, watchdog=...)) and the run is terminated as soon as a rule fires.
+Only the record types the rules need are parsed.
+'''
+
+
+@dataclass
+class WatchdogReason:
+    rule: str
+    message: str
+    time_step: int
+    line: int
+    mpi_process: int
+    value: float
+
+
+class Rule(abc.ABC):
+    record_types = []
+
+    def start(self):
+        """Called when the watched run starts, resets the state of a previous run"""
+
+    @abc.abstractmethod
+    def update(self, record, time_step):
+        """Returns a WatchdogReason if the rule fires for the record, None otherwise"""
+
+    def _reason(self, record, time_step, message, value):
+        return WatchdogReason(rule=type(self).__name__, message=message, time_step=time_step, line=record.line,
+                              mpi_process=record.mpi_process, value=value)
+
+
+class MaxIterations(Rule):
+    """Fires if the number of nonlinear iterations of consecutive_steps consecutive time steps exceeds
+    max_iterations (the largest iteration number of a time step counts, as in time_step_vs_iterations)"""
+    record_types = [regexes.IterationTime, regexes.TimeStepFinishedTime]
+
+    def __init__(self, max_iterations, consecutive_steps=1):
+        self.max_iterations = max_iterations
+        self.consecutive_steps = consecutive_steps
+        self.start()
+
+    def start(self):
+        self.iterations = {}
+        self.exceeded = {}
+
+    def update(self, record, time_step):
+        if hasattr(record, 'iteration_number'):
+            self.iterations[record.mpi_process] = max(self.iterations.get(record.mpi_process, 0),
+                                                      record.iteration_number)
+            return None
+        iterations = self.iterations.pop(record.mpi_process, 0)
+        if iterations > self.max_iterations:
+            self.exceeded[record.mpi_process] = self.exceeded.get(record.mpi_process, 0) + 1
+        else:
+            self.exceeded[record.mpi_process] = 0
+        if self.exceeded[record.mpi_process] >= self.consecutive_steps:
+            return self._reason(record, time_step, '{} iterations in time step {}, more than {} in {} consecutive '
+                                'time step(s)'.format(iterations, time_step, self.max_iterations,
+                                                      self.consecutive_steps), iterations)
+        return None
+
+
+class NonFiniteConvergence(Rule):
+    """Fires if |dx|, |x| or |dx|/|x| of a convergence criterion is nan or inf
+
+    OGS prints |dx|/|x|=nan in the first iteration of a nonlinear solve, this is ignored
+    unless ignore_first_iteration is False.
+    """
+    record_types = [regexes.TimeStepConvergenceCriterion, regexes.ComponentConvergenceCriterion,
+                    regexes.IterationTime, regexes.TimeStepStartTime, regexes.TimeStepSolutionTime,
+                    regexes.TimeStepSolutionTimeCoupledScheme]
+
+    def __init__(self, ignore_first_iteration=True):
+        self.ignore_first_iteration = ignore_first_iteration
+        self.start()
+
+    def start(self):
+        self.iteration = {}
+
+    def update(self, record, time_step):
+        if hasattr(record, 'iteration_number'):
+            self.iteration[record.mpi_process] = record.iteration_number + 1
+            return None
+        if not hasattr(record, 'dx'):
+            # a new nonlinear solve starts
+            self.iteration[record.mpi_process] = 1
+            return None
+        first_iteration = self.iteration.get(record.mpi_process, 1) == 1
+        for field in ['dx', 'x', 'dx_x']:
+            value = getattr(record, field)
+            if math.isfinite(value):
+                continue
+            if field == 'dx_x' and math.isnan(value) and first_iteration and self.ignore_first_iteration:
+                continue
+            return self._reason(record, time_step, '{} is {} in time step {}'.format(field, value, time_step), value)
+        return None
+
+
+class MinStepSize(Rule):
+    """Fires if the time step size drops below floor"""
+    record_types = [regexes.TimeStepStartTime]
+
+    def __init__(self, floor):
+        self.floor = floor
+
+    def update(self, record, time_step):
+        if record.step_size < self.floor:
+            return self._reason(record, time_step, 'time step size {} in time step {} is below {}'.format(
+                record.step_size, time_step, self.floor), record.step_size)
+        return None
+
+
+class WallClockBudget(Rule):
+    """Fires if the projected wall clock time of the run exceeds budget (in seconds)
+
+    The projection extrapolates the elapsed wall clock time linearly from the simulated time
+    (step start time) to end_time. It is checked once min_progress of the simulated time has passed.
+    Without end_time, the rule fires when the elapsed time exceeds the budget.
+    """
+    record_types = [regexes.TimeStepStartTime]
+
+    def __init__(self, budget, end_time=None, start_time=0.0, min_progress=0.01, clock=time.monotonic):
+        self.budget = budget
+        self.end_time = end_time
+        self.start_time = start_time
+        self.min_progress = min_progress
+        self.clock = clock
+        self.start()
+
+    def start(self):
+        self.started = self.clock()
+
+    def update(self, record, time_step):
+        elapsed = self.clock() - self.started
+        if self.end_time is None:
+            projected = elapsed
+        else:
+            progress = (record.step_start_time - self.start_time) / (self.end_time - self.start_time)
+            if progress < self.min_progress:
+                return None
+            projected = elapsed / progress
+        if projected > self.budget:
+            return self._reason(record, time_step, 'projected wall clock time {:.1f} s exceeds the budget of {} s'
+                                .format(projected, self.budget), projected)
+        return None
+
+
+class Watchdog:
+    """Applies rules to the records of a running simulation, the first reason is kept
+
+    Parameters
+    ----------
+    rules : `list`
+        e.g. [MaxIterations(20, consecutive_steps=3), NonFiniteConvergence(), MinStepSize(1e-6)]
+
+    Example
+    -------
+    >>> watchdog = Watchdog([MaxIterations(20, 3), NonFiniteConvergence()])
+    >>> reason = model.run_model(live=True, watchdog=watchdog)
+    """
+    def __init__(self, rules):
+        self.rules = rules
+        self.reason = None
+        self.time_step = {}
+        self.record_types = [regexes.TimeStepStartTime]
+        for rule in rules:
+            self.record_types += [record_type for record_type in rule.record_types
+                                  if record_type not in self.record_types]
+        self._patterns = None
+        self._number_of_lines = 0
+
+    def update(self, record):
+        """Applies the rules to a record, returns the reason if a rule fires (or fired before)"""
+        if self.reason is not None:
+            return self.reason
+        if hasattr(record, 'time_step'):
+            self.time_step[record.mpi_process] = record.time_step
+        time_step = self.time_step.get(record.mpi_process, 0)
+        for rule in self.rules:
+            if type(record) not in rule.record_types:
+                continue
+            reason = rule.update(record, time_step)
+            if reason is not None:
+                self.reason = reason
+                break
+        return self.reason
+
+    def start(self, parallel_log):
+        """Prepares update_line for the lines of a (parallel) log, the reason and the state of the rules
+        of a previous run are reset"""
+        self._patterns = compile_patterns(parallel_log, pattern_classes=self.record_types)
+        self._number_of_lines = 0
+        self.reason = None
+        self.time_step = {}
+        for rule in self.rules:
+            rule.start()
+
+    def update_line(self, line):
+        """Parses a log line (see start) and applies the rules to its record"""
+        self._number_of_lines += 1
+        dispatcher, candidates, try_match = self._patterns
+        match = dispatcher.match(line) if dispatcher is not None else None
+        for key, value in (candidates[match.lastindex] if match else candidates[0]):
+            if r := try_match(line, self._number_of_lines, key, value):
+                return self.update(value(*r))
+        return self.reason
+
+    def watch(self, records):
+        """Applies the rules to records (e.g. from online_analyses.tail_records) until a rule fires"""
+        for record in records:
+            if self.update(record) is not None:
+                break
+        return self.reason
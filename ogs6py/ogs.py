@@ -16,12 +16,105 @@ import os
 import subprocess
 import time
 import shutil
-import pandas as pd
+import signal
+from collections import deque
 from lxml import etree as ET
 from ogs6py.classes import (geo, mesh, python_script, processes, media, timeloop,
         local_coordinate_system, parameters, curves, processvars, linsolvers, nonlinsolvers)
 import ogs6py.log_parser.log_parser as parser
-import ogs6py.log_parser.common_ogs_analyses as parse_fcts
+from ogs6py.ogs_regexes.ogs_regexes import analysis_record_types, record_types
+import ogs6py.log_parser.numpy_backend as np_backend
+# pandas and the modules using it (common_ogs_analyses, log_cache, time_step_index)
+# are imported when a log is parsed with the pandas backend
+
+# compressor command and file extension for compressed logs
+compressors = {"gzip": ("gzip -c", ".gz"), "xz": ("xz -c", ".xz"), "zstd": ("zstd -c -q", ".zst")}
+
+
+def _popen_options():
+    # ogs runs in its own process group, it can be terminated together with a wrapper (e.g. mpirun)
+    if sys.platform == "win32":
+        return {}
+    return {"executable": "/bin/bash", "start_new_session": True}
+
+
+def _terminate(process, sig=signal.SIGTERM):
+    if sys.platform == "win32":
+        process.terminate()
+        return
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+class ModelRun:
+    """Handle of a simulation started by OGS.start_model
+
+    Attributes
+    ----------
+    model : `OGS`
+    process : `subprocess.Popen`
+    logfile : `str`
+        None if the simulation runs without log
+    """
+    def __init__(self, model, process, logfile):
+        self.model = model
+        self.process = process
+        self.logfile = logfile
+        self._start = time.time()
+        self._stop = None
+
+    def _finish(self):
+        if self._stop is None:
+            self._stop = time.time()
+            self.model.exec_time = self.exec_time
+
+    def poll(self):
+        """Returns the return code of ogs, None if it is still running"""
+        returncode = self.process.poll()
+        if not returncode is None:
+            self._finish()
+        return returncode
+
+    def wait(self, timeout=None):
+        """Waits until ogs exits and returns its return code
+
+        Raises subprocess.TimeoutExpired if ogs is still running after timeout seconds.
+        """
+        returncode = self.process.wait(timeout)
+        self._finish()
+        return returncode
+
+    def terminate(self):
+        """Terminates ogs (and its wrapper), see wait for the return code"""
+        _terminate(self.process)
+
+    def kill(self):
+        if sys.platform == "win32":
+            self.process.kill()
+        else:
+            _terminate(self.process, signal.SIGKILL)
+
+    @property
+    def returncode(self):
+        return self.poll()
+
+    @property
+    def exec_time(self):
+        """Time since the start, the execution time when ogs has exited"""
+        return (time.time() if self._stop is None else self._stop) - self._start
+
+    def tail(self, lines=10):
+        """Returns the last lines written to the log so far"""
+        if self.logfile is None or not os.path.isfile(self.logfile):
+            return []
+        with parser.open_log(self.logfile) as file:
+            return [line.rstrip("\n") for line in deque(file, maxlen=lines)]
+
+    def parse_out(self, **kwargs):
+        """Parses the log, see OGS.parse_out"""
+        return self.model.parse_out(logfile=self.logfile, **kwargs)
 
 class OGS:
     """Class for an OGS6 model.
@@ -426,7 +519,8 @@ class OGS:
         parameterpointer = self._get_parameter_pointer(mediumpointer, name, xpathparameter)
         self._set_type_value(parameterpointer, value, propertytype, valuetag=valuetag)
 
-    def run_model(self, logfile="out.log", path=None, args=None, container_path=None, wrapper=None, write_logs=True):
+    def run_model(self, logfile="out.log", path=None, args=None, container_path=None, wrapper=None, write_logs=True,
+            compress=None, live=False, tail_lines=10, watchdog=None):
         """Command to run OGS.
 
         Runs OGS with the project file specified as PROJECT_FILE
@@ -448,8 +542,110 @@ class OGS:
             add a wrapper command. E.g. mpirun
         write_logs: `bolean`, optional
             set False to omit logging
+        compress : `str`, optional
+            "gzip", "xz" or "zstd": STDOUT of ogs is piped into the compressor
+            instead of being written to a plain log file. The file extension
+            is appended to the name of the log file if it is missing.
+        live : `bool`, optional
+            reads STDOUT of ogs from a pipe while the simulation runs: the lines are
+            parsed and written (compressed by Python if compress is given) to the
+            log file. The records are ready when ogs exits, parse_out takes them
+            instead of reading the log file again.
+        tail_lines : `int`, optional
+            number of the last lines of STDOUT that are printed if ogs fails
+        watchdog : `ogs6py.log_parser.watchdog.Watchdog`, optional
+            rules applied to the log while ogs runs (implies live), ogs is terminated
+            as soon as a rule fires.
+
+        Returns
+        -------
+        reason : `ogs6py.log_parser.watchdog.WatchdogReason`
+            why the watchdog terminated ogs, None if it was not terminated.
+            It is also stored as watchdog_reason.
+        """
+
+        cmd = self._ogs_command(logfile, path, args, container_path, wrapper, compress, live or not watchdog is None)
+        self._live_records = None
+        self.watchdog_reason = None
+        if live is True or not watchdog is None:
+            return self._run_live(cmd + self.prjfile, write_logs, compress, tail_lines, watchdog)
+        cmd = self._logging_command(cmd, write_logs, compress)
+        startt = time.time()
+        if sys.platform == "win32":
+            returncode = subprocess.run(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+        else:
+            returncode = subprocess.run(cmd, shell=True, executable="/bin/bash", stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+        stopt = time.time()
+        self.exec_time = stopt - startt
+        self._check_returncode(returncode.returncode, write_logs)
+
+    def start_model(self, logfile="out.log", path=None, args=None, container_path=None, wrapper=None,
+            write_logs=True, compress=None):
+        """Starts OGS without waiting for it.
+
+        The options are the ones of run_model (live parsing is not available).
+        Each OGS object should run one simulation at a time.
+
+        Returns
+        -------
+        run : `ModelRun`
+            handle of the simulation, e.g. run.poll(), run.wait(timeout),
+            run.terminate(), run.exec_time, run.tail() or run.parse_out()
+        """
+        cmd = self._ogs_command(logfile, path, args, container_path, wrapper, compress, False)
+        cmd = self._logging_command(cmd, write_logs, compress)
+        self._live_records = None
+        process = subprocess.Popen(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT,
+                **_popen_options())
+        return ModelRun(self, process, self.logfile if write_logs is True else None)
+
+    async def run_model_async(self, logfile="out.log", path=None, args=None, container_path=None, wrapper=None,
+            write_logs=True, compress=None):
+        """Runs OGS as run_model, as coroutine.
+
+        Several simulations (of different OGS objects) can run concurrently in one
+        event loop, e.g. asyncio.gather(*(model.run_model_async() for model in models)).
+        If the coroutine is cancelled, ogs is terminated.
         """
+        import asyncio
+        cmd = self._ogs_command(logfile, path, args, container_path, wrapper, compress, False)
+        cmd = self._logging_command(cmd, write_logs, compress)
+        self._live_records = None
+        if sys.platform == "win32":
+            shell = [os.environ.get("COMSPEC", "cmd.exe"), "/c"]
+        else:
+            shell = ["/bin/bash", "-c"]
+        startt = time.time()
+        process = await asyncio.create_subprocess_exec(*shell, cmd, stdout=subprocess.DEVNULL,
+                stderr=subprocess.STDOUT, start_new_session=sys.platform != "win32")
+        try:
+            returncode = await process.wait()
+        except asyncio.CancelledError:
+            _terminate(process)
+            await process.wait()
+            raise
+        stopt = time.time()
+        self.exec_time = stopt - startt
+        self._check_returncode(returncode, write_logs)
+
+    def _check_returncode(self, returncode, write_logs):
+        if returncode == 0:
+            print(f"OGS finished with project file {self.prjfile}.")
+            print(f"Execution took {self.exec_time} s")
+        else:
+            print(f"Error code: {returncode}")
+            if write_logs is False:
+                raise RuntimeError('OGS execution was not successful. Please set write_logs to True to obtain more information.')
+            with parser.open_log(self.logfile) as file:
+                num_lines = sum(1 for line in file)
+            with parser.open_log(self.logfile) as file:
+                for i, line in enumerate(file):
+                    if i > num_lines-10:
+                        print(line)
+            raise RuntimeError('OGS execution was not successful.')
 
+    def _ogs_command(self, logfile, path, args, container_path, wrapper, compress, live):
+        # checks the options of run_model and returns the command without project file
         ogs_path = ""
         if self.threads is None:
             env_export = ""
@@ -470,6 +666,16 @@ class OGS:
             ogs_path += path
         if not logfile is None:
             self.logfile = logfile
+        if not compress is None:
+            if sys.platform == "win32":
+                raise RuntimeError('Compressing the log is only possible in Linux and macOS.')
+            if compress not in compressors:
+                raise RuntimeError(f'Unknown compression {compress}, available: {", ".join(compressors)}.')
+            compressor, extension = compressors[compress]
+            if live is False and shutil.which(compressor.split()[0]) is None:
+                raise RuntimeError(f'The executable {compressor.split()[0]} for compressing the log was not found.')
+            if not self.logfile.endswith(extension):
+                self.logfile += extension
         if not container_path is None:
             if sys.platform == "win32":
                 raise RuntimeError('Running OGS in a Singularity container is only possible in Linux. See https://sylabs.io/guides/3.0/user-guide/installation.html for Windows solutions.')
@@ -491,30 +697,88 @@ class OGS:
             cmd += "exec " + f"{container_path} " + "ogs "
         if not args is None:
             cmd += f"{args} "
-        if write_logs is True:
+        return cmd
+
+    def _logging_command(self, cmd, write_logs, compress):
+        if write_logs is True and not compress is None:
+            # the return code of ogs, not of the compressor, is of interest
+            cmd = f"set -o pipefail && {cmd}{self.prjfile} | {compressors[compress][0]} > {self.logfile}"
+        elif write_logs is True:
             cmd += f"{self.prjfile} > {self.logfile}"
         else:
             cmd += f"{self.prjfile}"
+        return cmd
+
+    def _run_live(self, cmd, write_logs, compress, tail_lines, watchdog=None):
+        tail = deque(maxlen=tail_lines)
+        log = parser.open_log_writer(self.logfile, compress) if write_logs is True else None
         startt = time.time()
-        if sys.platform == "win32":
-            returncode = subprocess.run(cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
-        else:
-            returncode = subprocess.run(cmd, shell=True, executable="/bin/bash", stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+        process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                **_popen_options())
+
+        def lines():
+            for line in process.stdout:
+                tail.append(line)
+                if log is not None:
+                    log.write(line)
+                yield line
+        try:
+            parallel_log, stream = parser.read_header(lines())
+            if not watchdog is None:
+                stream = self._watch(stream, parallel_log, watchdog, process)
+            columns = parser.match_columns(stream, parallel_log)
+        except BaseException:
+            # e.g. KeyboardInterrupt or a parser error, ogs does not keep running unmonitored
+            _terminate(process)
+            process.wait()
+            raise
+        finally:
+            if log is not None:
+                log.close()
+            process.stdout.close()
+        returncode = process.wait()
         stopt = time.time()
         self.exec_time = stopt - startt
-        if returncode.returncode == 0:
+        # parse_out takes the records as long as the log file is not changed
+        stat = os.stat(self.logfile) if write_logs is True else None
+        self._live_records = (self.logfile, stat and (stat.st_size, stat.st_mtime_ns), columns)
+        if not self.watchdog_reason is None:
+            print(f"OGS was terminated by the watchdog: {self.watchdog_reason.message}")
+            return self.watchdog_reason
+        if returncode == 0:
             print(f"OGS finished with project file {self.prjfile}.")
             print(f"Execution took {self.exec_time} s")
         else:
-            print(f"Error code: {returncode.returncode}")
-            if write_logs is False:
-                raise RuntimeError('OGS execution was not successful. Please set write_logs to True to obtain more information.')
-            num_lines = sum(1 for line in open(self.logfile))
-            with open(self.logfile) as file:
-                for i, line in enumerate(file):
-                    if i > num_lines-10:
-                        print(line)
+            print(f"Error code: {returncode}")
+            for line in tail:
+                print(line.rstrip("\n"))
             raise RuntimeError('OGS execution was not successful.')
+        return None
+
+    def _watch(self, stream, parallel_log, watchdog, process):
+        watchdog.start(parallel_log)
+        for line in stream:
+            if self.watchdog_reason is None and not watchdog.update_line(line) is None:
+                self.watchdog_reason = watchdog.reason
+                _terminate(process)
+            yield line
+
+    def _live_columns(self, logfile, pattern_classes=None):
+        # Records parsed by run_model(live=True) for logfile, None if not available
+        live_records = getattr(self, "_live_records", None)
+        if live_records is None or live_records[0] != logfile:
+            return None
+        if live_records[1] is not None:
+            if not os.path.isfile(logfile):
+                return None
+            stat = os.stat(logfile)
+            if (stat.st_size, stat.st_mtime_ns) != live_records[1]:
+                return None
+        columns = live_records[2]
+        if pattern_classes is not None:
+            columns = {pattern_class: pattern_columns for pattern_class, pattern_columns in columns.items()
+                       if pattern_class in pattern_classes}
+        return columns
 
     def write_input(self, keep_includes=False):
         """Writes the projectfile to disk
@@ -573,7 +837,9 @@ class OGS:
                          pretty_print=True)
         return True
 
-    def parse_out(self, logfile=None, filter=None, maximum_lines=None, reset_index=True):
+    def parse_out(self, logfile=None, filter=None, maximum_lines=None, reset_index=True, chunksize=None,
+            workers=None, cache=False, time_steps=None, time_step_index=None, by_rank=False, compact=False,
+            backend="pandas"):
         """Parses the logfile
 
         Parameters
@@ -583,17 +849,132 @@ class OGS:
             Default: File specified already as logfile by runmodel
         maximum_lines : `int`
             maximum number of lines to be evaluated
-        filter : `str`, optional
+        filter : `str` or `list`, optional
             can be "by_time_step". "convergence_newton_iteration",
             "convergence_coupling_iteration", or "time_step_vs_iterations"
             if filter is None, the raw dataframe is returned.
+            For a list of filters, a `dict` of filter to dataframe is returned,
+            the analyses are computed together (see common_ogs_analyses.analyze).
+        chunksize : `int`, optional
+            if given, a generator is returned that yields dataframes of at most
+            chunksize records, the log file is read lazily.
+            Filters are not available for chunked parsing.
+        workers : `int`, optional
+            number of processes parsing chunks of the log file in parallel
+        cache : `bool` or `str`, optional
+            keeps the parsed log on disk, only lines appended to the log since
+            the last call are parsed. If a `str` is given, it is the cache directory,
+            otherwise the cache is placed next to the log file.
+        time_steps : iterable of `int`, optional
+            parses only these time steps, e.g. range(a, b) or range(0, n, 100).
+            The log file is accessed by the byte offsets of the time steps.
+        time_step_index : `dict` or `str`, optional
+            index (or file name of a saved index) created by
+            time_step_index.build_time_step_index, it is built if not given.
+        by_rank : `bool`, optional
+            splits an MPI log by rank and parses each rank in its own worker
+            process (if workers are given). A `dict` of rank to dataframe is returned.
+        compact : `bool` or `dict`, optional
+            reduces the memory of the dataframe (categorical type and message,
+            small integer dtypes). A `dict` is passed as keyword arguments to
+            common_ogs_analyses.compact_dataframe, e.g. {"float32": True, "sparse": True}.
+            Only applies if no analysis filter is given.
+        backend : `str`, optional
+            "pandas", "numpy", "polars" (needs the package polars) or "arrow" (needs
+            the package pyarrow). pandas is not imported for the numpy, polars and
+            arrow backends. Without filter, the numpy backend returns a `dict` of record
+            type to structured array, the polars backend a polars DataFrame with filled
+            context and the arrow backend an Arrow table of the records (see
+            arrow_export.columns_to_arrow). For "fill_ogs_context", the numpy backend
+            returns a `dict` of column to array (see numpy_backend.fill_context).
+            Analyses return a structured array (numpy), a polars DataFrame or an Arrow
+            table. Only the options filter and logfile are available.
+
+        For an analysis filter only the records needed by the analysis are parsed
+        (see ogs_regexes.analysis_record_types).
         """
         if logfile is None:
             logfile = self.logfile
-        records = parser.parse_file(logfile, maximum_lines=maximum_lines, force_parallel=False)
-        df = pd.DataFrame(records)
-
-        df = parse_fcts.fill_ogs_context(df)
+        pattern_classes = None
+        analyses = filter if isinstance(filter, (list, tuple)) else [filter]
+        if all(analysis in analysis_record_types for analysis in analyses):
+            pattern_classes = record_types(analyses)
+        if backend != "pandas":
+            if backend not in ("numpy", "polars", "arrow"):
+                raise RuntimeError(f'Unknown backend {backend}, available: pandas, numpy, polars, arrow.')
+            if (chunksize is not None or workers is not None or cache is not False or time_steps is not None
+                    or by_rank is not False or compact is not False or maximum_lines is not None):
+                raise RuntimeError(f'Only filter is available for the {backend} backend.')
+            return self._parse_out_numpy(logfile, filter, backend, pattern_classes,
+                                         self._live_columns(logfile, pattern_classes if filter is not None else None))
+        import pandas as pd
+        import ogs6py.log_parser.common_ogs_analyses as parse_fcts
+        import ogs6py.log_parser.log_cache as log_cache
+        import ogs6py.log_parser.time_step_index as ts_index
+        if chunksize is not None:
+            if filter not in (None, "fill_ogs_context"):
+                raise RuntimeError('Filters are not available for chunked parsing.')
+            return self._parse_out_chunks(logfile, maximum_lines, reset_index, chunksize)
+        if by_rank is True:
+            dfs = {}
+            for rank, columns in parser.parse_columns_by_rank(logfile, workers=workers).items():
+                df = parse_fcts.columns_to_dataframe(columns)
+                if not df.empty:
+                    df = parse_fcts.fill_ogs_context(df, single_process=True)
+                dfs[rank] = self._filter_df(df, filter, reset_index, compact)
+            return dfs
+        if time_steps is not None:
+            df = ts_index.parse_time_steps(logfile, time_steps, index=time_step_index)
+        elif cache is not False:
+            if maximum_lines is not None:
+                raise RuntimeError('maximum_lines is not available for cached parsing.')
+            df = log_cache.parse_columns_cached(logfile, cache_dir=None if cache is True else cache)
+        elif workers is None:
+            columns = self._live_columns(logfile, pattern_classes) if maximum_lines is None else None
+            if columns is None:
+                columns = parser.parse_columns(logfile, maximum_lines=maximum_lines, force_parallel=False,
+                                               pattern_classes=pattern_classes)
+            df = parse_fcts.columns_to_dataframe(columns)
+        else:
+            records = parser.parse_file(logfile, maximum_lines=maximum_lines, force_parallel=False, workers=workers,
+                                        pattern_classes=pattern_classes)
+            df = pd.DataFrame(records)
+
+        if not df.empty:
+            df = parse_fcts.fill_ogs_context(df)
+        return self._filter_df(df, filter, reset_index, compact)
+
+    @staticmethod
+    def _parse_out_numpy(logfile, filter, backend, pattern_classes, columns=None):
+        if columns is None:
+            columns = parser.parse_columns(logfile, pattern_classes=pattern_classes)
+        if filter is None and backend == "numpy":
+            return np_backend.columns_to_arrays(columns)
+        if backend == "arrow":
+            import ogs6py.log_parser.arrow_export as arrow_export
+            if filter is None:
+                return arrow_export.columns_to_arrow(columns)
+        table = np_backend.fill_context(np_backend.arrays_to_table(np_backend.columns_to_arrays(columns)))
+        if filter is None or filter == "fill_ogs_context":
+            if backend == "arrow":
+                return arrow_export.table_to_arrow(table)
+            return table if backend == "numpy" else np_backend.table_to_polars(table)
+        if backend == "arrow":
+            analysis = lambda table, name: arrow_export.table_to_arrow(np_backend.analysis(table, name))
+        else:
+            analysis = np_backend.analysis if backend == "numpy" else np_backend.analysis_polars
+        if isinstance(filter, (list, tuple)):
+            return {name: analysis(table, name) for name in filter}
+        return analysis(table, filter)
+
+    @staticmethod
+    def _filter_df(df, filter, reset_index, compact=False):
+        import ogs6py.log_parser.common_ogs_analyses as parse_fcts
+        if isinstance(filter, (list, tuple)):
+            results = parse_fcts.analyze(df, filter)
+            if reset_index is True:
+                return {name: pt.reset_index() for name, pt in results.items()}
+            return results
         filterdict = {"by_time_step":parse_fcts.analysis_time_step,
                 "convergence_newton_iteration":parse_fcts.analysis_convergence_newton_iteration,
                 "convergence_coupling_iteration": parse_fcts.analysis_convergence_coupling_iteration,
@@ -606,6 +987,18 @@ class OGS:
                 df = filterdict[filter](df)
             except KeyError:
                 print("Filter not available")
+        if compact is not False and filter in (None, "fill_ogs_context"):
+            df = parse_fcts.compact_dataframe(df, **(compact if isinstance(compact, dict) else {}))
         if reset_index is True:
             return df.reset_index()
         return df
+
+    @staticmethod
+    def _parse_out_chunks(logfile, maximum_lines, reset_index, chunksize):
+        import ogs6py.log_parser.common_ogs_analyses as parse_fcts
+        records = parser.iter_records(logfile, maximum_lines=maximum_lines, force_parallel=False)
+        for df in parse_fcts.fill_ogs_context_chunks(records, chunksize):
+            if reset_index is True:
+                yield df.reset_index()
+            else:
+                yield df
@@ -190,3 +190,30 @@ def ogs_regexes():
             ("error: (.*)", ErrorMessage),
             ("warning: (.*)", WarningMessage)
             ]
+
+
+# Records from which fill_ogs_context takes time step, iteration number and process
+context_record_types = [TimeStepStartTime, TimeStepOutputTime, TimeStepFinishedTime, TimeStepSolutionTime,
+                        TimeStepSolutionTimeCoupledScheme, IterationTime]
+
+convergence_record_types = [TimeStepConvergenceCriterion, ComponentConvergenceCriterion, CouplingIterationConvergence]
+
+# Record types each analysis needs in addition to the context. coupling_iteration_process is forward filled to
+# the next record only, the convergence criterion follows the header of the coupled solution directly.
+# simulation_termination returns rows of the DataFrame of all records (with their index), it is not listed.
+analysis_record_types = {"by_time_step": [AssemblyTime, LinearSolverTime, DirichletTime],
+                         "convergence_newton_iteration": convergence_record_types,
+                         "convergence_coupling_iteration": convergence_record_types,
+                         "time_step_vs_iterations": [],
+                         "analysis_simulation": [SimulationExecutionTime]}
+
+
+def record_types(analyses):
+    """Returns the record types that are needed for the analyses (names as in analysis_record_types)
+
+    The results of the analyses are the same if only these records are parsed.
+    """
+    types = list(context_record_types)
+    for name in analyses:
+        types += [record_type for record_type in analysis_record_types[name] if record_type not in types]
+    return types
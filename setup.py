@@ -54,6 +54,7 @@ setup(name="ogs6py",
       platforms=["Windows", "Linux", "Solaris", "Mac OS-X", "Unix"],
       include_package_data=True,
       python_requires='>=3.8',
-      install_requires=["lxml","pandas"],
-      py_modules=["ogs6py/ogs","ogs6py/log_parser/log_parser", "ogs6py/log_parser/common_ogs_analyses", "ogs6py/ogs_regexes/ogs_regexes"],
+      install_requires=["lxml","numpy","pandas"],
+      extras_require={"polars": ["polars"], "arrow": ["pyarrow"]},
+      py_modules=["ogs6py/ogs","ogs6py/ensemble","ogs6py/log_parser/log_parser", "ogs6py/log_parser/common_ogs_analyses", "ogs6py/ogs_regexes/ogs_regexes"],
       packages=["ogs6py/classes","ogs6py/log_parser","ogs6py/ogs_regexes"])
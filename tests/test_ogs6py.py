@@ -1,20 +1,47 @@
 import unittest
 
+import numpy as np
 import pandas as pd
 
 import tempfile
 import os
 import shutil
 import hashlib
+import subprocess
+import sys
+import importlib.util
+import gzip
+import lzma
+import json
+import asyncio
+import time
+import warnings
 from lxml import etree as ET
 
 from context import ogs6py
-from ogs6py.log_parser.log_parser import parse_file
+import re
+from ogs6py.log_parser import iter_records, parse_many
+from ogs6py.log_parser.performance_profile import performance_profile
+from ogs6py.log_parser.run_comparison import compare_runs
+from ogs6py.log_parser.parallel_analyses import load_imbalance, scaling_analysis
+from ogs6py.log_parser.trace_export import chrome_trace, write_chrome_trace
+from ogs6py.log_parser import arrow_export
+from ogs6py.ensemble import run_ensemble
+from ogs6py.log_parser import log_cache
+from ogs6py.log_parser.log_cache import cache_files
+from ogs6py.log_parser.synthetic_log import line_templates, write_synthetic_log
+from ogs6py.log_parser import numpy_backend
+from ogs6py.log_parser.online_analyses import OnlineAnalysis, OnlineAnalyses, follow_lines, tail_records
+from ogs6py.log_parser.watchdog import Watchdog, Rule, MaxIterations, NonFiniteConvergence, MinStepSize, WallClockBudget
+from ogs6py.log_parser.time_step_index import build_time_step_index, save_time_step_index, load_time_step_index
+from ogs6py.log_parser.log_parser import parse_file, parse_columns, compression, literal_prefix, mpi_processes, try_match_parallel_line, \
+    try_match_serial_line
+from ogs6py.ogs_regexes.ogs_regexes import ogs_regexes, record_types, TimeStepStartTime, IterationTime
 # this needs to be replaced with regexes from specific ogs version
 from collections import namedtuple, defaultdict
 from ogs6py.log_parser.common_ogs_analyses import fill_ogs_context, analysis_time_step, \
     analysis_convergence_newton_iteration, analysis_convergence_coupling_iteration, analysis_simulation_termination, \
-    time_step_vs_iterations
+    time_step_vs_iterations, columns_to_dataframe, analyze, analysis_functions, fill_ogs_context_chunks
 
 
 def log_types(records):
@@ -574,6 +601,830 @@ class TestiOGS(unittest.TestCase):
         self.assertEqual(
             dfe.at[10, 'iteration_number'], 5)
 
+    def test_literal_prefix(self):
+        self.assertEqual(literal_prefix('info: \\[time\\] Assembly took ([\\d\\.e+-]+) s'), 'info: [time] Assembly took ')
+        self.assertEqual(literal_prefix('warning: (.*)'), 'warning: ')
+        self.assertEqual(literal_prefix('infos?: (.*)'), 'info')
+        self.assertEqual(literal_prefix('error|warning: (.*)'), '')
+        self.assertEqual(literal_prefix('\\d+ took'), '')
+
+    def test_dispatcher_compare_linear_scan(self):
+        for filename, force_parallel in [('tests/parser/parallel_1_info.txt', True),
+                                         ('tests/parser/parallel_3_debug.txt', False),
+                                         ('tests/parser/serial_convergence_long.txt', False),
+                                         ('tests/parser/serial_time_step_rejected.txt', False),
+                                         ('tests/parser/serial_critical.txt', False)]:
+            parallel_log = force_parallel or mpi_processes(filename) > 1
+            process_regex = '\\[(\\d+)\\]\\ ' if parallel_log else ''
+            try_match = try_match_parallel_line if parallel_log else try_match_serial_line
+            patterns = [(re.compile(process_regex + k), v) for k, v in ogs_regexes()]
+            expected = []
+            with open(filename) as file:
+                for line_nr, line in enumerate(file, start=1):
+                    for key, value in patterns:
+                        if r := try_match(line, line_nr, key, value):
+                            expected.append(value(*r))
+                            break
+            records = parse_file(filename, force_parallel=force_parallel)
+            # repr, because nan != nan
+            self.assertEqual([repr(r) for r in records], [repr(r) for r in expected], filename)
+
+    def test_maximum_lines(self):
+        filename = 'tests/parser/serial_convergence_long.txt'
+        records = parse_file(filename)
+        expected = [repr(record) for record in records if record.line <= 100]
+        self.assertGreater(len(expected), 1)
+        self.assertEqual([repr(record) for record in parse_file(filename, maximum_lines=100)], expected)
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        chunks = pd.concat(model.parse_out(filename, maximum_lines=100, chunksize=10))
+        self.assertEqual(chunks['line'].max(), max(record.line for record in records if record.line <= 100))
+        df = model.parse_out(filename)
+        pd.testing.assert_frame_equal(model.parse_out(filename, maximum_lines=100)[['line', 'type']],
+                                      df[df['line'] <= 100][['line', 'type']])
+
+    def test_parse_out_chunksize(self):
+        filename = 'tests/parser/serial_convergence_long.txt'
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        df = model.parse_out(filename)
+        chunks = list(model.parse_out(filename, chunksize=100))
+        self.assertTrue(all(len(chunk) <= 100 for chunk in chunks))
+        df_chunks = pd.concat(chunks, ignore_index=True)
+        pd.testing.assert_frame_equal(df_chunks[df.columns], df)
+        records = list(iter_records(filename))
+        self.assertEqual(len(records), len(df))
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            filename = os.path.join(tmpdirname, 'out.log')
+            write_synthetic_log(filename, time_steps=5, staggered=True, components=2, seed=1)
+            df = fill_ogs_context(pd.DataFrame(parse_file(filename)))
+            for chunksize in [2, 3, 5, 7, 11]:
+                chunks = list(fill_ogs_context_chunks(iter_records(filename), chunksize))
+                self.assertTrue(all(len(chunk) <= chunksize for chunk in chunks))
+                pd.testing.assert_frame_equal(pd.concat(chunks)[df.columns], df)
+            # without process (e.g. a crashed run) the records are released after lookahead records
+            with open(filename) as file:
+                lines = [line for line in file if 'process' not in line]
+            with open(filename, 'w') as file:
+                file.writelines(lines)
+            records = list(iter_records(filename))
+            self.assertFalse(any(hasattr(record, 'process') for record in records))
+            consumed = []
+            chunks = fill_ogs_context_chunks((consumed.append(record) or record for record in records), 5,
+                                             lookahead=20)
+            first_chunk = next(chunks)
+            self.assertLessEqual(len(consumed), 2 * 20 + 5)
+            df = fill_ogs_context(pd.DataFrame(records))
+            pd.testing.assert_frame_equal(pd.concat([first_chunk, *chunks])[df.columns], df)
+
+    def test_parse_file_workers(self):
+        for filename, force_parallel in [('tests/parser/parallel_1_info.txt', True),
+                                         ('tests/parser/parallel_3_debug.txt', False),
+                                         ('tests/parser/serial_convergence_long.txt', False)]:
+            records = parse_file(filename, force_parallel=force_parallel)
+            records_workers = parse_file(filename, force_parallel=force_parallel, workers=3)
+            self.assertEqual([repr(r) for r in records_workers], [repr(r) for r in records], filename)
+
+    def test_columnar_compare_records(self):
+        for filename, force_parallel in [('tests/parser/parallel_1_info.txt', True),
+                                         ('tests/parser/parallel_3_debug.txt', False),
+                                         ('tests/parser/serial_convergence_long.txt', False)]:
+            df_records = fill_ogs_context(pd.DataFrame(parse_file(filename, force_parallel=force_parallel)))
+            df_columns = columns_to_dataframe(parse_columns(filename, force_parallel=force_parallel))
+            self.assertEqual(str(df_columns['time_step'].dtype), 'Int64')
+            pd.testing.assert_frame_equal(fill_ogs_context(df_columns), df_records)
+        df_critical = columns_to_dataframe(parse_columns('tests/parser/serial_critical.txt'))
+        pd.testing.assert_frame_equal(df_critical.astype(object),
+                                      pd.DataFrame(parse_file('tests/parser/serial_critical.txt')).astype(object))
+
+    def test_parse_out_cache(self):
+        filename = 'tests/parser/serial_convergence_long.txt'
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        df = model.parse_out(filename)
+        with open(filename, 'rb') as file:
+            content = file.read()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            logfile = os.path.join(tmpdir, 'out.log')
+            cache_dir = os.path.join(tmpdir, 'cache')
+            # simulation still running, last line incomplete
+            with open(logfile, 'wb') as file:
+                file.write(content[:len(content) // 2 + 10])
+            df_part = model.parse_out(logfile, cache=cache_dir)
+            pd.testing.assert_frame_equal(df_part, model.parse_out(logfile))
+            with open(cache_files(logfile, cache_dir)[1]) as file:
+                parsed_offset = json.load(file)['parsed_offset']
+            self.assertEqual(parsed_offset, content[:len(content) // 2 + 10].rfind(b'\n') + 1)
+            with open(logfile, 'ab') as file:
+                file.write(content[len(content) // 2 + 10:])
+            pd.testing.assert_frame_equal(model.parse_out(logfile, cache=cache_dir), df)
+            pd.testing.assert_frame_equal(model.parse_out(logfile, cache=cache_dir), df)
+            # rewritten log with a different beginning is parsed again
+            with open(logfile, 'wb') as file:
+                file.write(content.replace(b'Assembly took 7.9674e-05', b'Assembly took 8.9674e-05', 1))
+            df_rewritten = model.parse_out(logfile, cache=cache_dir)
+            self.assertEqual(df_rewritten['assembly_time'].dropna().iloc[0], 8.9674e-05)
+            # a corrupt cache is replaced
+            with open(cache_files(logfile, cache_dir)[0], 'wb') as file:
+                file.write(b'\x80\x04corrupt')
+            pd.testing.assert_frame_equal(model.parse_out(logfile, cache=cache_dir), df_rewritten)
+            # meta data of a wrong shape is replaced
+            with open(cache_files(logfile, cache_dir)[1]) as file:
+                meta = json.load(file)
+            del meta['tail']
+            for invalid in [[], meta]:
+                with open(cache_files(logfile, cache_dir)[1], 'w') as file:
+                    json.dump(invalid, file)
+                pd.testing.assert_frame_equal(model.parse_out(logfile, cache=cache_dir), df_rewritten)
+            # the cached data is loaded without unpickling
+            with np.load(cache_files(logfile, cache_dir)[0], allow_pickle=False) as arrays:
+                self.assertIn('columns', arrays)
+            # the new part of the log is read in blocks, lines across block boundaries are kept
+            block_size = log_cache.block_size
+            try:
+                log_cache.block_size = 1000
+                with open(logfile, 'wb') as file:
+                    file.write(content[:len(content) // 3 + 10])
+                model.parse_out(logfile, cache=cache_dir)
+                with open(logfile, 'ab') as file:
+                    file.write(content[len(content) // 3 + 10:])
+                pd.testing.assert_frame_equal(model.parse_out(logfile, cache=cache_dir), df)
+                with open(cache_files(logfile, cache_dir)[1]) as file:
+                    self.assertEqual(json.load(file)['number_of_lines'], content.count(b'\n'))
+            finally:
+                log_cache.block_size = block_size
+
+    def test_parse_out_time_steps(self):
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        for filename in ['tests/parser/parallel_3_debug.txt', 'tests/parser/serial_convergence_long.txt',
+                         'tests/parser/serial_time_step_rejected.txt']:
+            df = model.parse_out(filename)
+            index = build_time_step_index(filename)
+            with tempfile.TemporaryDirectory() as tmpdir:
+                index_file = os.path.join(tmpdir, 'index.json')
+                save_time_step_index(index, index_file)
+                self.assertEqual(load_time_step_index(index_file), index)
+                for time_steps in [range(0, 2), range(2, 5), range(0, 20, 3), [6]]:
+                    df_steps = model.parse_out(filename, time_steps=time_steps, time_step_index=index_file)
+                    self.assertEqual(list(df_steps['line']) if len(df_steps) else [],
+                                     list(df[df['time_step'].isin(list(time_steps))]['line']))
+        # a log rewritten with the same size has a stale index
+        with open('tests/parser/serial_convergence_long.txt', 'rb') as file:
+            lines = file.readlines()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            logfile = os.path.join(tmpdir, 'out.log')
+            with open(logfile, 'wb') as file:
+                file.writelines(lines)
+            index = build_time_step_index(logfile)
+            with open(logfile, 'wb') as file:
+                file.writelines(lines[1:] + lines[:1])
+            os.utime(logfile, ns=(index["mtime_ns"] + 10**9, index["mtime_ns"] + 10**9))
+            pd.testing.assert_frame_equal(model.parse_out(logfile, time_steps=[2, 3], time_step_index=index),
+                                          model.parse_out(logfile, time_steps=[2, 3]))
+
+    def test_parse_compressed_logs(self):
+        filename = 'tests/parser/parallel_3_debug.txt'
+        records = parse_file(filename)
+        with open(filename, 'rb') as file:
+            content = file.read()
+        compressors = {'gzip': gzip.compress, 'xz': lzma.compress}
+        try:
+            import zstandard
+            compressors['zstd'] = zstandard.ZstdCompressor().compress
+        except ImportError:
+            pass
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name, compress in compressors.items():
+                logfile = os.path.join(tmpdir, f'out.log.{name}')
+                with open(logfile, 'wb') as file:
+                    file.write(compress(content))
+                self.assertEqual(compression(logfile), name)
+                self.assertEqual(mpi_processes(logfile), 3)
+                self.assertEqual([repr(r) for r in parse_file(logfile, workers=2)], [repr(r) for r in records])
+                model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+                pd.testing.assert_frame_equal(model.parse_out(logfile, cache=os.path.join(tmpdir, 'cache')),
+                                              model.parse_out(filename))
+        self.assertIsNone(compression(filename))
+
+    def test_parse_out_by_rank(self):
+        filename = 'tests/parser/parallel_3_debug.txt'
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        df = model.parse_out(filename, reset_index=False)
+        for workers in [None, 3]:
+            dfs = model.parse_out(filename, by_rank=True, workers=workers, reset_index=False)
+            self.assertEqual(sorted(dfs), [0, 1, 2])
+            for rank, df_rank in dfs.items():
+                expected = df[df['mpi_process'] == rank].reset_index(drop=True)
+                pd.testing.assert_frame_equal(df_rank[expected.columns], expected)
+        dfe = model.parse_out(filename, by_rank=True, filter="by_time_step", reset_index=False)[1]
+        self.assertAlmostEqual(dfe.at[(1, 1), 'output_time'], 0.001833, 6)
+
+    def test_fill_ogs_context_compare_groupby(self):
+        for filename in ['tests/parser/parallel_3_debug.txt', 'tests/parser/serial_convergence_long.txt']:
+            df = pd.DataFrame(parse_file(filename))
+            # interleave the records of several processes
+            df_mixed = df.copy()
+            df_mixed['mpi_process'] = [i % 4 for i in range(len(df))]
+            for df_raw in [df, df_mixed]:
+                expected = df_raw.copy()
+                for column in ['line', 'mpi_process', 'time_step', 'iteration_number', 'component', 'process',
+                               'coupling_iteration', 'coupling_iteration_process']:
+                    if column in expected:
+                        expected[column] = expected[column].astype('Int64')
+                grouped = expected.groupby('mpi_process')
+                expected['time_step'] = grouped[['time_step']].ffill().fillna(value=0)
+                expected['iteration_number'] = grouped[['iteration_number']].bfill()
+                if 'component' in expected:
+                    expected['component'] = grouped[['component']].fillna(value=-1)
+                expected['process'] = grouped[['process']].bfill()
+                if 'coupling_iteration_process' in expected:
+                    expected['coupling_iteration_process'] = grouped[['coupling_iteration_process']].ffill(limit=1)
+                pd.testing.assert_frame_equal(fill_ogs_context(df_raw.copy()), expected)
+
+    def test_parse_out_compact(self):
+        filename = 'tests/parser/parallel_3_debug.txt'
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        df = model.parse_out(filename)
+        df_compact = model.parse_out(filename, compact=True)
+        self.assertEqual(str(df_compact['type'].dtype), 'category')
+        self.assertEqual(str(df_compact['mpi_process'].dtype), 'Int8')
+        self.assertEqual(str(df_compact['line'].dtype), 'Int16')
+        self.assertLess(df_compact.memory_usage(deep=True).sum(), df.memory_usage(deep=True).sum())
+        pd.testing.assert_frame_equal(df_compact.astype(object), df.astype(object))
+        df_float32 = model.parse_out(filename, compact={"float32": True, "sparse": True})
+        self.assertEqual(df_float32['assembly_time'].dtype, pd.SparseDtype(np.float32, np.nan))
+        self.assertEqual(df_float32['step_start_time'].dtype, pd.SparseDtype(np.float64, np.nan))
+        self.assertAlmostEqual(df_float32['assembly_time'].sparse.to_dense().sum(), df['assembly_time'].sum(), 5)
+
+    def test_analyze(self):
+        filename = 'tests/parser/serial_convergence_long.txt'
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        df = model.parse_out(filename, reset_index=False)
+        analyses = ['by_time_step', 'convergence_newton_iteration', 'convergence_coupling_iteration',
+                    'time_step_vs_iterations', 'analysis_simulation']
+        results = model.parse_out(filename, filter=analyses, reset_index=False)
+        self.assertEqual(list(results), analyses)
+        for name in analyses:
+            pd.testing.assert_frame_equal(results[name], analysis_functions[name](df))
+        with self.assertRaises(Exception):
+            analyze(df, ['not_an_analysis'])
+
+    def test_online_analyses(self):
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        for filename in ['tests/parser/serial_convergence_long.txt', 'tests/parser/serial_time_step_rejected.txt']:
+            df = model.parse_out(filename, reset_index=False)
+            results = OnlineAnalyses().update_many(tail_records(filename, idle_timeout=0)).results()
+            for name, result in results.items():
+                pd.testing.assert_frame_equal(result, analysis_functions[name](df), check_dtype=False)
+            # only the last 3 time steps are kept
+            results = OnlineAnalyses(window=3).update_many(tail_records(filename, idle_timeout=0)).results()
+            expected = time_step_vs_iterations(df)
+            pd.testing.assert_frame_equal(results['time_step_vs_iterations'], expected.iloc[-3:], check_dtype=False)
+            expected = analysis_time_step(df)
+            pd.testing.assert_frame_equal(results['by_time_step'],
+                                          expected[expected.index.get_level_values('time_step') >= expected.index.get_level_values('time_step')[-3]],
+                                          check_dtype=False)
+        # consecutive iterations without records waiting for back filling
+        records = [TimeStepStartTime('Info', 1, 0, 1, 0.0, 1.0), IterationTime('Info', 2, 0, 1, 0.1),
+                   IterationTime('Info', 3, 0, 2, 0.1)]
+        results = OnlineAnalyses().update_many(records).results()
+        self.assertEqual(results['time_step_vs_iterations']['iteration_number'].tolist(), [2])
+
+        class Incomplete(OnlineAnalysis):
+            def update(self, record):
+                pass
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_follow_lines(self):
+        with open('tests/parser/serial_info.txt') as file:
+            lines = file.readlines()
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            filename = os.path.join(tmpdirname, 'out.log')
+            with open(filename, 'w') as file:
+                file.writelines(lines[:10])
+                file.write(lines[10][:5])
+            followed = follow_lines(filename, poll_interval=0.01, idle_timeout=1)
+            # the incomplete line is held back until it is complete
+            self.assertEqual([next(followed) for _ in range(10)], lines[:10])
+            with open(filename, 'a') as file:
+                file.write(lines[10][5:])
+                file.writelines(lines[11:])
+            self.assertEqual(list(followed), lines[10:])
+
+    def test_synthetic_log(self):
+        # every template is matched by the regex of its record type
+        regexes = [(re.compile(k), v) for k, v in ogs_regexes()]
+        for pattern_class, template in line_templates.items():
+            values = {field: '7' if ctor is str else ctor(7) for field, ctor in pattern_class.__annotations__.items()}
+            text = template.format(**values)
+            matched = next(v for k, v in regexes if k.match(text))
+            self.assertIs(matched, pattern_class, text)
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            filename = os.path.join(tmpdirname, 'out.log')
+            for options in [dict(), dict(mpi_processes=3), dict(staggered=True, components=2, warnings=1.0)]:
+                stats = write_synthetic_log(filename, time_steps=5, **options)
+                self.assertEqual(stats['bytes'], os.path.getsize(filename))
+                self.assertEqual(mpi_processes(filename), options.get('mpi_processes', 1))
+                df = pd.DataFrame(parse_file(filename))
+                ranks = options.get('mpi_processes', 1)
+                self.assertEqual(df['step_start_time'].notna().sum(), 5 * ranks)
+                self.assertEqual((df['type'] == 'Warning').sum(), 5 * ranks if options.get('warnings') else 0)
+                self.assertEqual(sorted(df['mpi_process'].unique()), list(range(ranks)))
+                if options.get('staggered'):
+                    self.assertEqual(set(df['component'].dropna()), {0, 1})
+                    self.assertEqual(set(df['coupling_iteration_process'].dropna()), {0, 1})
+            stats = write_synthetic_log(filename, size=200000)
+            self.assertGreaterEqual(stats['bytes'], 200000)
+
+    def test_parse_many(self):
+        paths = ['tests/parser/serial_convergence_long.txt', 'tests/parser/serial_convergence_short.txt',
+                 'tests/parser/serial_critical.txt', 'tests/parser/missing.txt']
+        df, report = parse_many(paths, workers=2, project_files=['tests/includetest.prj'] * len(paths),
+                                parameters=['E', 'nu'])
+        self.assertEqual(list(report['status']), ['ok', 'truncated', 'error', 'failed'])
+        self.assertEqual(list(df.index.get_level_values('run').unique()), paths[:3])
+        self.assertEqual(set(df['E']), {2e9})
+        self.assertEqual(set(df['nu']), {0.3})
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        for path in paths[:3]:
+            expected = model.parse_out(path, reset_index=False)
+            self.assertEqual(report.loc[path, 'records'], len(expected))
+            pd.testing.assert_frame_equal(df.loc[path][expected.columns], expected)
+
+    def test_parse_out_filter_pushdown(self):
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        columns = parse_columns('tests/parser/serial_convergence_long.txt',
+                                pattern_classes=record_types(['time_step_vs_iterations']))
+        self.assertEqual({pattern_class.__name__ for pattern_class in columns},
+                         {'TimeStepStartTime', 'TimeStepOutputTime', 'TimeStepFinishedTime',
+                          'TimeStepSolutionTimeCoupledScheme', 'IterationTime'})
+        for filename in ['tests/parser/serial_convergence_long.txt', 'tests/parser/serial_time_step_rejected.txt',
+                         'tests/parser/parallel_3_debug.txt']:
+            df = model.parse_out(filename, reset_index=False)
+            for name in ['by_time_step', 'time_step_vs_iterations', 'analysis_simulation',
+                         'convergence_newton_iteration']:
+                if name == 'convergence_newton_iteration' and 'dx' not in df:
+                    continue
+                pd.testing.assert_frame_equal(model.parse_out(filename, filter=name, reset_index=False),
+                                              analysis_functions[name](df.copy()))
+
+    def test_parse_out_numpy_backend(self):
+        # pandas is not imported with ogs6py
+        code = "import sys, ogs6py; ogs6py.OGS(PROJECT_FILE='tests/test.prj').parse_out(" \
+               "'tests/parser/serial_convergence_long.txt', filter='by_time_step', backend='numpy');" \
+               "print('pandas' in sys.modules)"
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                                env=dict(os.environ, PYTHONPATH=os.getcwd()))
+        self.assertEqual(output.stdout.strip(), 'False', output.stderr)
+
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        for filename in ['tests/parser/serial_convergence_long.txt', 'tests/parser/serial_time_step_rejected.txt',
+                         'tests/parser/parallel_3_debug.txt']:
+            arrays = model.parse_out(filename, backend='numpy')
+            df = model.parse_out(filename, reset_index=False)
+            self.assertEqual(sum(len(array) for array in arrays.values()), len(df))
+            self.assertEqual(arrays['TimeStepStartTime']['step_size'].tolist(),
+                             df['step_size'].dropna().tolist())
+            table = model.parse_out(filename, filter='fill_ogs_context', backend='numpy')
+            for column in ['time_step', 'iteration_number', 'process']:
+                np.testing.assert_array_equal(table[column], df[column].astype('float64').to_numpy())
+            for name in ['by_time_step', 'time_step_vs_iterations', 'analysis_simulation',
+                         'convergence_newton_iteration']:
+                if name == 'convergence_newton_iteration' and 'dx' not in df:
+                    continue
+                expected = analysis_functions[name](df.copy())
+                result = pd.DataFrame(model.parse_out(filename, filter=name, backend='numpy'))
+                result = result.set_index(list(expected.index.names))
+                pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_index_type=False)
+
+    @unittest.skipUnless(importlib.util.find_spec('polars'), 'polars is not installed')
+    def test_parse_out_polars_backend(self):
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        filename = 'tests/parser/serial_convergence_long.txt'
+        for name in ['by_time_step', 'time_step_vs_iterations', 'convergence_newton_iteration']:
+            expected = model.parse_out(filename, filter=name, backend='numpy')
+            result = model.parse_out(filename, filter=name, backend='polars')
+            for column in expected.dtype.names:
+                np.testing.assert_allclose(result[column].to_numpy(), expected[column])
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'pyarrow is not installed')
+    def test_arrow_export(self):
+        import pyarrow.parquet as pq
+        model = ogs6py.OGS(PROJECT_FILE="tests/test.prj")
+        for filename in ['tests/parser/serial_convergence_long.txt', 'tests/parser/parallel_3_debug.txt']:
+            table = arrow_export.parse_arrow(filename)
+            self.assertEqual(table.schema, arrow_export.arrow_schema())
+            df = columns_to_dataframe(parse_columns(filename))
+            result = table.to_pandas()
+            self.assertEqual(result['line'].tolist(), df['line'].tolist())
+            for column in df.columns:
+                pd.testing.assert_series_equal(result[column], df[column], check_dtype=False)
+            self.assertEqual(result.loc[result['step_size'].notna(), 'record'].unique().tolist(),
+                             ['TimeStepStartTime'])
+            # chunks of workers are sent as Arrow IPC buffers
+            pd.testing.assert_frame_equal(arrow_export.parse_arrow(filename, workers=3).to_pandas(), result)
+            pd.testing.assert_frame_equal(model.parse_out(filename, backend='arrow').to_pandas(), result)
+            with tempfile.TemporaryDirectory() as tmpdirname:
+                arrow_export.write_parquet(filename, os.path.join(tmpdirname, 'log.parquet'))
+                pd.testing.assert_frame_equal(pq.read_table(os.path.join(tmpdirname, 'log.parquet')).to_pandas(),
+                                              result)
+                arrow_export.write_ipc(table, os.path.join(tmpdirname, 'log.arrows'))
+                pd.testing.assert_frame_equal(
+                    arrow_export.read_ipc(os.path.join(tmpdirname, 'log.arrows')).to_pandas(), result)
+            pd.testing.assert_frame_equal(arrow_export.read_ipc(arrow_export.to_ipc_buffer(table)).to_pandas(), result)
+        expected = model.parse_out(filename, filter='by_time_step', backend='numpy')
+        result = model.parse_out(filename, filter='by_time_step', backend='arrow')
+        for column in expected.dtype.names:
+            np.testing.assert_allclose(result.column(column).to_numpy(), expected[column])
+        table = model.parse_out(filename, filter='fill_ogs_context', backend='arrow')
+        self.assertEqual(table.schema.field('time_step').type, 'int64')
+
+    def test_run_model_live(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            # stand-in for ogs that prints a log and exits with the given code
+            for returncode in [0, 3]:
+                ogs_path = os.path.join(tmpdirname, str(returncode))
+                os.mkdir(ogs_path)
+                with open(os.path.join(ogs_path, 'ogs'), 'w') as file:
+                    file.write('#!/bin/sh\ncat {}\nexit {}\n'.format(
+                        os.path.abspath('tests/parser/serial_convergence_long.txt'), returncode))
+                os.chmod(os.path.join(ogs_path, 'ogs'), 0o755)
+            model = ogs6py.OGS(PROJECT_FILE=os.path.join(tmpdirname, "test.prj"))
+            logfile = os.path.join(tmpdirname, "out.log")
+            model.run_model(logfile=logfile, path=os.path.join(tmpdirname, '0'), live=True)
+            with open(logfile) as file, open('tests/parser/serial_convergence_long.txt') as expected:
+                self.assertEqual(file.read(), expected.read())
+            expected = model.parse_out('tests/parser/serial_convergence_long.txt')
+            # the records parsed while running are taken, the log file is not read again
+            self.assertIsNotNone(model._live_columns(logfile))
+            pd.testing.assert_frame_equal(model.parse_out(), expected)
+            model.run_model(logfile=logfile, path=os.path.join(tmpdirname, '0'), live=True, compress='gzip',
+                            write_logs=True)
+            self.assertEqual(model.logfile, logfile + '.gz')
+            self.assertEqual(compression(model.logfile), 'gzip')
+            pd.testing.assert_frame_equal(model.parse_out(), expected)
+            with open(model.logfile, 'ab') as file:
+                file.write(b'info: appended\n')
+            self.assertIsNone(model._live_columns(model.logfile))
+            with self.assertRaises(RuntimeError):
+                model.run_model(logfile=logfile, path=os.path.join(tmpdirname, '3'), live=True)
+
+            # ogs is terminated if the live parsing fails
+            ogs_path = os.path.join(tmpdirname, 'long')
+            os.mkdir(ogs_path)
+            with open(os.path.join(ogs_path, 'ogs'), 'w') as file:
+                file.write('#!/bin/sh\necho $$ > {}\ncat {}\nsleep 60\n'.format(
+                    os.path.join(tmpdirname, 'pid'), os.path.abspath('tests/parser/serial_convergence_long.txt')))
+            os.chmod(os.path.join(ogs_path, 'ogs'), 0o755)
+
+            class Failing(Rule):
+                record_types = [TimeStepStartTime]
+
+                def update(self, record, time_step):
+                    raise ValueError('rule failed')
+            with self.assertRaises(ValueError):
+                model.run_model(logfile=logfile, path=ogs_path, watchdog=Watchdog([Failing()]))
+            with open(os.path.join(tmpdirname, 'pid')) as file:
+                pid = int(file.read())
+            with self.assertRaises(ProcessLookupError):
+                os.kill(pid, 0)
+
+
+    def test_watchdog(self):
+        records = list(iter_records('tests/parser/serial_convergence_long.txt'))
+        # |dx|/|x|=nan of the first iterations is no reason
+        self.assertIsNone(Watchdog([NonFiniteConvergence(), MinStepSize(1e-12)]).watch(records))
+        self.assertEqual(Watchdog([NonFiniteConvergence(ignore_first_iteration=False)]).watch(records).rule,
+                         'NonFiniteConvergence')
+        df = fill_ogs_context(pd.DataFrame(records))
+        iterations = df.groupby('time_step')['iteration_number'].max().drop(0)
+        reason = Watchdog([MaxIterations(iterations.min() - 1, consecutive_steps=2)]).watch(records)
+        self.assertEqual(reason.rule, 'MaxIterations')
+        self.assertEqual(reason.time_step, iterations.index[1])
+        self.assertIsNone(Watchdog([MaxIterations(iterations.max())]).watch(records))
+        clock = iter(range(0, 1000, 10))
+        reason = Watchdog([WallClockBudget(100, end_time=1e6, clock=lambda: next(clock))]).watch(records)
+        self.assertEqual(reason.rule, 'WallClockBudget')
+        self.assertGreater(reason.value, 100)
+
+        class Incomplete(Rule):
+            record_types = [TimeStepStartTime]
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            log = os.path.join(tmpdirname, 'synthetic.log')
+            write_synthetic_log(log, time_steps=20, seed=1)
+            # stand-in for ogs that would run for a long time after printing the log
+            with open(os.path.join(tmpdirname, 'ogs'), 'w') as file:
+                file.write('#!/bin/sh\ncat {}\nsleep 60\n'.format(log))
+            os.chmod(os.path.join(tmpdirname, 'ogs'), 0o755)
+            model = ogs6py.OGS(PROJECT_FILE=os.path.join(tmpdirname, "test.prj"))
+            reason = model.run_model(logfile=os.path.join(tmpdirname, "out.log"), path=tmpdirname,
+                                     watchdog=Watchdog([MinStepSize(0.75)]))
+            self.assertLess(model.exec_time, 30)
+            self.assertEqual(reason.rule, 'MinStepSize')
+            self.assertEqual(reason.value, 0.5)
+            self.assertIs(model.watchdog_reason, reason)
+            steps = [record for record in iter_records(log) if hasattr(record, 'step_size')]
+            self.assertEqual(reason.time_step, next(step.time_step for step in steps if step.step_size < 0.75))
+
+            # a watchdog reused for the next run of a parameter sweep starts without the previous reason
+            watchdog = Watchdog([MinStepSize(0.75), MaxIterations(1, consecutive_steps=2), NonFiniteConvergence()])
+            self.assertEqual(model.run_model(logfile=os.path.join(tmpdirname, "out.log"), path=tmpdirname,
+                                             watchdog=watchdog).rule, 'MinStepSize')
+            with open(os.path.join(tmpdirname, 'ogs'), 'w') as file:
+                file.write('#!/bin/sh\ncat {}\n'.format(os.path.abspath('tests/parser/serial_convergence_long.txt')))
+            watchdog.rules[1].max_iterations = 100
+            self.assertIsNone(model.run_model(logfile=os.path.join(tmpdirname, "out.log"), path=tmpdirname,
+                                              watchdog=watchdog))
+            self.assertIsNone(watchdog.reason)
+            self.assertIsNone(model.watchdog_reason)
+
+
+    def test_performance_profile(self):
+        report = performance_profile('tests/parser/serial_convergence_long.txt', top=3)
+        df = fill_ogs_context(pd.DataFrame(parse_file('tests/parser/serial_convergence_long.txt')))
+        expected = analysis_time_step(df).loc[0]
+        profile = report.time_steps.loc[0]
+        for column in ['assembly_time', 'linear_solver_time', 'dirichlet_time', 'output_time']:
+            np.testing.assert_allclose(profile[column].loc[expected.index], expected[column])
+        np.testing.assert_allclose(profile['unattributed_time'], profile['time_step_time'] - profile['assembly_time']
+                                   - profile['linear_solver_time'] - profile['dirichlet_time'])
+        self.assertEqual(profile['iterations'].drop(0).tolist(),
+                         time_step_vs_iterations(df)['iteration_number'].drop(0).tolist())
+        self.assertAlmostEqual(report.phases['share'].sum(), 1.0)
+        self.assertEqual(len(report.slowest), 3)
+        self.assertTrue(report.slowest['total_time'].is_monotonic_decreasing)
+        self.assertAlmostEqual(report.output_compute_ratio,
+                               profile['output_time'].sum() / profile['time_step_time'].sum())
+        # the same profile from a DataFrame
+        pd.testing.assert_frame_equal(performance_profile(df).time_steps, report.time_steps)
+        self.assertIn('Slowest time steps', report.to_text())
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            report.to_html(os.path.join(tmpdirname, 'profile.html'))
+            with open(os.path.join(tmpdirname, 'profile.html')) as file:
+                self.assertIn('<h2>Trends</h2>', file.read())
+
+        # linear solver time growing over the run
+        time_steps = np.arange(1, 21)
+        df = pd.DataFrame({'mpi_process': 0, 'time_step': time_steps, 'iteration_number': 3, 'iteration_time': 1.0,
+                           'assembly_time': 1.0, 'linear_solver_time': 0.1 * time_steps, 'dirichlet_time': 0.01,
+                           'time_step_finished_time': 1.2 + 0.1 * time_steps, 'output_time': 0.1})
+        trends = performance_profile(df).trends['trend']
+        self.assertEqual(trends['linear_solver_time'], 'growing')
+        self.assertEqual(trends['assembly_time'], 'none')
+        # without iterations in the log the iterations are a count of 0
+        profile = performance_profile(df.drop(columns=['iteration_number', 'iteration_time'])).time_steps
+        self.assertEqual(profile['iterations'].dtype.kind, 'i')
+        self.assertTrue((profile['iterations'] == 0).all())
+
+
+    def test_compare_runs(self):
+        filename = 'tests/parser/serial_convergence_long.txt'
+        comparison = compare_runs(filename, filename)
+        self.assertTrue(comparison.passed)
+        np.testing.assert_allclose(comparison.speedups['speedup'], 1.0)
+        self.assertTrue(comparison.iteration_differences.empty)
+        self.assertIn('Verdict: pass', comparison.to_text())
+
+        df = fill_ogs_context(pd.DataFrame(parse_file(filename)))
+        # run b: linear solver twice as slow, one iteration more in time step 3, without the last time step
+        slow = df.copy()
+        extra = slow['linear_solver_time'].fillna(0).groupby(slow['time_step']).transform('sum')
+        slow['time_step_finished_time'] += extra
+        slow['linear_solver_time'] *= 2
+        slow.loc[(slow['time_step'] == 3) & slow['iteration_time'].notna(), 'iteration_number'] += 1
+        slow = slow[slow['time_step'] < 10]
+        comparison = compare_runs(df, slow, threshold=0.1)
+        self.assertFalse(comparison.passed)
+        self.assertAlmostEqual(comparison.speedups.loc['linear_solver_time', 'speedup'], 0.5)
+        self.assertEqual(comparison.speedups.loc['assembly_time', 'verdict'], 'pass')
+        self.assertEqual(comparison.speedups.loc['total_time', 'verdict'], 'fail')
+        self.assertLessEqual(comparison.speedups.loc['total_time', 'low'],
+                             comparison.speedups.loc['total_time', 'speedup'])
+        self.assertEqual(comparison.iteration_differences.index.tolist(), [3])
+        self.assertEqual(comparison.unmatched_time_steps, {'a': [10], 'b': []})
+        # gated on the assembly only
+        self.assertTrue(compare_runs(df, slow, gate=['assembly_time']).passed)
+        # time step times missing in run b
+        missing = slow.assign(time_step_finished_time=np.nan)
+        comparison = compare_runs(df, missing, gate=['assembly_time', 'time_step_time'])
+        self.assertEqual(comparison.speedups.loc['time_step_time', 'verdict'], 'missing')
+        self.assertFalse(comparison.passed)
+        self.assertTrue(compare_runs(df, missing, gate=['assembly_time']).passed)
+
+
+    def test_parallel_analyses(self):
+        imbalance, summary = load_imbalance('tests/parser/parallel_3_debug.txt')
+        df = fill_ogs_context(pd.DataFrame(parse_file('tests/parser/parallel_3_debug.txt')))
+        linear_solver_time = df.groupby(['time_step', 'mpi_process'])['linear_solver_time'].sum().loc[1]
+        self.assertAlmostEqual(imbalance.loc[1, ('linear_solver_time', 'max')], linear_solver_time.max())
+        self.assertAlmostEqual(imbalance.loc[1, ('linear_solver_time', 'imbalance')],
+                               linear_solver_time.max() / linear_solver_time.mean())
+        self.assertEqual(imbalance.loc[1, ('linear_solver_time', 'slowest_rank')], linear_solver_time.idxmax())
+        self.assertTrue((summary['imbalance'] >= 1).all())
+
+        def run(ranks, serial, parallel):
+            # every rank takes serial + parallel / ranks per time step, rank 0 is slower by 10 %
+            rows = []
+            for time_step in range(1, 4):
+                for rank in range(ranks):
+                    time = (serial + parallel / ranks) * (1.1 if rank == 0 else 1.0)
+                    rows.append({'mpi_process': rank, 'time_step': time_step, 'assembly_time': time,
+                                 'time_step_finished_time': time, 'output_time': 0.0})
+            return pd.DataFrame(rows)
+
+        imbalance, summary = load_imbalance(run(4, 1.0, 8.0))
+        self.assertTrue((imbalance[('assembly_time', 'slowest_rank')] == 0).all())
+        self.assertAlmostEqual(summary.loc['assembly_time', 'imbalance'], 1.1 / 1.025)
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            scaling, fit = scaling_analysis({ranks: run(ranks, 1.0, 8.0) for ranks in [1, 2, 4, 8]})
+        # the output takes no time, there is no serial fraction
+        self.assertTrue(np.isnan(fit.loc['output_time', 'serial_fraction']))
+        self.assertTrue(np.isnan(fit.loc['output_time', 'max_speedup']))
+        self.assertAlmostEqual(scaling.loc[('assembly_time', 2), 'speedup'], 9 / 5)
+        self.assertAlmostEqual(scaling.loc[('assembly_time', 8), 'efficiency'], 9 / 2 / 8)
+        self.assertAlmostEqual(fit.loc['assembly_time', 'serial_fraction'], 1 / 9)
+        self.assertAlmostEqual(fit.loc['assembly_time', 'max_speedup'], 9)
+        # weak scaling: the time grows by the serial part only
+        scaling, fit = scaling_analysis([run(ranks, 0.0, ranks) for ranks in [1, 2, 4]], weak=True)
+        self.assertEqual(scaling.loc['assembly_time'].index.tolist(), [1, 2, 4])
+        np.testing.assert_allclose(scaling.loc['assembly_time', 'efficiency'], 1.0)
+        self.assertAlmostEqual(fit.loc['assembly_time', 'serial_fraction'], 0.0)
+        # repeated runs with the same number of ranks
+        with self.assertRaisesRegex(Exception, r'same number of ranks \(2\)'):
+            scaling_analysis([run(ranks, 0.0, ranks) for ranks in [1, 2, 2]])
+
+
+    def test_chrome_trace(self):
+        filename = 'tests/parser/parallel_3_debug.txt'
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            write_chrome_trace(filename, os.path.join(tmpdirname, 'trace.json'))
+            with open(os.path.join(tmpdirname, 'trace.json')) as file:
+                trace = json.load(file)
+        spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+        self.assertEqual({event['args']['name'] for event in trace['traceEvents'] if event['name'] == 'thread_name'},
+                         {'rank 0', 'rank 1', 'rank 2'})
+        df = pd.DataFrame(parse_file(filename))
+        self.assertAlmostEqual(sum(event['dur'] for event in spans if event['name'] == 'linear solver') / 1e6,
+                               df['linear_solver_time'].sum())
+        # all ranks start the time step together, the faster ranks wait
+        starts = {event['ts'] for event in spans if event['cat'] == 'time_step'}
+        self.assertEqual(len(starts), 1)
+        self.assertTrue(any(event['name'] == 'wait' for event in spans))
+
+        def check_nesting(trace):
+            by_rank = defaultdict(list)
+            for event in trace['traceEvents']:
+                if event['ph'] == 'X':
+                    by_rank[event['tid']].append(event)
+            for events in by_rank.values():
+                events.sort(key=lambda event: (event['ts'], -event['dur']))
+                stack = []
+                for event in events:
+                    while stack and event['ts'] >= stack[-1]['ts'] + stack[-1]['dur'] - 1e-6:
+                        stack.pop()
+                    if stack:
+                        self.assertLessEqual(event['ts'] + event['dur'], stack[-1]['ts'] + stack[-1]['dur'] + 1e-6)
+                    stack.append(event)
+            return by_rank
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            filename = os.path.join(tmpdirname, 'synthetic.log')
+            write_synthetic_log(filename, time_steps=5, mpi_processes=2, staggered=True, components=2)
+            by_rank = check_nesting(chrome_trace(filename))
+        self.assertEqual(sorted(by_rank), [0, 1])
+        categories = {event['cat'] for event in by_rank[0]}
+        self.assertLessEqual({'simulation', 'time_step', 'coupling_iteration', 'solve', 'iteration', 'phase',
+                              'output'}, categories)
+        check_nesting(chrome_trace(parse_file('tests/parser/serial_time_step_rejected.txt')))
+
+
+    def test_start_model(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            # stand-ins for ogs: one prints a log when the file "go" exists, one waits until 4 runs have started
+            # (times out after 30 s) and prints the log, one runs for a long time
+            log = os.path.abspath('tests/parser/serial_convergence_long.txt')
+            go = os.path.join(tmpdirname, 'go')
+            barrier = os.path.join(tmpdirname, 'barrier')
+            os.mkdir(barrier)
+            for name, script in [
+                    ('gated', 'while [ ! -e {} ]; do sleep 0.01; done\ncat {}\n'.format(go, log)),
+                    ('concurrent', 'touch {0}/$$\nn=0\nwhile [ $(ls {0} | wc -l) -lt 4 ]; do\n'
+                                   '  sleep 0.01; n=$((n + 1)); [ $n -gt 3000 ] && exit 1\ndone\ncat {1}\n'
+                                   .format(barrier, log)),
+                    ('long', 'sleep 60\n')]:
+                os.mkdir(os.path.join(tmpdirname, name))
+                with open(os.path.join(tmpdirname, name, 'ogs'), 'w') as file:
+                    file.write('#!/bin/sh\n' + script)
+                os.chmod(os.path.join(tmpdirname, name, 'ogs'), 0o755)
+            model = ogs6py.OGS(PROJECT_FILE=os.path.join(tmpdirname, "test.prj"))
+            run = model.start_model(logfile=os.path.join(tmpdirname, "out.log"), path=os.path.join(tmpdirname, 'gated'))
+            self.assertIsNone(run.poll())
+            with self.assertRaises(subprocess.TimeoutExpired):
+                run.wait(timeout=0.01)
+            self.assertIsNone(run.returncode)
+            open(go, 'w').close()
+            self.assertEqual(run.wait(timeout=30), 0)
+            self.assertEqual(run.returncode, 0)
+            self.assertGreater(run.exec_time, 0)
+            self.assertEqual(model.exec_time, run.exec_time)
+            self.assertEqual(run.tail(1), ['info: OGS terminated on 2021-11-26 13:13:18+0100.'])
+            pd.testing.assert_frame_equal(run.parse_out(), model.parse_out('tests/parser/serial_convergence_long.txt'))
+
+            run = model.start_model(logfile=os.path.join(tmpdirname, "out.log"), path=os.path.join(tmpdirname, 'long'))
+            run.terminate()
+            self.assertNotEqual(run.wait(timeout=30), 0)
+            self.assertIsNotNone(run.poll())
+
+            # concurrent runs in one event loop, each run waits until all have started
+            models = [ogs6py.OGS(PROJECT_FILE=os.path.join(tmpdirname, "test{}.prj".format(i))) for i in range(4)]
+
+            async def run_all():
+                await asyncio.gather(*(model.run_model_async(logfile=os.path.join(tmpdirname, "out{}.log".format(i)),
+                                                             path=os.path.join(tmpdirname, 'concurrent'))
+                                       for i, model in enumerate(models)))
+            asyncio.run(run_all())
+            self.assertEqual(len(os.listdir(barrier)), 4)
+            for i, model in enumerate(models):
+                self.assertGreater(model.exec_time, 0)
+                with open(os.path.join(tmpdirname, "out{}.log".format(i))) as file, \
+                        open('tests/parser/serial_convergence_long.txt') as expected:
+                    self.assertEqual(file.read(), expected.read())
+
+            async def cancelled():
+                task = asyncio.ensure_future(model.run_model_async(logfile=os.path.join(tmpdirname, "out.log"),
+                                                                   path=os.path.join(tmpdirname, 'long')))
+                await asyncio.sleep(0.2)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+            # the stand-in runs for 60 s unless the cancellation terminates it
+            start = time.time()
+            asyncio.run(cancelled())
+            self.assertLess(time.time() - start, 30)
+
+
+    def test_run_ensemble(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            # stand-in for ogs: records start, end and OMP_NUM_THREADS in the output directory (ogs -o dir prj),
+            # prints a log, fails for projects containing "fail"
+            with open(os.path.join(tmpdirname, 'ogs'), 'w') as file:
+                file.write('#!/bin/bash\n'
+                           'echo $OMP_NUM_THREADS > "$2/threads"\n'
+                           'date +%s.%N > "$2/start"\n'
+                           'if grep -q fail "$3"; then echo "critical: failed"; exit 2; fi\n'
+                           'sleep 0.3\n'
+                           'cat {}\n'
+                           'date +%s.%N > "$2/end"\n'.format(os.path.abspath('tests/parser/serial_convergence_long.txt')))
+            os.chmod(os.path.join(tmpdirname, 'ogs'), 0o755)
+            projects = []
+            for i in range(5):
+                projects.append(os.path.join(tmpdirname, 'variant{}.prj'.format(i)))
+                with open(projects[-1], 'w') as file:
+                    file.write('fail' if i == 3 else 'ok')
+            model = ogs6py.OGS(PROJECT_FILE=os.path.join(tmpdirname, 'variant5.prj'), OMP_NUM_THREADS=4)
+            with open(model.prjfile, 'w') as file:
+                file.write('ok')
+            work_dir = os.path.join(tmpdirname, 'ensemble')
+            results = run_ensemble(projects + [model], cores=4, threads=2, work_dir=work_dir, path=tmpdirname,
+                                   write_input=False, poll_interval=0.01)
+            self.assertEqual(results.index.tolist(), list(range(6)))
+            self.assertEqual(results['status'].tolist(), ['ok', 'ok', 'ok', 'failed', 'ok', 'ok'])
+            self.assertEqual(results.loc[3, 'returncode'], 2)
+            self.assertEqual(results['cores'].tolist(), [2, 2, 2, 2, 2, 4])
+            self.assertEqual(results.loc[3, 'log_status'], 'error')
+            self.assertEqual(results.loc[0, 'log_status'], 'ok')
+            self.assertEqual(results.loc[0, 'time_steps'], 10)
+            self.assertEqual(results.loc[0, 'iterations'],
+                             len(pd.DataFrame(parse_file('tests/parser/serial_convergence_long.txt'))
+                                 ['iteration_time'].dropna()))
+            intervals = []
+            for run_id in results.index:
+                run_dir = os.path.join(work_dir, str(run_id))
+                self.assertEqual(results.loc[run_id, 'run_dir'], run_dir)
+                with open(os.path.join(run_dir, 'threads')) as file:
+                    self.assertEqual(file.read().strip(), '4' if run_id == 5 else '2')
+                if results.loc[run_id, 'status'] == 'ok':
+                    with open(os.path.join(run_dir, 'start')) as start, open(os.path.join(run_dir, 'end')) as end:
+                        intervals.append((float(start.read()), float(end.read()), results.loc[run_id, 'cores']))
+            # the cores of the runs running at the same time are within the budget
+            for time_point, _, _ in intervals:
+                self.assertLessEqual(sum(cores for start, end, cores in intervals if start <= time_point < end), 4)
+
+            # the OGS objects of the caller are not changed
+            slow = ogs6py.OGS(PROJECT_FILE=projects[0])
+            results = run_ensemble({'slow': slow}, cores=4, threads=2, work_dir=work_dir, path=tmpdirname,
+                                   write_input=False, timeout=0.1, summary=False)
+            self.assertEqual(results.loc['slow', 'status'], 'timeout')
+            self.assertIsNone(slow.threads)
+            self.assertEqual(slow.prjfile, projects[0])
+            self.assertEqual(slow.logfile, "out.log")
+            self.assertFalse(hasattr(slow, "exec_time"))
+            with self.assertRaises(RuntimeError):
+                run_ensemble([projects[0]], cores=4, threads=8, work_dir=work_dir, path=tmpdirname)
+
 
 if __name__ == '__main__':
     unittest.main()